@@ -0,0 +1,137 @@
+from bitboard import BOARD_SIZE, shift, square_index
+
+# Attack sets for every square, built once at import time. Move generation and
+# evaluation look these up instead of walking offsets and checking board bounds.
+
+DIAGONAL_DIRECTIONS = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
+VERTICAL_AND_HORIZONTAL_DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+ALL_DIRECTIONS = VERTICAL_AND_HORIZONTAL_DIRECTIONS + DIAGONAL_DIRECTIONS
+KNIGHT_MOVES = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
+
+SQUARES = range(BOARD_SIZE * BOARD_SIZE)
+
+
+def _step_attacks(square: int, offsets: list[tuple[int, int]]) -> int:
+    attacks = 0
+    for dr, dc in offsets:
+        attacks |= shift(1 << square, dr, dc)
+    return attacks
+
+
+def _ray(square: int, direction: tuple[int, int]) -> tuple[int, ...]:
+    # Squares along a direction from (but not including) the given square, nearest
+    # first.
+    dr, dc = direction
+    row, col = divmod(square, BOARD_SIZE)
+    squares = []
+    row, col = row + dr, col + dc
+    while 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE:
+        squares.append(square_index(row, col))
+        row, col = row + dr, col + dc
+    return tuple(squares)
+
+
+KNIGHT_ATTACKS = [_step_attacks(square, KNIGHT_MOVES) for square in SQUARES]
+KING_ATTACKS = [_step_attacks(square, ALL_DIRECTIONS) for square in SQUARES]
+# Squares attacked by a pawn of each colour standing on the given square.
+WHITE_PAWN_ATTACKS = [_step_attacks(square, [(1, -1), (1, 1)]) for square in SQUARES]
+BLACK_PAWN_ATTACKS = [_step_attacks(square, [(-1, -1), (-1, 1)]) for square in SQUARES]
+
+# RAYS[direction][square] lists the squares a slider passes over, nearest first.
+RAYS = {
+    direction: [_ray(square, direction) for square in SQUARES]
+    for direction in ALL_DIRECTIONS
+}
+
+
+def _between_and_line(start: int, end: int) -> tuple[int, int]:
+    # The squares strictly between two squares on a shared rank, file or diagonal,
+    # and the whole line through them. Both are empty if the squares don't share
+    # one.
+    for dr, dc in ALL_DIRECTIONS:
+        ray = RAYS[(dr, dc)][start]
+        if end in ray:
+            between = 0
+            for square in ray[: ray.index(end)]:
+                between |= 1 << square
+            line = 1 << start
+            for square in ray + RAYS[(-dr, -dc)][start]:
+                line |= 1 << square
+            return between, line
+    return 0, 0
+
+
+_BETWEEN_AND_LINE = [[_between_and_line(a, b) for b in SQUARES] for a in SQUARES]
+# BETWEEN[a][b] is the squares a slider on a passes over to reach b. A piece there
+# blocks a check or pin along the line.
+BETWEEN = [[between for between, _ in row] for row in _BETWEEN_AND_LINE]
+# LINE[a][b] is the whole rank, file or diagonal through a and b. A piece pinned to
+# its king can only move along this line.
+LINE = [[line for _, line in row] for row in _BETWEEN_AND_LINE]
+
+
+def _slider_mask(square: int, directions: list[tuple[int, int]]) -> int:
+    # The squares whose occupancy can change a slider's attacks. The last square of
+    # each ray is left out as the slider attacks it whether or not it's occupied.
+    mask = 0
+    for direction in directions:
+        for ray_square in RAYS[direction][square][:-1]:
+            mask |= 1 << ray_square
+    return mask
+
+
+def _slider_attacks(
+    square: int, occupied: int, directions: list[tuple[int, int]]
+) -> int:
+    attacks = 0
+    for direction in directions:
+        for ray_square in RAYS[direction][square]:
+            attacks |= 1 << ray_square
+            if occupied >> ray_square & 1:
+                break
+    return attacks
+
+
+def _slider_table(
+    square: int, mask: int, directions: list[tuple[int, int]]
+) -> dict[int, int]:
+    # Perfect hash of every blocker arrangement to its attack set, keyed by the
+    # masked occupancy itself. Python ints make the masked occupancy a cheaper key
+    # than a magic multiply and shift, and it can never collide.
+    table = {}
+    subset = 0
+    while True:
+        table[subset] = _slider_attacks(square, subset, directions)
+        # Carry-Rippler trick to step through every subset of the mask.
+        subset = (subset - mask) & mask
+        if subset == 0:
+            return table
+
+
+ROOK_MASKS = [
+    _slider_mask(square, VERTICAL_AND_HORIZONTAL_DIRECTIONS) for square in SQUARES
+]
+BISHOP_MASKS = [_slider_mask(square, DIAGONAL_DIRECTIONS) for square in SQUARES]
+_ROOK_TABLES = [
+    _slider_table(square, ROOK_MASKS[square], VERTICAL_AND_HORIZONTAL_DIRECTIONS)
+    for square in SQUARES
+]
+_BISHOP_TABLES = [
+    _slider_table(square, BISHOP_MASKS[square], DIAGONAL_DIRECTIONS)
+    for square in SQUARES
+]
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    return _ROOK_TABLES[square][occupied & ROOK_MASKS[square]]
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    return _BISHOP_TABLES[square][occupied & BISHOP_MASKS[square]]
+
+
+def queen_attacks(square: int, occupied: int) -> int:
+    return (
+        _ROOK_TABLES[square][occupied & ROOK_MASKS[square]]
+        | _BISHOP_TABLES[square][occupied & BISHOP_MASKS[square]]
+    )
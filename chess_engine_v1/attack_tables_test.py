@@ -0,0 +1,81 @@
+import random
+import unittest
+
+from attack_tables import (
+    BLACK_PAWN_ATTACKS,
+    KING_ATTACKS,
+    KNIGHT_ATTACKS,
+    WHITE_PAWN_ATTACKS,
+    bishop_attacks,
+    queen_attacks,
+    rook_attacks,
+)
+from bitboard import square_index
+
+A1 = square_index(0, 0)
+E4 = square_index(3, 4)
+H8 = square_index(7, 7)
+
+
+def bits(*squares: tuple[int, int]) -> int:
+    bitboard = 0
+    for row, col in squares:
+        bitboard |= 1 << square_index(row, col)
+    return bitboard
+
+
+def walk_slider(square: int, occupied: int, directions: list[tuple[int, int]]) -> int:
+    # Reference implementation walking each ray one square at a time.
+    row, col = divmod(square, 8)
+    attacks = 0
+    for dr, dc in directions:
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            attacks |= 1 << square_index(r, c)
+            if occupied >> square_index(r, c) & 1:
+                break
+            r, c = r + dr, c + dc
+    return attacks
+
+
+class TestAttackTables(unittest.TestCase):
+    def test_knight_attacks(self) -> None:
+        self.assertEqual(KNIGHT_ATTACKS[A1], bits((1, 2), (2, 1)))
+        self.assertEqual(KNIGHT_ATTACKS[E4].bit_count(), 8)
+
+    def test_king_attacks(self) -> None:
+        self.assertEqual(KING_ATTACKS[H8], bits((6, 6), (6, 7), (7, 6)))
+        self.assertEqual(KING_ATTACKS[E4].bit_count(), 8)
+
+    def test_pawn_attacks(self) -> None:
+        self.assertEqual(WHITE_PAWN_ATTACKS[E4], bits((4, 3), (4, 5)))
+        self.assertEqual(BLACK_PAWN_ATTACKS[E4], bits((2, 3), (2, 5)))
+        self.assertEqual(WHITE_PAWN_ATTACKS[square_index(1, 0)], bits((2, 1)))
+
+    def test_rook_attacks_stop_at_blockers(self) -> None:
+        occupied = bits((3, 6), (5, 4))
+        expected = bits(
+            (3, 0), (3, 1), (3, 2), (3, 3), (3, 5), (3, 6),
+            (0, 4), (1, 4), (2, 4), (4, 4), (5, 4),
+        )  # fmt: skip
+        self.assertEqual(rook_attacks(E4, occupied), expected)
+
+    def test_bishop_attacks_empty_board(self) -> None:
+        self.assertEqual(bishop_attacks(A1, 0), bits(*[(i, i) for i in range(1, 8)]))
+
+    def test_sliders_match_ray_walk(self) -> None:
+        rng = random.Random(1234)  # noqa: S311
+        rook_directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        bishop_directions = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
+        for _ in range(500):
+            square = rng.randrange(64)
+            occupied = rng.getrandbits(64) & rng.getrandbits(64)
+            rook = walk_slider(square, occupied, rook_directions)
+            bishop = walk_slider(square, occupied, bishop_directions)
+            self.assertEqual(rook_attacks(square, occupied), rook)
+            self.assertEqual(bishop_attacks(square, occupied), bishop)
+            self.assertEqual(queen_attacks(square, occupied), rook | bishop)
+
+
+if __name__ == "__main__":
+    unittest.main()
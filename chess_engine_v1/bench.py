@@ -0,0 +1,78 @@
+import fen
+
+# Positions searched by the bench command. They're searched to a fixed depth with an
+# empty transposition table, so the total node count only changes when the search
+# does. That makes it a signature for spotting unintended search changes, as well as
+# a speed measurement.
+BENCH_POSITIONS = [
+    ("startpos", fen.STARTING_GAME_FEN),
+    (
+        "kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    ),
+    (
+        "italian game",
+        "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    ),
+    (
+        "middlegame",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    ),
+    (
+        "queen and rooks",
+        "2r3k1/1q3pp1/p3p2p/1p1nP3/3P4/P2B1Q2/1P3PPP/2R3K1 b - - 0 25",
+    ),
+    (
+        "promotion with check",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    ),
+    ("en passant pins", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    ("back rank", "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"),
+    ("pawn endgame", "8/8/1p3k2/p1p5/P1P2K2/1P6/8/8 b - - 0 40"),
+    ("blocked pawns", "8/k7/3p4/p2P1p2/P2P1P2/8/8/K7 w - - 0 1"),
+]
+
+DEFAULT_BENCH_DEPTH = 4
+
+
+class BenchPosition:
+    def __init__(self, name: str, fen: str, nodes: int, ms: int, best_move: str):
+        self.name = name
+        self.fen = fen
+        self.nodes = nodes
+        self.ms = ms
+        self.best_move = best_move
+
+
+class BenchResult:
+    def __init__(self, depth: int, positions: list[BenchPosition]):
+        self.depth = depth
+        self.positions = positions
+        self.nodes = sum(position.nodes for position in positions)
+        self.ms = sum(position.ms for position in positions)
+        self.nps = self.nodes * 1000 // max(self.ms, 1)
+
+    def lines(self) -> list[str]:
+        # A line per position, then the totals. The node count is the signature.
+        lines = [
+            f"{position.name:<22} nodes {position.nodes:>8} {position.ms:>6} ms "
+            f"bestmove {position.best_move}"
+            for position in self.positions
+        ]
+        lines += [
+            "",
+            f"Depth: {self.depth}",
+            f"Total time (ms): {self.ms}",
+            f"Nodes searched: {self.nodes}",
+            f"Nodes/second: {self.nps}",
+        ]
+        return lines
+
+    def to_json(self) -> dict[str, object]:
+        return {
+            "depth": self.depth,
+            "positions": [vars(position) for position in self.positions],
+            "nodes": self.nodes,
+            "ms": self.ms,
+            "nps": self.nps,
+        }
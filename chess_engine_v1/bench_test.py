@@ -0,0 +1,30 @@
+import unittest
+
+from bench import BENCH_POSITIONS
+from chess_engine import bench
+
+
+class TestBench(unittest.TestCase):
+    def test_node_count_is_deterministic(self) -> None:
+        first = bench(2)
+        second = bench(2)
+        self.assertEqual(len(first.positions), len(BENCH_POSITIONS))
+        self.assertGreater(first.nodes, 0)
+        self.assertEqual(first.nodes, second.nodes)
+        self.assertEqual(
+            [position.best_move for position in first.positions],
+            [position.best_move for position in second.positions],
+        )
+
+    def test_report(self) -> None:
+        result = bench(1)
+        lines = result.lines()
+        self.assertIn(f"Nodes searched: {result.nodes}", lines)
+        self.assertRegex(lines[-1], "Nodes/second: [0-9]+")
+        summary = result.to_json()
+        self.assertEqual(summary["nodes"], result.nodes)
+        self.assertEqual(summary["depth"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+from collections.abc import Iterator
+
+# A bitboard is a 64-bit int with one bit per square. Square indices run from 0 (a1)
+# to 63 (h8), so the index of a square is row * 8 + col.
+
+BOARD_SIZE = 8
+
+EMPTY = 0
+FULL = 0xFFFF_FFFF_FFFF_FFFF
+
+FILE_A = 0x0101_0101_0101_0101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+
+RANK_1 = 0xFF
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_8 = RANK_1 << 56
+
+# Masks applied after shifting a bitboard sideways so squares don't wrap around onto
+# the other side of the board. Keyed by the column offset of the shift.
+_SHIFT_MASKS = {
+    -2: FULL ^ (FILE_G | FILE_H),
+    -1: FULL ^ FILE_H,
+    0: FULL,
+    1: FULL ^ FILE_A,
+    2: FULL ^ (FILE_A | FILE_B),
+}
+
+PIECE_CHARACTERS = "KQBNRPkqbnrp"
+
+
+def square_index(row: int, col: int) -> int:
+    return row * BOARD_SIZE + col
+
+
+def shift(bitboard: int, dr: int, dc: int) -> int:
+    # Move every square in the bitboard by (dr, dc), dropping squares that leave the
+    # board.
+    amount = dr * BOARD_SIZE + dc
+    shifted = bitboard << amount if amount > 0 else bitboard >> -amount
+    return shifted & _SHIFT_MASKS[dc]
+
+
+def iterate_squares(bitboard: int) -> Iterator[int]:
+    # Yield the index of every set bit, lowest first.
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        yield lowest_bit.bit_length() - 1
+        bitboard ^= lowest_bit
+
+
+class Bitboards:
+    def __init__(self, board: list[list[str]]):
+        # One set per piece character, plus occupancy sets for each side and both.
+        self.pieces = {piece: EMPTY for piece in PIECE_CHARACTERS}
+        self.white = EMPTY
+        self.black = EMPTY
+        self.occupied = EMPTY
+        for row, pieces in enumerate(board):
+            for col, piece in enumerate(pieces):
+                if piece != ".":
+                    self.add_piece(piece, square_index(row, col))
+
+    def copy(self) -> "Bitboards":
+        bitboards = Bitboards.__new__(Bitboards)
+        bitboards.pieces = self.pieces.copy()
+        bitboards.white = self.white
+        bitboards.black = self.black
+        bitboards.occupied = self.occupied
+        return bitboards
+
+    def add_piece(self, piece: str, square: int) -> None:
+        bit = 1 << square
+        self.pieces[piece] |= bit
+        if piece.isupper():
+            self.white |= bit
+        else:
+            self.black |= bit
+        self.occupied |= bit
+
+    def remove_piece(self, piece: str, square: int) -> None:
+        mask = FULL ^ (1 << square)
+        self.pieces[piece] &= mask
+        if piece.isupper():
+            self.white &= mask
+        else:
+            self.black &= mask
+        self.occupied &= mask
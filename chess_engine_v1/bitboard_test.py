@@ -0,0 +1,40 @@
+import unittest
+
+from bitboard import FILE_A, FILE_H, Bitboards, iterate_squares, shift, square_index
+
+
+class TestBitboard(unittest.TestCase):
+    def test_square_index(self) -> None:
+        self.assertEqual(square_index(0, 0), 0)
+        self.assertEqual(square_index(0, 7), 7)
+        self.assertEqual(square_index(7, 7), 63)
+
+    def test_iterate_squares(self) -> None:
+        self.assertEqual(list(iterate_squares(0)), [])
+        self.assertEqual(list(iterate_squares((1 << 3) | (1 << 63))), [3, 63])
+
+    def test_shift_does_not_wrap(self) -> None:
+        self.assertEqual(shift(FILE_H, 0, 1), 0)
+        self.assertEqual(shift(FILE_A, 0, -1), 0)
+        self.assertEqual(shift(FILE_A, 0, 1), FILE_A << 1)
+        self.assertEqual(shift(1 << 63, 1, 0), 0)
+        self.assertEqual(shift(1, -1, 0), 0)
+
+    def test_add_and_remove_piece(self) -> None:
+        board = [["."] * 8 for _ in range(8)]
+        board[0][4] = "K"
+        board[7][4] = "k"
+        bitboards = Bitboards(board)
+        self.assertEqual(bitboards.pieces["K"], 1 << 4)
+        self.assertEqual(bitboards.black, 1 << 60)
+        self.assertEqual(bitboards.occupied, (1 << 4) | (1 << 60))
+
+        bitboards.add_piece("q", 0)
+        self.assertEqual(bitboards.black, (1 << 60) | 1)
+        bitboards.remove_piece("q", 0)
+        self.assertEqual(bitboards.pieces["q"], 0)
+        self.assertEqual(bitboards.occupied, (1 << 4) | (1 << 60))
+
+
+if __name__ == "__main__":
+    unittest.main()
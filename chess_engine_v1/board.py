@@ -1,8 +1,45 @@
 import enum
 
+import evaluation
 import fen
-from move import Move
-from square import Squares
+import zobrist
+from attack_tables import (
+    ALL_DIRECTIONS,
+    BETWEEN,
+    BLACK_PAWN_ATTACKS,
+    DIAGONAL_DIRECTIONS,
+    KING_ATTACKS,
+    KNIGHT_ATTACKS,
+    LINE,
+    RAYS,
+    VERTICAL_AND_HORIZONTAL_DIRECTIONS,
+    WHITE_PAWN_ATTACKS,
+    bishop_attacks,
+    queen_attacks,
+    rook_attacks,
+)
+from bitboard import (
+    FULL,
+    RANK_1,
+    RANK_3,
+    RANK_6,
+    RANK_8,
+    Bitboards,
+    iterate_squares,
+    shift,
+    square_index,
+)
+from move import (
+    CAPTURE_FLAG,
+    END_SHIFT,
+    PROMOTION_CODES,
+    PROMOTION_MASK,
+    PROMOTION_SHIFT,
+    SQUARE_MASK,
+    Move,
+    uci_notation,
+)
+from square import Square, Squares
 
 
 class Player(enum.Enum):
@@ -10,6 +47,35 @@ class Player(enum.Enum):
     BLACK = 2
 
 
+class CastlingRights(enum.IntFlag):
+    NONE = 0
+    WHITE_KINGSIDE = 1
+    WHITE_QUEENSIDE = 2
+    BLACK_KINGSIDE = 4
+    BLACK_QUEENSIDE = 8
+
+    @classmethod
+    def from_fen(cls, castling: str) -> "CastlingRights":
+        rights = cls.NONE
+        for character, right in [
+            ("K", cls.WHITE_KINGSIDE),
+            ("Q", cls.WHITE_QUEENSIDE),
+            ("k", cls.BLACK_KINGSIDE),
+            ("q", cls.BLACK_QUEENSIDE),
+        ]:
+            if character in castling:
+                rights |= right
+        return rights
+
+
+class BoardRepresentation(enum.Enum):
+    # Both representations keep the nested list in Board.board up to date. The
+    # bitboard representation also keeps a Bitboards instance in sync and uses it to
+    # generate moves.
+    LISTS = 1
+    BITBOARDS = 2
+
+
 class Pieces(enum.StrEnum):
     WHITE_KING = "K"
     WHITE_QUEEN = "Q"
@@ -25,24 +91,206 @@ class Pieces(enum.StrEnum):
     BLACK_PAWN = "p"
 
 
-DIAGONAL_DIRECTIONS = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
-VERTICAL_AND_HORIZONTAL_DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-ALL_DIRECTIONS = VERTICAL_AND_HORIZONTAL_DIRECTIONS + DIAGONAL_DIRECTIONS
-KNIGHT_MOVES = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
-
 BOARD_SIZE = 8
+# The byte stored in Board.squares for an empty square.
+_EMPTY_SQUARE = ord(".")
+# The bytes in Board.squares for each side's pieces other than pawns and the king.
+_WHITE_PIECES = [ord(piece) for piece in "NBRQ"]
+_BLACK_PIECES = [ord(piece) for piece in "nbrq"]
+# Black pieces' bytes are lower case letters, which come after all the upper case ones.
+_FIRST_BLACK_PIECE = ord("a")
+# For each side, by whether it's white: the bytes in Board.squares of its pawn, knight
+# and king, and of its pieces that attack along diagonals and along straight lines.
+_ATTACKING_PIECES = {
+    True: (ord("P"), ord("N"), ord("K"), b"BQ", b"RQ"),
+    False: (ord("p"), ord("n"), ord("k"), b"bq", b"rq"),
+}
+# A position's squares, one byte per square index, and its (turn, castling rights,
+# en-passant square index or -1). See Board.snapshot.
+BoardSnapshot = tuple[bytes, tuple[int, int, int]]
+
+# Moving a piece from, or capturing a piece on, one of these squares loses the
+# matching castling rights.
+_CASTLING_RIGHTS_LOST = {
+    square_index(0, 0): CastlingRights.WHITE_QUEENSIDE,
+    square_index(0, 4): CastlingRights.WHITE_KINGSIDE | CastlingRights.WHITE_QUEENSIDE,
+    square_index(0, 7): CastlingRights.WHITE_KINGSIDE,
+    square_index(7, 0): CastlingRights.BLACK_QUEENSIDE,
+    square_index(7, 4): CastlingRights.BLACK_KINGSIDE | CastlingRights.BLACK_QUEENSIDE,
+    square_index(7, 7): CastlingRights.BLACK_KINGSIDE,
+}
+# The rights kept when a move touches each square. These are plain ints as IntFlag
+# operations are too slow for make_move.
+_CASTLING_RIGHTS_KEPT = [
+    int(~_CASTLING_RIGHTS_LOST.get(square, CastlingRights.NONE))
+    for square in range(BOARD_SIZE * BOARD_SIZE)
+]
+# For each side's castling moves: the right needed, the king's start square, the
+# square it passes over, its end square, and the squares that must be empty.
+_CASTLING_MOVES = {
+    Player.WHITE: [
+        (
+            int(CastlingRights.WHITE_KINGSIDE),
+            square_index(0, 4),
+            square_index(0, 5),
+            square_index(0, 6),
+            1 << square_index(0, 5) | 1 << square_index(0, 6),
+        ),
+        (
+            int(CastlingRights.WHITE_QUEENSIDE),
+            square_index(0, 4),
+            square_index(0, 3),
+            square_index(0, 2),
+            1 << square_index(0, 1) | 1 << square_index(0, 2) | 1 << square_index(0, 3),
+        ),
+    ],
+    Player.BLACK: [
+        (
+            int(CastlingRights.BLACK_KINGSIDE),
+            square_index(7, 4),
+            square_index(7, 5),
+            square_index(7, 6),
+            1 << square_index(7, 5) | 1 << square_index(7, 6),
+        ),
+        (
+            int(CastlingRights.BLACK_QUEENSIDE),
+            square_index(7, 4),
+            square_index(7, 3),
+            square_index(7, 2),
+            1 << square_index(7, 1) | 1 << square_index(7, 2) | 1 << square_index(7, 3),
+        ),
+    ],
+}
 
 
 class Board:
-    def __init__(self, fen_str: str | None = None):
+    def __init__(
+        self,
+        fen_str: str | None = None,
+        representation: BoardRepresentation = BoardRepresentation.LISTS,
+    ):
         # Initialize the board using FEN notation if present.
         # Otherwise default to an empty board.
+        turn = Player.WHITE
+        castling_rights = int(CastlingRights.NONE)
+        en_passant = None
         if fen_str:
             fen_record = fen.FENRecord(fen_str)
-            self.board = fen_record.board()
+            board = fen_record.board()
+            if fen_record.active_color == "b":
+                turn = Player.BLACK
+            castling_rights = int(CastlingRights.from_fen(fen_record.castling))
+            if fen_record.en_passant != "-":
+                en_passant = Squares.square_from_algebraic(fen_record.en_passant)
         else:
-            self.board = [["."] * int(BOARD_SIZE) for _ in range(BOARD_SIZE)]
-        self.turn = Player.WHITE
+            board = [["."] * int(BOARD_SIZE) for _ in range(BOARD_SIZE)]
+        self._set_up(board, turn, castling_rights, en_passant, representation)
+        if fen_str:
+            self.halfmove_clock = fen_record.halfmove_clock
+
+    def _set_up(
+        self,
+        board: list[list[str]],
+        turn: Player,
+        castling_rights: int,
+        en_passant: Square | None,
+        representation: BoardRepresentation,
+    ) -> None:
+        self.board = board
+        self.turn = turn
+        # A CastlingRights bit mask, stored as an int for speed.
+        self.castling_rights = castling_rights
+        # The square a pawn skipped over with a double move on the last turn.
+        self.en_passant = en_passant
+        # The pieces again as one byte, the piece's character, per square index. The
+        # whole position can be copied or sent to another process in one go, see
+        # snapshot.
+        self.squares = bytearray("".join("".join(row) for row in board), "ascii")
+        self.representation = representation
+        self.bitboards = (
+            Bitboards(self.board)
+            if representation == BoardRepresentation.BITBOARDS
+            else None
+        )
+        # 64-bit hash of the position, kept up to date by make_move and undo_move.
+        self.zobrist_key = zobrist.compute_key(
+            self.board,
+            self.turn == Player.BLACK,
+            self.castling_rights,
+            self.en_passant.col if self.en_passant else None,
+        )
+        # Material plus piece-square scores for the middlegame and endgame, and the
+        # game phase used to blend them, kept up to date by make_move and undo_move.
+        self.middlegame_score, self.endgame_score, self.phase = evaluation.compute(
+            self.board
+        )
+        # Moves since the last capture or pawn move. Positions from before then can't
+        # come up again.
+        self.halfmove_clock = 0
+        # The Zobrist keys of the positions before each move made, for spotting
+        # repetitions.
+        self.key_history: list[int] = []
+        # The castling rights, en-passant square, captured piece (or ".") and halfmove
+        # clock from before each move made, so undo_move can restore them.
+        self._history: list[tuple[int, Square | None, str, int]] = []
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot: BoardSnapshot,
+        representation: BoardRepresentation = BoardRepresentation.LISTS,
+    ) -> "Board":
+        # Rebuild a board from a snapshot. The moves made before the snapshot was
+        # taken can't be undone.
+        squares, (turn, castling_rights, en_passant) = snapshot
+        board = [
+            list(squares[row * BOARD_SIZE : (row + 1) * BOARD_SIZE].decode("ascii"))
+            for row in range(BOARD_SIZE)
+        ]
+        new_board = cls.__new__(cls)
+        new_board._set_up(
+            board,
+            Player(turn),
+            castling_rights,
+            Squares.square_from_index(en_passant) if en_passant >= 0 else None,
+            representation,
+        )
+        return new_board
+
+    def snapshot(self) -> BoardSnapshot:
+        # The position in a form that's small and cheap to make, e.g. for handing
+        # positions to other processes.
+        return bytes(self.squares), (
+            self.turn.value,
+            self.castling_rights,
+            self.en_passant.index if self.en_passant else -1,
+        )
+
+    def copy(self) -> "Board":
+        # A board that can be changed without changing this one, e.g. for copy-make
+        # searches. The incrementally updated state is copied rather than worked out
+        # again, and moves made before the copy can still be undone.
+        board = Board.__new__(Board)
+        board.board = [row.copy() for row in self.board]
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.en_passant = self.en_passant
+        board.squares = self.squares.copy()
+        board.representation = self.representation
+        board.bitboards = self.bitboards.copy() if self.bitboards else None
+        board.zobrist_key = self.zobrist_key
+        board.middlegame_score = self.middlegame_score
+        board.endgame_score = self.endgame_score
+        board.phase = self.phase
+        board.halfmove_clock = self.halfmove_clock
+        board.key_history = self.key_history.copy()
+        board._history = self._history.copy()
+        return board
+
+    def __reduce__(self) -> tuple[object, ...]:
+        # Pickle boards as snapshots, which are a fraction of the size. Like
+        # from_snapshot, the unpickled board can't undo earlier moves.
+        return Board.from_snapshot, (self.snapshot(), self.representation)
 
     def display(self) -> None:
         # Print the board state
@@ -82,36 +330,253 @@ class Board:
 
     def generate_moves(self) -> list[Move]:
         # Generate all legal moves for the current player
+        if self.bitboards:
+            return [
+                self.decode_move(move)
+                for move in self._generate_bitboard_moves(self.bitboards)
+            ]
+
+        legality = self._list_legality()
         moves = []
         for r in range(BOARD_SIZE):
             for c in range(BOARD_SIZE):
                 piece = self.board[r][c]
                 if self._piece_owned_by_current_player(piece):
-                    moves.extend(self.generate_piece_moves(r, c))
+                    moves.extend(self.generate_piece_moves(r, c, legality))
+        return moves
+
+    def generate_encoded_moves(
+        self, captures: bool = True, quiets: bool = True
+    ) -> list[int]:
+        # Generate moves encoded as ints, see move.py, so searching doesn't create an
+        # object per move. Captures and quiet moves can be generated separately, so
+        # captures can be searched before the rest are generated.
+        if self.bitboards:
+            return self._generate_bitboard_moves(self.bitboards, captures, quiets)
+        moves = [move.encode() for move in self.generate_moves()]
+        # Promotions go with the captures, as in _generate_bitboard_pawn_moves.
+        loud = CAPTURE_FLAG | PROMOTION_MASK << PROMOTION_SHIFT
+        if not captures:
+            moves = [move for move in moves if not move & loud]
+        if not quiets:
+            moves = [move for move in moves if move & loud]
         return moves
 
-    def generate_piece_moves(self, r: int, c: int) -> list[Move]:
-        # Generate legal moves for a specific piece
+    def is_valid_move(self, encoded: int) -> bool:
+        # Whether an encoded move, e.g. one remembered from another position, can be
+        # made in this position.
+        start = encoded & SQUARE_MASK
+        row, col = divmod(start, BOARD_SIZE)
+        piece = self.board[row][col]
+        if piece == "." or not self._piece_owned_by_current_player(piece):
+            return False
+        if self.bitboards:
+            return encoded in self._generate_bitboard_moves(
+                self.bitboards, starts=1 << start
+            )
+        return any(
+            move.encode() == encoded for move in self.generate_piece_moves(row, col)
+        )
+
+    def decode_move(self, encoded: int) -> Move:
+        # Build the Move for an encoded move. Only valid before the move is made.
+        start = encoded & SQUARE_MASK
+        end = encoded >> END_SHIFT & SQUARE_MASK
+        start_row, start_col = divmod(start, BOARD_SIZE)
+        end_row, end_col = divmod(end, BOARD_SIZE)
+        piece_moved = self.board[start_row][start_col]
+        piece_captured = None
+        if encoded & CAPTURE_FLAG:
+            piece_captured = self.board[end_row][end_col]
+            if piece_captured == ".":
+                # En passant, which captures the pawn beside the end square.
+                piece_captured = self.board[start_row][end_col]
+        promotion = encoded >> PROMOTION_SHIFT & PROMOTION_MASK
+        promotion_piece = None
+        if promotion:
+            promotion_piece = PROMOTION_CODES[promotion - 1]
+            if piece_moved.isupper():
+                promotion_piece = promotion_piece.upper()
+        return Move(
+            Squares.square_from_index(start),
+            Squares.square_from_index(end),
+            piece_moved,
+            piece_captured,
+            promotion_piece,
+        )
 
-        # TODO: ChatGPT: Remove moves that expose the king to capture.
+    def parse_uci_move(self, text: str) -> int | None:
+        # The legal move written in UCI's long algebraic notation, e.g. e2e4 or e7e8q,
+        # encoded, or None if there isn't one.
+        for move in self.generate_encoded_moves():
+            if uci_notation(move) == text:
+                return move
+        return None
+
+    def is_square_attacked(self, square: int, by_white: bool) -> bool:
+        if self.bitboards:
+            bitboards = self.bitboards
+            return bool(
+                _attackers(bitboards.pieces, square, by_white, bitboards.occupied)
+            )
+        return bool(self._list_attackers(square, by_white))
+
+    def in_check(self) -> bool:
+        # Whether the side to move's king is attacked.
+        white = self.turn == Player.WHITE
+        king = self._king_square(white)
+        return king is not None and self.is_square_attacked(king, not white)
+
+    def _list_attackers(self, square: int, by_white: bool, ignore: int = -1) -> int:
+        # The pieces of one side attacking a square, as a bitboard, for the nested
+        # list representation, which has no bitboards to look them up in. Looks
+        # outwards from the square over Board.squares, treating ignore as empty.
+        squares = self.squares
+        pawn, knight, king, diagonal_sliders, straight_sliders = _ATTACKING_PIECES[
+            by_white
+        ]
+        # A white pawn attacks the square if a black pawn on the square would attack
+        # the white pawn.
+        pawn_attacks = (
+            BLACK_PAWN_ATTACKS[square] if by_white else WHITE_PAWN_ATTACKS[square]
+        )
+        attackers = 0
+        for attacks, attacker in (
+            (pawn_attacks, pawn),
+            (KNIGHT_ATTACKS[square], knight),
+            (KING_ATTACKS[square], king),
+        ):
+            for start in iterate_squares(attacks):
+                if squares[start] == attacker:
+                    attackers |= 1 << start
+        for directions, sliders in (
+            (DIAGONAL_DIRECTIONS, diagonal_sliders),
+            (VERTICAL_AND_HORIZONTAL_DIRECTIONS, straight_sliders),
+        ):
+            for direction in directions:
+                for start in RAYS[direction][square]:
+                    piece = squares[start]
+                    if piece == _EMPTY_SQUARE or start == ignore:
+                        continue
+                    if piece in sliders:
+                        attackers |= 1 << start
+                    break
+        return attackers
+
+    def _list_legality(self) -> tuple[int, int, int]:
+        # The side to move's king square (or -1), check mask and pinned pieces, as
+        # worked out in _generate_bitboard_moves, for the nested list generators.
+        # Worked out once per position, so moves don't have to be made to check them.
+        white = self.turn == Player.WHITE
+        king = self._king_square(white)
+        if king is None:
+            return -1, FULL, 0
+        checkers = self._list_attackers(king, not white)
+        check_mask = FULL
+        if checkers & (checkers - 1):
+            check_mask = 0
+        elif checkers:
+            check_mask = checkers | BETWEEN[king][checkers.bit_length() - 1]
+        # A piece is pinned if it's the only one between the king and an enemy
+        # slider that moves along that line.
+        _, _, _, diagonal_sliders, straight_sliders = _ATTACKING_PIECES[not white]
+        squares = self.squares
+        pinned = 0
+        for directions, sliders in (
+            (DIAGONAL_DIRECTIONS, diagonal_sliders),
+            (VERTICAL_AND_HORIZONTAL_DIRECTIONS, straight_sliders),
+        ):
+            for direction in directions:
+                blocker = -1
+                for square in RAYS[direction][king]:
+                    piece = squares[square]
+                    if piece == _EMPTY_SQUARE:
+                        continue
+                    if blocker < 0 and (piece < _FIRST_BLACK_PIECE) == white:
+                        blocker = square
+                        continue
+                    if blocker >= 0 and piece in sliders:
+                        pinned |= 1 << blocker
+                    break
+        return king, check_mask, pinned
+
+    def _is_legal_list_move(self, move: int, legality: tuple[int, int, int]) -> bool:
+        # Whether a move from the nested list generators leaves the mover's king
+        # safe, given the position's _list_legality.
+        king, check_mask, pinned = legality
+        start = move & SQUARE_MASK
+        end = move >> END_SHIFT & SQUARE_MASK
+        if start == king:
+            # Castling moves are only generated if they're legal.
+            if abs(end - start) == 2:
+                return True
+            # The king can't stay on a line it's being checked along, so it's taken
+            # off the board while checking the square it goes to.
+            return not self._list_attackers(end, self.turn == Player.BLACK, ignore=king)
+        if (
+            move & CAPTURE_FLAG
+            and self.squares[end] == _EMPTY_SQUARE
+            and self.squares[start] in b"Pp"
+        ):
+            # En passant takes two pawns off the same rank at once, which can uncover
+            # a check no pin would catch. It's rare enough to check by making it.
+            return self._leaves_king_safe(move)
+        if not check_mask >> end & 1:
+            return False
+        return not pinned >> start & 1 or bool(LINE[king][start] >> end & 1)
+
+    def _leaves_king_safe(self, encoded: int) -> bool:
+        # Whether making a move leaves the mover's king safe, by making it.
+        white = self.turn == Player.WHITE
+        self.make_encoded_move(encoded)
+        king = self._king_square(white)
+        legal = king is None or not self.is_square_attacked(king, not white)
+        self.undo_encoded_move(encoded)
+        return legal
+
+    def _king_square(self, white: bool) -> int | None:
+        king = Pieces.WHITE_KING if white else Pieces.BLACK_KING
+        if self.bitboards:
+            kings = self.bitboards.pieces[king]
+            return kings.bit_length() - 1 if kings else None
+        square = self.squares.find(ord(king))
+        return square if square >= 0 else None
+
+    def move_from_encoding(self, encoded: int) -> Move | None:
+        # Rebuild a move from its encoding. Returns None if it isn't a move in this
+        # position.
+        return self.decode_move(encoded) if self.is_valid_move(encoded) else None
+
+    def generate_piece_moves(
+        self, r: int, c: int, legality: tuple[int, int, int] | None = None
+    ) -> list[Move]:
+        # Generate legal moves for a specific piece. The piece generators below
+        # don't check whether a move exposes the king, so their moves are checked
+        # against the position's _list_legality, which can be passed in when
+        # generating moves for every piece.
+        if legality is None:
+            legality = self._list_legality()
         piece = self.board[r][c]
         if piece.upper() == Pieces.WHITE_PAWN:
-            return self.generate_pawn_moves(r, c)
+            moves = self.generate_pawn_moves(r, c)
         elif piece.upper() == Pieces.WHITE_ROOK:
-            return self.generate_rook_moves(r, c)
+            moves = self.generate_rook_moves(r, c)
         elif piece.upper() == Pieces.WHITE_KNIGHT:
-            return self.generate_knight_moves(r, c)
+            moves = self.generate_knight_moves(r, c)
         elif piece.upper() == Pieces.WHITE_BISHOP:
-            return self.generate_bishop_moves(r, c)
+            moves = self.generate_bishop_moves(r, c)
         elif piece.upper() == Pieces.WHITE_QUEEN:
-            return self.generate_queen_moves(r, c)
+            moves = self.generate_queen_moves(r, c)
         elif piece.upper() == Pieces.WHITE_KING:
-            return self.generate_king_moves(r, c)
-
-        raise Exception(f"Trying to generate moves for an unknown piece, {piece}")
+            moves = self.generate_king_moves(r, c)
+        else:
+            raise Exception(f"Trying to generate moves for an unknown piece, {piece}")
+        return [
+            move for move in moves if self._is_legal_list_move(move.encode(), legality)
+        ]
 
     def generate_pawn_moves(self, r: int, c: int) -> list[Move]:
-        # Generate legal pawn moves
+        # Generate pawn moves
         moves = []
         direction = 1 if self.turn == Player.WHITE else -1
         start_row = 1 if self.turn == Player.WHITE else 6
@@ -124,18 +589,36 @@ class Board:
                 moves.append(self._create_move(r, c, r + 2 * direction, c))
 
         # Captures
-        # TODO: ChatGPT: Handle en-passant captures.
         for dc in [-1, 1]:
             new_r = r + direction
             new_c = c + dc
-            if (
-                0 <= new_c < BOARD_SIZE
-                and self.board[new_r][new_c] != "."
-                and self._piece_capturable_by_current_player(self.board[new_r][new_c])
+            if not 0 <= new_c < BOARD_SIZE:
+                continue
+            if self.board[new_r][
+                new_c
+            ] != "." and self._piece_capturable_by_current_player(
+                self.board[new_r][new_c]
             ):
                 moves.append(self._create_move(r, c, new_r, new_c))
+            elif self.en_passant == Squares.square_from_row_col(new_r, new_c):
+                # The captured pawn is beside this one rather than on the end square.
+                move = self._create_move(r, c, new_r, new_c)
+                move.piece_captured = self.board[r][new_c]
+                moves.append(move)
 
-        # TODO: ChatGPT: Handle promotion when the pawn reaches the final row.
+        # Promotions, one move per piece the pawn can become.
+        if r + direction in (0, BOARD_SIZE - 1):
+            moves = [
+                Move(
+                    move.start,
+                    move.end,
+                    move.piece_moved,
+                    move.piece_captured,
+                    promotion if self.turn == Player.WHITE else promotion.lower(),
+                )
+                for move in moves
+                for promotion in "QRBN"
+            ]
 
         return moves
 
@@ -151,65 +634,474 @@ class Board:
         # Generate legal queen moves
         return self.generate_sliding_moves(r, c, ALL_DIRECTIONS)
 
-    def _on_board(self, r: int, c: int) -> bool:
-        return 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE
-
     def generate_sliding_moves(
         self, r: int, c: int, directions: list[tuple[int, int]]
     ) -> list[Move]:
         # Generate sliding moves for rooks, bishops, and queens.
-        piece = self.board[r][c]  # noqa
         moves = []
-        for dr, dc in directions:
-            nr, nc = r + dr, c + dc
-            while self._on_board(nr, nc):
+        start = square_index(r, c)
+        for direction in directions:
+            for end in RAYS[direction][start]:
+                nr, nc = divmod(end, BOARD_SIZE)
                 if self.board[nr][nc] == ".":
                     moves.append(self._create_move(r, c, nr, nc))
                 elif self._piece_capturable_by_current_player(self.board[nr][nc]):
                     # If we can capture a piece on this square, we can't go further.
                     moves.append(self._create_move(r, c, nr, nc))
                     break
-
-                nr += dr
-                nc += dc
+                else:
+                    # Our own piece blocks the rest of this direction.
+                    break
         return moves
 
     def generate_knight_moves(self, r: int, c: int) -> list[Move]:
         # Generate legal knight moves
         moves = []
-        for dr, dc in KNIGHT_MOVES:
-            nr, nc = r + dr, c + dc
-            if self._on_board(nr, nc):
-                if self.board[nr][
-                    nc
-                ] == "." or self._piece_capturable_by_current_player(
-                    self.board[nr][nc]
-                ):
-                    moves.append(self._create_move(r, c, nr, nc))
+        for end in iterate_squares(KNIGHT_ATTACKS[square_index(r, c)]):
+            nr, nc = divmod(end, BOARD_SIZE)
+            if self.board[nr][nc] == "." or self._piece_capturable_by_current_player(
+                self.board[nr][nc]
+            ):
+                moves.append(self._create_move(r, c, nr, nc))
         return moves
 
     def generate_king_moves(self, r: int, c: int) -> list[Move]:
-        # Generate legal king moves
+        # Generate king moves
         moves = []
-        for dr, dc in ALL_DIRECTIONS:
-            nr, nc = r + dr, c + dc
-            if self._on_board(nr, nc):
-                if self.board[nr][nc] == "." or self._piece_owned_by_current_player(
-                    self.board[nr][nc]
+        start = square_index(r, c)
+        for end in iterate_squares(KING_ATTACKS[start]):
+            nr, nc = divmod(end, BOARD_SIZE)
+            if self.board[nr][nc] == "." or self._piece_capturable_by_current_player(
+                self.board[nr][nc]
+            ):
+                moves.append(self._create_move(r, c, nr, nc))
+        # Only the squares castling needs to be empty are looked at.
+        occupied = 0
+        for _, _, _, _, between in _CASTLING_MOVES[self.turn]:
+            for square in iterate_squares(between):
+                if self.squares[square] != _EMPTY_SQUARE:
+                    occupied |= 1 << square
+        castling: list[int] = []
+        self._add_castling_moves(castling, occupied)
+        moves.extend(
+            self.decode_move(move) for move in castling if move & SQUARE_MASK == start
+        )
+        return moves
+
+    def _generate_bitboard_moves(
+        self,
+        bitboards: Bitboards,
+        captures: bool = True,
+        quiets: bool = True,
+        starts: int = FULL,
+    ) -> list[int]:
+        # Generate the same moves as the nested list generators, but using set-wise
+        # operations on the bitboards instead of scanning all 64 squares, and
+        # without making each move to check it's legal. Captures (including
+        # promotions) and quiet moves can be generated separately, and generation
+        # can be limited to pieces on the starts squares.
+        pieces = bitboards.pieces
+        white = self.turn == Player.WHITE
+        if white:
+            own = bitboards.white
+            enemy = bitboards.black
+            pawns, knights, bishops, rooks, queens, kings = (
+                pieces[Pieces.WHITE_PAWN],
+                pieces[Pieces.WHITE_KNIGHT],
+                pieces[Pieces.WHITE_BISHOP],
+                pieces[Pieces.WHITE_ROOK],
+                pieces[Pieces.WHITE_QUEEN],
+                pieces[Pieces.WHITE_KING],
+            )
+            enemy_queens = pieces[Pieces.BLACK_QUEEN]
+            enemy_straight_sliders = pieces[Pieces.BLACK_ROOK] | enemy_queens
+            enemy_diagonal_sliders = pieces[Pieces.BLACK_BISHOP] | enemy_queens
+        else:
+            own = bitboards.black
+            enemy = bitboards.white
+            pawns, knights, bishops, rooks, queens, kings = (
+                pieces[Pieces.BLACK_PAWN],
+                pieces[Pieces.BLACK_KNIGHT],
+                pieces[Pieces.BLACK_BISHOP],
+                pieces[Pieces.BLACK_ROOK],
+                pieces[Pieces.BLACK_QUEEN],
+                pieces[Pieces.BLACK_KING],
+            )
+            enemy_queens = pieces[Pieces.WHITE_QUEEN]
+            enemy_straight_sliders = pieces[Pieces.WHITE_ROOK] | enemy_queens
+            enemy_diagonal_sliders = pieces[Pieces.WHITE_BISHOP] | enemy_queens
+        occupied = bitboards.occupied
+        targets = 0
+        if captures:
+            targets |= enemy
+        if quiets:
+            targets |= FULL ^ occupied
+
+        # Work out once which moves can be legal, rather than making each move to
+        # see whether it leaves the king in check. When in check, moves other than
+        # the king's have to capture the checking piece or block it, and a piece
+        # pinned to the king can only move along the pin.
+        king = kings.bit_length() - 1
+        checkers = pinned = 0
+        check_mask = FULL
+        if kings:
+            checkers = _attackers(pieces, king, not white, occupied)
+            if checkers & (checkers - 1):
+                # Double check, so only the king can move.
+                check_mask = 0
+            elif checkers:
+                check_mask = checkers | BETWEEN[king][checkers.bit_length() - 1]
+            # Enemy sliders that would attack the king if nothing was in the way.
+            snipers = rook_attacks(king, 0) & enemy_straight_sliders
+            snipers |= bishop_attacks(king, 0) & enemy_diagonal_sliders
+            for sniper in iterate_squares(snipers):
+                blockers = BETWEEN[king][sniper] & occupied
+                if blockers & own and not blockers & (blockers - 1):
+                    pinned |= blockers
+        piece_targets = targets & check_mask
+
+        moves = self._generate_bitboard_pawn_moves(
+            pawns & starts, enemy, occupied, captures, quiets, check_mask
+        )
+        if pinned & pawns:
+            moves = [
+                move
+                for move in moves
+                if not pinned >> (move & SQUARE_MASK) & 1
+                or LINE[king][move & SQUARE_MASK] >> (move >> END_SHIFT & SQUARE_MASK)
+                & 1
+            ]
+        if captures and self.en_passant:
+            self._add_en_passant_moves(
+                moves, pawns & starts, pieces, king, occupied, self.en_passant.index
+            )
+        # A pinned knight can never stay on the line of the pin.
+        for start in iterate_squares(knights & starts & ~pinned):
+            self._add_bitboard_moves(
+                moves, start, KNIGHT_ATTACKS[start] & piece_targets, enemy
+            )
+        for start in iterate_squares(kings & starts):
+            # The king can't stay on a line it's being checked along, so it's taken
+            # off the board while checking where it can go.
+            without_king = occupied ^ kings
+            ends = KING_ATTACKS[start] & targets
+            for end in iterate_squares(ends):
+                if _attackers(pieces, end, not white, without_king):
+                    ends ^= 1 << end
+            self._add_bitboard_moves(moves, start, ends, enemy)
+            if quiets and not checkers:
+                self._add_castling_moves(moves, occupied)
+        for start in iterate_squares(rooks & starts):
+            ends = rook_attacks(start, occupied) & piece_targets
+            if pinned >> start & 1:
+                ends &= LINE[king][start]
+            self._add_bitboard_moves(moves, start, ends, enemy)
+        for start in iterate_squares(bishops & starts):
+            ends = bishop_attacks(start, occupied) & piece_targets
+            if pinned >> start & 1:
+                ends &= LINE[king][start]
+            self._add_bitboard_moves(moves, start, ends, enemy)
+        for start in iterate_squares(queens & starts):
+            ends = queen_attacks(start, occupied) & piece_targets
+            if pinned >> start & 1:
+                ends &= LINE[king][start]
+            self._add_bitboard_moves(moves, start, ends, enemy)
+        return moves
+
+    def _generate_bitboard_pawn_moves(
+        self,
+        pawns: int,
+        enemy: int,
+        occupied: int,
+        captures: bool,
+        quiets: bool,
+        check_mask: int,
+    ) -> list[int]:
+        # Promotions are generated with the captures, as they also change the
+        # material on the board. En passant is left to _add_en_passant_moves.
+        moves: list[int] = []
+        white = self.turn == Player.WHITE
+        direction = 1 if white else -1
+        forward = direction * BOARD_SIZE
+        last_rank = RANK_8 if white else RANK_1
+        empty = FULL ^ occupied
+        if white:
+            single_pushes = (pawns << BOARD_SIZE) & empty
+            double_pushes = ((single_pushes & RANK_3) << BOARD_SIZE) & empty
+        else:
+            single_pushes = (pawns >> BOARD_SIZE) & empty
+            double_pushes = ((single_pushes & RANK_6) >> BOARD_SIZE) & empty
+        single_pushes &= check_mask
+        double_pushes &= check_mask
+
+        if quiets:
+            for end in iterate_squares(single_pushes & ~last_rank):
+                moves.append(end - forward | end << END_SHIFT)
+            for end in iterate_squares(double_pushes):
+                moves.append(end - 2 * forward | end << END_SHIFT)
+
+        if captures:
+            for end in iterate_squares(single_pushes & last_rank):
+                self._add_promotions(moves, end - forward | end << END_SHIFT)
+            for dc in [-1, 1]:
+                for end in iterate_squares(
+                    shift(pawns, direction, dc) & enemy & check_mask
                 ):
-                    moves.append(self._create_move(r, c, nr, nc))
+                    move = end - forward - dc | end << END_SHIFT | CAPTURE_FLAG
+                    if last_rank >> end & 1:
+                        self._add_promotions(moves, move)
+                    else:
+                        moves.append(move)
         return moves
 
+    def _add_en_passant_moves(
+        self,
+        moves: list[int],
+        pawns: int,
+        pieces: dict[str, int],
+        king: int,
+        occupied: int,
+        end: int,
+    ) -> None:
+        # En passant takes two pawns off the same rank at once, which can uncover a
+        # check no pin would catch. It's rare enough that each capture is checked
+        # by looking for attackers after it.
+        white = self.turn == Player.WHITE
+        captured = end - BOARD_SIZE if white else end + BOARD_SIZE
+        # The pawns that could capture onto the square, found by looking back from it
+        # as an enemy pawn.
+        pawn_attacks = BLACK_PAWN_ATTACKS[end] if white else WHITE_PAWN_ATTACKS[end]
+        for start in iterate_squares(pawn_attacks & pawns):
+            after = occupied ^ (1 << start | 1 << captured | 1 << end)
+            if king < 0 or not (
+                _attackers(pieces, king, not white, after) & ~(1 << captured)
+            ):
+                moves.append(start | end << END_SHIFT | CAPTURE_FLAG)
+
+    def _add_promotions(self, moves: list[int], move: int) -> None:
+        # One move per promotion piece, queen first.
+        for promotion in range(len(PROMOTION_CODES), 0, -1):
+            moves.append(move | promotion << PROMOTION_SHIFT)
+
+    def _add_castling_moves(self, moves: list[int], occupied: int) -> None:
+        # The rights are lost as soon as the king or rook moves, so both are known to
+        # be in place. The king can't castle out of, through or into check.
+        by_white = self.turn == Player.BLACK
+        for right, start, passing, end, between in _CASTLING_MOVES[self.turn]:
+            if (
+                self.castling_rights & right
+                and not occupied & between
+                and not self.is_square_attacked(start, by_white)
+                and not self.is_square_attacked(passing, by_white)
+                and not self.is_square_attacked(end, by_white)
+            ):
+                moves.append(start | end << END_SHIFT)
+
+    def _add_bitboard_moves(
+        self, moves: list[int], start: int, ends: int, enemy: int
+    ) -> None:
+        for end in iterate_squares(ends & enemy):
+            moves.append(start | end << END_SHIFT | CAPTURE_FLAG)
+        for end in iterate_squares(ends & ~enemy):
+            moves.append(start | end << END_SHIFT)
+
+    def _switch_turn(self) -> None:
+        self.turn = Player.BLACK if self.turn == Player.WHITE else Player.WHITE
+        self.zobrist_key ^= zobrist.BLACK_TO_MOVE_KEY
+
+    def _add_piece(self, piece: str, row: int, col: int) -> None:
+        self.board[row][col] = piece
+        index = square_index(row, col)
+        self.squares[index] = ord(piece)
+        self.zobrist_key ^= zobrist.PIECE_KEYS[piece][index]
+        self.middlegame_score += evaluation.MIDDLEGAME_TABLES[piece][index]
+        self.endgame_score += evaluation.ENDGAME_TABLES[piece][index]
+        self.phase += evaluation.PHASE_WEIGHTS[piece]
+        if self.bitboards:
+            self.bitboards.add_piece(piece, index)
+
+    def _remove_piece(self, piece: str, row: int, col: int) -> None:
+        self.board[row][col] = "."
+        index = square_index(row, col)
+        self.squares[index] = _EMPTY_SQUARE
+        self.zobrist_key ^= zobrist.PIECE_KEYS[piece][index]
+        self.middlegame_score -= evaluation.MIDDLEGAME_TABLES[piece][index]
+        self.endgame_score -= evaluation.ENDGAME_TABLES[piece][index]
+        self.phase -= evaluation.PHASE_WEIGHTS[piece]
+        if self.bitboards:
+            self.bitboards.remove_piece(piece, index)
+
+    def _set_castling_rights(self, castling_rights: int) -> None:
+        if castling_rights == self.castling_rights:
+            return
+        self.zobrist_key ^= (
+            zobrist.CASTLING_KEYS[self.castling_rights]
+            ^ zobrist.CASTLING_KEYS[castling_rights]
+        )
+        self.castling_rights = castling_rights
+
+    def _set_en_passant(self, en_passant: Square | None) -> None:
+        if self.en_passant:
+            self.zobrist_key ^= zobrist.EN_PASSANT_KEYS[self.en_passant.col]
+        if en_passant:
+            self.zobrist_key ^= zobrist.EN_PASSANT_KEYS[en_passant.col]
+        self.en_passant = en_passant
+
+    def _move_castling_rook(self, row: int, kingside: bool, undo: bool) -> None:
+        rook_start, rook_end = (7, 5) if kingside else (0, 3)
+        if undo:
+            rook_start, rook_end = rook_end, rook_start
+        rook = self.board[row][rook_start]
+        self._remove_piece(rook, row, rook_start)
+        self._add_piece(rook, row, rook_end)
+
     def make_move(self, move: Move) -> None:
         # Make a move on the board
-        self.board[move.end.row][move.end.col] = (
-            move.promotion_piece if move.promotion_piece else move.piece_moved
-        )
-        self.board[move.start.row][move.start.col] = "."
+        self._make_move(move.encode(), move.piece_moved)
 
     def undo_move(self, move: Move) -> None:
         # Undo a move on the board
-        self.board[move.start.row][move.start.col] = move.piece_moved
-        self.board[move.end.row][move.end.col] = (
-            move.piece_captured if move.piece_captured else "."
+        self.undo_encoded_move(move.encode())
+
+    def make_encoded_move(self, move: int) -> None:
+        start = move & SQUARE_MASK
+        self._make_move(move, self.board[start >> 3][start & 7])
+
+    def _make_move(self, move: int, piece: str) -> None:
+        start = move & SQUARE_MASK
+        end = move >> END_SHIFT & SQUARE_MASK
+        start_row, start_col = divmod(start, BOARD_SIZE)
+        end_row, end_col = divmod(end, BOARD_SIZE)
+        captured = self.board[end_row][end_col]
+        en_passant = self.en_passant
+        self._history.append(
+            (self.castling_rights, en_passant, captured, self.halfmove_clock)
+        )
+        self.key_history.append(self.zobrist_key)
+        is_pawn = piece in "Pp"
+        self.halfmove_clock = (
+            0 if is_pawn or captured != "." else self.halfmove_clock + 1
+        )
+
+        if captured != ".":
+            self._remove_piece(captured, end_row, end_col)
+        elif is_pawn and en_passant is not None and end == en_passant.index:
+            # An en-passant capture takes the pawn beside the moving pawn, rather
+            # than one on the end square.
+            self._remove_piece(self.board[start_row][end_col], start_row, end_col)
+        self._remove_piece(piece, start_row, start_col)
+        promotion = move >> PROMOTION_SHIFT & PROMOTION_MASK
+        if promotion:
+            promotion_piece = PROMOTION_CODES[promotion - 1]
+            self._add_piece(
+                promotion_piece.upper() if piece.isupper() else promotion_piece,
+                end_row,
+                end_col,
+            )
+        else:
+            self._add_piece(piece, end_row, end_col)
+        if piece in "Kk" and abs(end_col - start_col) == 2:
+            self._move_castling_rook(start_row, end_col > start_col, undo=False)
+
+        self._set_castling_rights(
+            self.castling_rights
+            & _CASTLING_RIGHTS_KEPT[start]
+            & _CASTLING_RIGHTS_KEPT[end]
+        )
+        if is_pawn and abs(end_row - start_row) == 2:
+            self._set_en_passant(Squares.square_from_index((start + end) // 2))
+        else:
+            self._set_en_passant(None)
+        self._switch_turn()
+
+    def make_null_move(self) -> None:
+        # Pass the turn to the other side without moving, for null move pruning. The
+        # side to move mustn't be in check.
+        self._history.append(
+            (self.castling_rights, self.en_passant, ".", self.halfmove_clock)
+        )
+        self.key_history.append(self.zobrist_key)
+        # A null move isn't a real move, so repetitions across it don't count.
+        self.halfmove_clock = 0
+        self._set_en_passant(None)
+        self._switch_turn()
+
+    def undo_null_move(self) -> None:
+        self._switch_turn()
+        _, en_passant, _, self.halfmove_clock = self._history.pop()
+        self.key_history.pop()
+        self._set_en_passant(en_passant)
+
+    def is_repetition(self) -> bool:
+        # Whether the position has come up before with the same side to move, since
+        # the last capture or pawn move. That takes at least four moves.
+        keys = self.key_history
+        key = self.zobrist_key
+        earliest = max(len(keys) - self.halfmove_clock, 0)
+        for index in range(len(keys) - 4, earliest - 1, -2):
+            if keys[index] == key:
+                return True
+        return False
+
+    def has_non_pawn_material(self, white: bool) -> bool:
+        # Whether a side has a piece other than pawns and its king. Without one,
+        # zugzwang, where any move makes things worse, is common.
+        squares = self.squares
+        return any(
+            piece in squares for piece in (_WHITE_PIECES if white else _BLACK_PIECES)
+        )
+
+    def undo_encoded_move(self, move: int) -> None:
+        start = move & SQUARE_MASK
+        end = move >> END_SHIFT & SQUARE_MASK
+        start_row, start_col = divmod(start, BOARD_SIZE)
+        end_row, end_col = divmod(end, BOARD_SIZE)
+        self._switch_turn()
+        castling_rights, en_passant, captured, self.halfmove_clock = self._history.pop()
+        self.key_history.pop()
+        self._set_castling_rights(castling_rights)
+        self._set_en_passant(en_passant)
+
+        piece = self.board[end_row][end_col]
+        self._remove_piece(piece, end_row, end_col)
+        if move >> PROMOTION_SHIFT & PROMOTION_MASK:
+            piece = Pieces.WHITE_PAWN if piece.isupper() else Pieces.BLACK_PAWN
+        self._add_piece(piece, start_row, start_col)
+        if piece in "Kk" and abs(end_col - start_col) == 2:
+            self._move_castling_rook(start_row, end_col > start_col, undo=True)
+
+        if captured != ".":
+            self._add_piece(captured, end_row, end_col)
+        elif piece in "Pp" and en_passant is not None and end == en_passant.index:
+            self._add_piece(
+                Pieces.BLACK_PAWN if piece.isupper() else Pieces.WHITE_PAWN,
+                start_row,
+                end_col,
+            )
+
+
+def _attackers(
+    pieces: dict[str, int], square: int, by_white: bool, occupied: int
+) -> int:
+    # The pieces of one side attacking a square, with the given squares occupied.
+    # Looks outwards from the square as each kind of piece, e.g. a knight's move away
+    # for knights, so each kind of attacker is a single lookup.
+    if by_white:
+        # A white pawn attacks the square if a black pawn on the square would attack
+        # the white pawn.
+        queens = pieces[Pieces.WHITE_QUEEN]
+        return (
+            BLACK_PAWN_ATTACKS[square] & pieces[Pieces.WHITE_PAWN]
+            | KNIGHT_ATTACKS[square] & pieces[Pieces.WHITE_KNIGHT]
+            | KING_ATTACKS[square] & pieces[Pieces.WHITE_KING]
+            | bishop_attacks(square, occupied) & (pieces[Pieces.WHITE_BISHOP] | queens)
+            | rook_attacks(square, occupied) & (pieces[Pieces.WHITE_ROOK] | queens)
         )
+    queens = pieces[Pieces.BLACK_QUEEN]
+    return (
+        WHITE_PAWN_ATTACKS[square] & pieces[Pieces.BLACK_PAWN]
+        | KNIGHT_ATTACKS[square] & pieces[Pieces.BLACK_KNIGHT]
+        | KING_ATTACKS[square] & pieces[Pieces.BLACK_KING]
+        | bishop_attacks(square, occupied) & (pieces[Pieces.BLACK_BISHOP] | queens)
+        | rook_attacks(square, occupied) & (pieces[Pieces.BLACK_ROOK] | queens)
+    )
@@ -1,9 +1,12 @@
+import pickle
 import unittest
 
+import evaluation
 import fen
-from board import Board, Pieces
-from move import Move
-from square import Squares
+import zobrist
+from board import Board, BoardRepresentation, CastlingRights, Pieces, Player
+from move import CAPTURE_FLAG, Move, uci_notation
+from square import Square, Squares
 
 
 class TestBoard(unittest.TestCase):
@@ -174,3 +177,505 @@ class TestBoard(unittest.TestCase):
         board.undo_move(move)
         self.assertEqual(board.board[move.start.row][move.start.col], Pieces.WHITE_PAWN)
         self.assertEqual(board.board[move.end.row][move.end.col], ".")
+
+    def test_make_move_switches_turn(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN)
+        move = Move(Squares.E2, Squares.E4, Pieces.WHITE_PAWN)
+        board.make_move(move)
+        self.assertEqual(board.turn, Player.BLACK)
+        board.undo_move(move)
+        self.assertEqual(board.turn, Player.WHITE)
+
+
+class TestBitboardBoard(unittest.TestCase):
+    # Neither king is next to one of its own pieces, so the nested list king
+    # generator doesn't produce moves onto its own pieces.
+    MIXED_FEN = "4k3/8/2n1p3/1b1P2r1/3N4/2Q3B1/1P4P1/4K3 w - - 0 1"
+
+    def test_starting_position_moves(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        moves = board.generate_moves()
+        self.assertEqual(len(moves), 20)
+        self.assertIn(Move(Squares.E2, Squares.E4, Pieces.WHITE_PAWN), moves)
+        self.assertIn(Move(Squares.G1, Squares.F3, Pieces.WHITE_KNIGHT), moves)
+
+    def test_castling(self) -> None:
+        board = Board(
+            "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", BoardRepresentation.BITBOARDS
+        )
+        moves = board.generate_moves()
+        self.assertIn(Move(Squares.E1, Squares.G1, Pieces.WHITE_KING), moves)
+        self.assertIn(Move(Squares.E1, Squares.C1, Pieces.WHITE_KING), moves)
+        # The king can't pass through f1 while the rook on f8 attacks it.
+        board = Board(
+            "r3kr2/8/8/8/8/8/8/R3K2R w KQq - 0 1", BoardRepresentation.BITBOARDS
+        )
+        moves = board.generate_moves()
+        self.assertNotIn(Move(Squares.E1, Squares.G1, Pieces.WHITE_KING), moves)
+        self.assertIn(Move(Squares.E1, Squares.C1, Pieces.WHITE_KING), moves)
+        # Or castle without the right.
+        board = Board(
+            "r3k2r/8/8/8/8/8/8/R3K2R b Kk - 0 1", BoardRepresentation.BITBOARDS
+        )
+        moves = board.generate_moves()
+        self.assertIn(Move(Squares.E8, Squares.G8, Pieces.BLACK_KING), moves)
+        self.assertNotIn(Move(Squares.E8, Squares.C8, Pieces.BLACK_KING), moves)
+
+    def test_en_passant(self) -> None:
+        board = Board(
+            "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", BoardRepresentation.BITBOARDS
+        )
+        captures = [
+            board.decode_move(move)
+            for move in board.generate_encoded_moves(quiets=False)
+        ]
+        self.assertEqual(
+            captures,
+            [Move(Squares.E5, Squares.D6, Pieces.WHITE_PAWN, Pieces.BLACK_PAWN)],
+        )
+
+    def test_promotions(self) -> None:
+        board = Board(
+            "2r1k3/1P6/8/8/8/8/8/4K3 w - - 0 1", BoardRepresentation.BITBOARDS
+        )
+        promotions = [
+            board.decode_move(move)
+            for move in board.generate_encoded_moves(quiets=False)
+        ]
+        self.assertCountEqual(
+            promotions,
+            [
+                Move(Squares.B7, Squares.B8, Pieces.WHITE_PAWN, None, promotion)
+                for promotion in "QRBN"
+            ]
+            + [
+                Move(Squares.B7, Squares.C8, Pieces.WHITE_PAWN, "r", promotion)
+                for promotion in "QRBN"
+            ],
+        )
+        move = Move(Squares.B7, Squares.C8, Pieces.WHITE_PAWN, "r", "N")
+        board.make_move(move)
+        self.assertEqual(board.board[7][2], Pieces.WHITE_KNIGHT)
+        board.undo_move(move)
+        self.assertEqual(board.board[6][1], Pieces.WHITE_PAWN)
+        self.assertEqual(board.board[7][2], Pieces.BLACK_ROOK)
+
+    def test_is_square_attacked(self) -> None:
+        for representation in BoardRepresentation:
+            board = Board(self.MIXED_FEN, representation)
+            # By the pawn on d5 and the knight on d4.
+            self.assertTrue(board.is_square_attacked(Squares.E6.index, True))
+            # By the pawn on e6 and the rook on g5.
+            self.assertTrue(board.is_square_attacked(Squares.D5.index, False))
+            # The rook on g5 is blocked by the pawn on d5.
+            self.assertFalse(board.is_square_attacked(Squares.C5.index, False))
+            # The queen on c3 is blocked by the knight on d4.
+            self.assertFalse(board.is_square_attacked(Squares.F6.index, True))
+            self.assertTrue(board.is_square_attacked(Squares.H4.index, True))
+
+    def assert_moves_from(
+        self, fen_str: str, square: Square, expected: list[Square]
+    ) -> None:
+        # Both representations generate exactly these moves for the piece.
+        for representation in BoardRepresentation:
+            board = Board(fen_str, representation)
+            ends = [move.end for move in board.generate_moves() if move.start == square]
+            self.assertCountEqual(ends, expected, representation)
+
+    def test_king_kept_out_of_check(self) -> None:
+        # The king can't step next to the other king.
+        self.assert_moves_from(
+            "8/8/8/8/8/4k3/8/4K3 w - - 0 1", Squares.E1, [Squares.D1, Squares.F1]
+        )
+        # Or along the line it's being checked on, or onto a defended piece.
+        self.assert_moves_from(
+            "4k3/4r3/8/8/8/2p5/3p4/4K3 w - - 0 1",
+            Squares.E1,
+            [Squares.D1, Squares.F1, Squares.F2],
+        )
+
+    def test_pins(self) -> None:
+        # A pinned knight can't move, and a pinned rook can only move along the pin.
+        fen_str = "4r1k1/8/8/8/8/8/4N3/4K3 w - - 0 1"
+        self.assert_moves_from(fen_str, Squares.E2, [])
+        fen_str = "4r1k1/8/8/8/8/8/4R3/4K3 w - - 0 1"
+        self.assert_moves_from(
+            fen_str,
+            Squares.E2,
+            [Squares.E3, Squares.E4, Squares.E5, Squares.E6, Squares.E7, Squares.E8],
+        )
+
+    def test_check_evasions(self) -> None:
+        # The bishop's check can be blocked or the bishop taken.
+        fen_str = "4k3/8/8/8/1b6/8/8/2R1K1N1 w - - 0 1"
+        self.assert_moves_from(fen_str, Squares.C1, [Squares.C3])
+        self.assert_moves_from(fen_str, Squares.G1, [])
+        # In double check only the king can move.
+        fen_str = "4k3/8/8/8/1b6/8/8/2R1K2r w - - 0 1"
+        self.assert_moves_from(fen_str, Squares.C1, [])
+        self.assert_moves_from(fen_str, Squares.E1, [Squares.E2, Squares.F2])
+
+    def test_en_passant_exposing_king(self) -> None:
+        # Taking en passant would take both pawns off the rank, leaving the king in
+        # check from the rook.
+        fen_str = "8/8/8/KPp4r/8/8/8/7k w - c6 0 1"
+        self.assert_moves_from(fen_str, Squares.B5, [Squares.B6])
+
+    def test_moves_match_lists(self) -> None:
+        for turn in [Player.WHITE, Player.BLACK]:
+            list_board = Board(self.MIXED_FEN)
+            bitboard_board = Board(self.MIXED_FEN, BoardRepresentation.BITBOARDS)
+            list_board.turn = turn
+            bitboard_board.turn = turn
+            self.assertSetEqual(
+                set(bitboard_board.generate_moves()), set(list_board.generate_moves())
+            )
+
+    def test_captures_and_quiet_moves(self) -> None:
+        for representation in BoardRepresentation:
+            board = Board(self.MIXED_FEN, representation)
+            captures = board.generate_encoded_moves(quiets=False)
+            quiets = board.generate_encoded_moves(captures=False)
+            self.assertTrue(all(move & CAPTURE_FLAG for move in captures))
+            self.assertFalse(any(move & CAPTURE_FLAG for move in quiets))
+            self.assertSetEqual(
+                set(captures) | set(quiets), set(board.generate_encoded_moves())
+            )
+            self.assertIn(
+                Move(
+                    Squares.D4, Squares.C6, Pieces.WHITE_KNIGHT, Pieces.BLACK_KNIGHT
+                ).encode(),
+                captures,
+            )
+
+    def test_promotions_generated_with_captures(self) -> None:
+        # A promotion changes the material on the board, so it's generated with the
+        # captures by both representations even when it takes nothing.
+        fen_str = "4k3/1P6/8/8/8/8/8/4K3 w - - 0 1"
+        list_board = Board(fen_str)
+        bitboard_board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        for captures, quiets in [(True, False), (False, True)]:
+            self.assertCountEqual(
+                list_board.generate_encoded_moves(captures, quiets),
+                bitboard_board.generate_encoded_moves(captures, quiets),
+            )
+        self.assertCountEqual(
+            [
+                uci_notation(move)
+                for move in list_board.generate_encoded_moves(quiets=False)
+            ],
+            ["b7b8q", "b7b8r", "b7b8b", "b7b8n"],
+        )
+
+    def test_encoded_moves_decode_to_moves(self) -> None:
+        for representation in BoardRepresentation:
+            board = Board(self.MIXED_FEN, representation)
+            self.assertSetEqual(
+                {board.decode_move(move) for move in board.generate_encoded_moves()},
+                set(board.generate_moves()),
+            )
+
+    def test_move_from_encoding(self) -> None:
+        for representation in BoardRepresentation:
+            board = Board(self.MIXED_FEN, representation)
+            capture = Move(
+                Squares.D4, Squares.C6, Pieces.WHITE_KNIGHT, Pieces.BLACK_KNIGHT
+            )
+            self.assertEqual(board.move_from_encoding(capture.encode()), capture)
+            # Black's knight can't move while it's white's turn.
+            black_move = Move(Squares.C6, Squares.A5, Pieces.BLACK_KNIGHT)
+            self.assertIsNone(board.move_from_encoding(black_move.encode()))
+            # The queen is blocked by the knight.
+            blocked = Move(Squares.C3, Squares.E5, Pieces.WHITE_QUEEN)
+            self.assertIsNone(board.move_from_encoding(blocked.encode()))
+            # There's no piece on the start square.
+            empty = Move(Squares.A1, Squares.A2, Pieces.WHITE_ROOK)
+            self.assertIsNone(board.move_from_encoding(empty.encode()))
+
+    def test_make_and_undo_capture(self) -> None:
+        board = Board(self.MIXED_FEN, BoardRepresentation.BITBOARDS)
+        bitboards = board.bitboards
+        if bitboards is None:
+            self.fail("Bitboard representation should create bitboards")
+        original_pieces = dict(bitboards.pieces)
+        original_occupied = bitboards.occupied
+        move = Move(Squares.D4, Squares.C6, Pieces.WHITE_KNIGHT, Pieces.BLACK_KNIGHT)
+        self.assertIn(move, board.generate_moves())
+
+        board.make_move(move)
+        self.assertEqual(board.board[5][2], Pieces.WHITE_KNIGHT)
+        self.assertEqual(bitboards.pieces[Pieces.BLACK_KNIGHT], 0)
+        self.assertEqual(
+            bitboards.pieces[Pieces.WHITE_KNIGHT], 1 << Squares.C6.row * 8 + 2
+        )
+
+        board.undo_move(move)
+        self.assertEqual(bitboards.pieces, original_pieces)
+        self.assertEqual(bitboards.occupied, original_occupied)
+        self.assertEqual(board.board[5][2], Pieces.BLACK_KNIGHT)
+
+
+class TestZobrist(unittest.TestCase):
+    def assert_key_matches_position(self, board: Board) -> None:
+        expected = zobrist.compute_key(
+            board.board,
+            board.turn == Player.BLACK,
+            board.castling_rights,
+            board.en_passant.col if board.en_passant else None,
+        )
+        self.assertEqual(board.zobrist_key, expected)
+
+    def test_fen_state(self) -> None:
+        board = Board("4k3/8/8/8/4Pp2/8/8/R3K2R b KQ e3 0 1")
+        self.assertEqual(board.turn, Player.BLACK)
+        self.assertEqual(
+            board.castling_rights,
+            CastlingRights.WHITE_KINGSIDE | CastlingRights.WHITE_QUEENSIDE,
+        )
+        self.assertEqual(board.en_passant, Squares.E3)
+
+    def test_side_to_move_changes_key(self) -> None:
+        white = Board("4k3/8/8/8/8/8/8/4K3 w - - 0 1")
+        black = Board("4k3/8/8/8/8/8/8/4K3 b - - 0 1")
+        self.assertNotEqual(white.zobrist_key, black.zobrist_key)
+
+    def test_make_and_undo_restores_key(self) -> None:
+        for representation in BoardRepresentation:
+            board = Board(fen.STARTING_GAME_FEN, representation)
+            original_key = board.zobrist_key
+            made_moves = []
+            for _ in range(4):
+                move = board.generate_moves()[0]
+                board.make_move(move)
+                made_moves.append(move)
+                self.assert_key_matches_position(board)
+            for move in reversed(made_moves):
+                board.undo_move(move)
+                self.assert_key_matches_position(board)
+            self.assertEqual(board.zobrist_key, original_key)
+
+    def test_transposition_has_same_key(self) -> None:
+        first = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        second = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        knight_out = Move(Squares.G1, Squares.F3, Pieces.WHITE_KNIGHT)
+        knight_back = Move(Squares.F3, Squares.G1, Pieces.WHITE_KNIGHT)
+        black_knight_out = Move(Squares.G8, Squares.F6, Pieces.BLACK_KNIGHT)
+        black_knight_back = Move(Squares.F6, Squares.G8, Pieces.BLACK_KNIGHT)
+        for move in [knight_out, black_knight_out, knight_back, black_knight_back]:
+            first.make_move(move)
+        self.assertEqual(first.zobrist_key, second.zobrist_key)
+
+    def test_double_pawn_move_sets_en_passant(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN)
+        move = Move(Squares.E2, Squares.E4, Pieces.WHITE_PAWN)
+        board.make_move(move)
+        self.assertEqual(board.en_passant, Squares.E3)
+        self.assert_key_matches_position(board)
+        board.undo_move(move)
+        self.assertIsNone(board.en_passant)
+        self.assert_key_matches_position(board)
+
+    def test_parse_uci_move(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        move = board.parse_uci_move("g1f3")
+        self.assertEqual(
+            move, Move(Squares.G1, Squares.F3, Pieces.WHITE_KNIGHT).encode()
+        )
+        # Moves that can't be played here aren't found.
+        self.assertIsNone(board.parse_uci_move("e2e5"))
+        self.assertIsNone(board.parse_uci_move("e7e5"))
+
+    def test_null_move(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN)
+        board.make_move(Move(Squares.E2, Squares.E4, Pieces.WHITE_PAWN))
+        key = board.zobrist_key
+        board.make_null_move()
+        # White moves again, and black's chance to capture en passant is gone.
+        self.assertEqual(board.turn, Player.WHITE)
+        self.assertIsNone(board.en_passant)
+        self.assert_key_matches_position(board)
+        board.undo_null_move()
+        self.assertEqual(board.turn, Player.BLACK)
+        self.assertEqual(board.en_passant, Squares.E3)
+        self.assertEqual(board.zobrist_key, key)
+
+    def test_repetition(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        for text in ["g1f3", "g8f6", "f3g1"]:
+            board.make_encoded_move(board.parse_uci_move(text) or 0)
+            self.assertFalse(board.is_repetition())
+        move = board.parse_uci_move("f6g8") or 0
+        board.make_encoded_move(move)
+        self.assertTrue(board.is_repetition())
+        self.assertEqual(board.halfmove_clock, 4)
+        board.undo_encoded_move(move)
+        self.assertFalse(board.is_repetition())
+        self.assertEqual(board.halfmove_clock, 3)
+        self.assertEqual(len(board.key_history), 3)
+
+    def test_halfmove_clock(self) -> None:
+        board = Board("4k3/8/8/8/8/8/4P3/4K3 w - - 7 20", BoardRepresentation.BITBOARDS)
+        self.assertEqual(board.halfmove_clock, 7)
+        for text in ["e1d1", "e8d8", "e2e3"]:
+            board.make_encoded_move(board.parse_uci_move(text) or 0)
+        self.assertEqual(board.halfmove_clock, 0)
+        for text in ["d8e8", "d1e1", "e8d8", "e1d1"]:
+            board.make_encoded_move(board.parse_uci_move(text) or 0)
+        self.assertEqual(board.halfmove_clock, 4)
+        self.assertTrue(board.is_repetition())
+        # A null move resets the clock, so nothing before it is a repetition.
+        board.make_null_move()
+        self.assertEqual(board.halfmove_clock, 0)
+        board.undo_null_move()
+        self.assertEqual(board.halfmove_clock, 4)
+
+    def test_has_non_pawn_material(self) -> None:
+        board = Board("4k3/pppp4/8/8/8/8/4PPPP/3NK3 w - - 0 1")
+        self.assertTrue(board.has_non_pawn_material(True))
+        self.assertFalse(board.has_non_pawn_material(False))
+
+    def test_en_passant_capture(self) -> None:
+        board = Board(
+            "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", BoardRepresentation.BITBOARDS
+        )
+        move = Move(Squares.E5, Squares.D6, Pieces.WHITE_PAWN, Pieces.BLACK_PAWN)
+        board.make_move(move)
+        self.assertEqual(board.board[4][3], ".")
+        self.assertEqual(board.board[5][3], Pieces.WHITE_PAWN)
+        self.assert_key_matches_position(board)
+        board.undo_move(move)
+        self.assertEqual(board.board[4][3], Pieces.BLACK_PAWN)
+        self.assertEqual(board.board[5][3], ".")
+        self.assertEqual(board.en_passant, Squares.D6)
+        self.assert_key_matches_position(board)
+
+    def test_castling_moves_rook_and_loses_rights(self) -> None:
+        board = Board("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        move = Move(Squares.E1, Squares.G1, Pieces.WHITE_KING)
+        board.make_move(move)
+        self.assertEqual(board.board[0][5], Pieces.WHITE_ROOK)
+        self.assertEqual(board.board[0][7], ".")
+        self.assertEqual(
+            board.castling_rights,
+            CastlingRights.BLACK_KINGSIDE | CastlingRights.BLACK_QUEENSIDE,
+        )
+        self.assert_key_matches_position(board)
+        board.undo_move(move)
+        self.assertEqual(board.board[0][7], Pieces.WHITE_ROOK)
+        self.assertEqual(board.castling_rights, CastlingRights.from_fen("KQkq"))
+        self.assert_key_matches_position(board)
+
+    def test_capturing_rook_loses_rights(self) -> None:
+        board = Board("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        board.make_move(
+            Move(Squares.A1, Squares.A8, Pieces.WHITE_ROOK, Pieces.BLACK_ROOK)
+        )
+        self.assertEqual(
+            board.castling_rights,
+            CastlingRights.WHITE_KINGSIDE | CastlingRights.BLACK_KINGSIDE,
+        )
+        self.assert_key_matches_position(board)
+
+
+class TestIncrementalEvaluation(unittest.TestCase):
+    def assert_scores_match_position(self, board: Board) -> None:
+        self.assertEqual(
+            (board.middlegame_score, board.endgame_score, board.phase),
+            evaluation.compute(board.board),
+        )
+
+    def test_special_moves(self) -> None:
+        board = Board("r3k3/1P6/8/3pP3/8/8/8/4K2R w Kq d6 0 1")
+        original = (board.middlegame_score, board.endgame_score, board.phase)
+        for move in [
+            Move(Squares.E5, Squares.D6, Pieces.WHITE_PAWN, Pieces.BLACK_PAWN),
+            Move(Squares.E1, Squares.G1, Pieces.WHITE_KING),
+            Move(Squares.B7, Squares.A8, Pieces.WHITE_PAWN, Pieces.BLACK_ROOK, "Q"),
+        ]:
+            board.make_move(move)
+            self.assert_scores_match_position(board)
+            board.undo_move(move)
+            self.assert_scores_match_position(board)
+        self.assertEqual(
+            (board.middlegame_score, board.endgame_score, board.phase), original
+        )
+
+    def test_sequence_of_moves(self) -> None:
+        for representation in BoardRepresentation:
+            board = Board(fen.STARTING_GAME_FEN, representation)
+            made_moves = []
+            for _ in range(6):
+                move = board.generate_moves()[-1]
+                board.make_move(move)
+                made_moves.append(move)
+                self.assert_scores_match_position(board)
+            for move in reversed(made_moves):
+                board.undo_move(move)
+                self.assert_scores_match_position(board)
+
+
+class TestSnapshots(unittest.TestCase):
+    FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+    def assert_same_position(self, board: Board, other: Board) -> None:
+        self.assertEqual(board.board, other.board)
+        self.assertEqual(board.squares, other.squares)
+        self.assertEqual(board.turn, other.turn)
+        self.assertEqual(board.castling_rights, other.castling_rights)
+        self.assertEqual(board.en_passant, other.en_passant)
+        self.assertEqual(board.zobrist_key, other.zobrist_key)
+        self.assertEqual(
+            (board.middlegame_score, board.endgame_score, board.phase),
+            (other.middlegame_score, other.endgame_score, other.phase),
+        )
+        self.assertEqual(board.generate_encoded_moves(), other.generate_encoded_moves())
+
+    def test_squares_follow_moves(self) -> None:
+        board = Board(self.FEN, BoardRepresentation.BITBOARDS)
+        moves = [
+            Move(Squares.E1, Squares.G1, Pieces.WHITE_KING),
+            Move(Squares.E7, Squares.C5, Pieces.BLACK_QUEEN),
+            Move(Squares.E5, Squares.F7, Pieces.WHITE_KNIGHT, Pieces.BLACK_PAWN),
+        ]
+        for move in moves:
+            board.make_move(move)
+            squares = "".join("".join(row) for row in board.board)
+            self.assertEqual(board.squares.decode(), squares)
+        for move in reversed(moves):
+            board.undo_move(move)
+        self.assertEqual(board.squares, Board(self.FEN).squares)
+
+    def test_snapshot_round_trip(self) -> None:
+        board = Board(self.FEN, BoardRepresentation.BITBOARDS)
+        # Leave an en-passant square, and black to move.
+        board.make_move(Move(Squares.A2, Squares.A4, Pieces.WHITE_PAWN))
+        snapshot = board.snapshot()
+        self.assertEqual(len(snapshot[0]), 64)
+        restored = Board.from_snapshot(snapshot, BoardRepresentation.BITBOARDS)
+        self.assert_same_position(restored, board)
+        self.assertEqual(restored.en_passant, Squares.A3)
+
+    def test_copy_is_independent(self) -> None:
+        for representation in BoardRepresentation:
+            board = Board(self.FEN, representation)
+            castle = Move(Squares.E1, Squares.G1, Pieces.WHITE_KING)
+            board.make_move(castle)
+            copy = board.copy()
+            self.assert_same_position(copy, board)
+
+            black_castle = Move(Squares.E8, Squares.C8, Pieces.BLACK_KING)
+            copy.make_move(black_castle)
+            self.assertEqual(board.board[7][4], Pieces.BLACK_KING)
+            self.assertEqual(board.squares[Squares.E8.index], ord(Pieces.BLACK_KING))
+
+            # Moves made before copying can still be undone on the copy.
+            copy.undo_move(black_castle)
+            copy.undo_move(castle)
+            self.assert_same_position(copy, Board(self.FEN, representation))
+
+    def test_pickle(self) -> None:
+        board = Board(self.FEN, BoardRepresentation.BITBOARDS)
+        board.make_move(Move(Squares.E1, Squares.G1, Pieces.WHITE_KING))
+        restored = pickle.loads(pickle.dumps(board))  # noqa: S301
+        self.assert_same_position(restored, board)
+        self.assertEqual(restored.representation, BoardRepresentation.BITBOARDS)
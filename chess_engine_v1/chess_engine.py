@@ -1,83 +1,784 @@
+import argparse
+import json
+import math
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Event
+
+import evaluation
 import fen
-from board import Board
-from move import Move
+from bench import BENCH_POSITIONS, DEFAULT_BENCH_DEPTH, BenchPosition, BenchResult
+from board import Board, BoardRepresentation, Player
+from evaluation import INFINITE_SCORE, MATE_SCORE, PIECE_VALUES, is_mate_score
+from move import (
+    CAPTURE_FLAG,
+    END_SHIFT,
+    PROMOTION_CODES,
+    PROMOTION_MASK,
+    PROMOTION_SHIFT,
+    SQUARE_MASK,
+    Move,
+    uci_notation,
+)
+from move_ordering import MAX_PLY, MoveOrderer
+from opening_book import OpeningBook
+from perft import divide
+from search_stats import SearchStats
+from time_manager import MAX_DEPTH, SearchLimits, TimeManager
+from transposition_table import (
+    DEFAULT_SIZE_MB,
+    NO_MOVE,
+    Bound,
+    TranspositionTable,
+)
+
+MAX_HASH_SIZE_MB = 4096
+# Quiescence search skips a capture that can't bring the score back up to alpha
+# even with this much to spare, e.g. for positional compensation.
+DELTA_MARGIN = 200
+# The search checks whether it should stop every this many nodes, as checking the
+# clock on every node would be too slow. Must be a power of two.
+STOP_CHECK_INTERVAL = 256
+# Most search processes the Threads option allows.
+MAX_THREADS = 256
+# Futility pruning applies this close to the leaves, assuming a quiet move changes
+# the evaluation by less than FUTILITY_MARGIN per remaining ply.
+FUTILITY_DEPTH = 3
+FUTILITY_MARGIN = 150
+# Null move pruning needs this much depth left. The null move search is reduced by
+# NULL_MOVE_REDUCTION plies, plus one for every four plies of depth, and cutoffs
+# are verified with a search of the real moves from NULL_MOVE_VERIFICATION_DEPTH.
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_VERIFICATION_DEPTH = 6
+# Late move reductions apply with at least this much depth left, to moves after the
+# first LMR_MIN_MOVES in the move ordering.
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3
+# Iterations from ASPIRATION_MIN_DEPTH search the root with a window this far either
+# side of the previous iteration's score.
+ASPIRATION_MIN_DEPTH = 4
+ASPIRATION_WINDOW = 50
+# Progress info lines are sent at most once every INFO_INTERVAL_MS while searching,
+# and the move being searched at the root once the search has run for
+# CURRMOVE_DELAY_MS, so output doesn't slow down short searches.
+INFO_INTERVAL_MS = 1000
+CURRMOVE_DELAY_MS = 1000
+
+# Captures and promotions, which are never pruned or reduced.
+_TACTICAL_FLAGS = CAPTURE_FLAG | PROMOTION_MASK << PROMOTION_SHIFT
+# _LATE_MOVE_REDUCTIONS[depth][move number] is how many plies a late move's search
+# is reduced by, growing with both the depth left and how late the move is ordered.
+_LATE_MOVE_REDUCTIONS = [
+    [
+        int(0.75 + math.log(depth) * math.log(move_number) / 2.25)
+        if depth and move_number
+        else 0
+        for move_number in range(256)
+    ]
+    for depth in range(MAX_DEPTH + 1)
+]
+
+# The search thread and the command loop both write to stdout, so each line is
+# written under a lock. Lines are flushed straight away as stdout is normally a pipe
+# to the GUI.
+_output_lock = threading.Lock()
+
+
+def send(message: str) -> None:
+    with _output_lock:
+        print(message, flush=True)
+
+
+class SearchOptions:
+    # Which selective search techniques the search uses. Each can be turned off with
+    # a UCI option, to measure what it's worth.
+    def __init__(
+        self,
+        null_move_pruning: bool = True,
+        late_move_reductions: bool = True,
+        futility_pruning: bool = True,
+    ):
+        self.null_move_pruning = null_move_pruning
+        self.late_move_reductions = late_move_reductions
+        self.futility_pruning = futility_pruning
 
 
 class ChessEngine:
-    def __init__(self, board: Board):
+    def __init__(
+        self, board: Board, transposition_table: TranspositionTable | None = None
+    ):
         self.board = board
+        self.transposition_table = (
+            transposition_table if transposition_table else TranspositionTable()
+        )
+        self.time_manager = TimeManager(SearchLimits(), True)
+        self.move_orderer = MoveOrderer()
+        # Turning this off searches moves in generation order, to measure how much
+        # the ordering saves.
+        self.use_move_ordering = True
+        self.options = SearchOptions()
+        # Checks the incremental evaluation against a full recomputation at every
+        # leaf. Turned on by the UCI debug command.
+        self.debug = False
+        self.stats = SearchStats()
+        # Set once the search has run out of time or nodes. The search then unwinds
+        # and the unfinished iteration's result is thrown away.
+        self.stopped = False
+        # The search can only be stopped once an iteration has found a move.
+        self._can_stop = False
+        # Set by stop(), usually from another thread, and cleared by the caller
+        # before starting the next search.
+        self.stop_requested = False
+        # The depth, score and principal variation (the moves expected to be played,
+        # encoded) of the last completed iteration.
+        self.completed_depth = 0
+        self.score = 0
+        self.pv: list[int] = []
+        # pv_table[ply] is the principal variation from the node being searched at
+        # that ply, built up from the one at the next ply as the search unwinds.
+        self.pv_table: list[list[int]] = [[] for _ in range(MAX_PLY)]
+        # Called with UCI info lines as the search goes, if set.
+        self.on_info: Callable[[str], None] | None = None
+        # The depth of the iteration being searched, and when progress was last
+        # reported.
+        self._depth = 0
+        self._last_info_ms = 0
+        # 0 for the main search, or the number of a helper searching alongside it.
+        self.helper_id = 0
+        # Helper processes to search alongside this one, if any.
+        self.helpers: HelperPool | None = None
+
+    @property
+    def nodes(self) -> int:
+        return self.stats.nodes
 
     def evaluate(self) -> int:
-        # Evaluate the board state (material balance)
-        piece_values = {
-            "P": 1,
-            "N": 3,
-            "B": 3,
-            "R": 5,
-            "Q": 9,
-            "K": 1000,
-            "p": -1,
-            "n": -3,
-            "b": -3,
-            "r": -5,
-            "q": -9,
-            "k": -1000,
-        }
-        score = 0
-        for row in self.board.board:
-            for piece in row:
-                if piece in piece_values:
-                    score += piece_values[piece]
-        return score
-
-    # TODO: Chris: Come up with an enum for is_maximizing.
+        # Board keeps the scores up to date as moves are made, so this doesn't need
+        # to look at the pieces.
+        board = self.board
+        if self.debug:
+            self._check_evaluation()
+        return evaluation.tapered(
+            board.middlegame_score, board.endgame_score, board.phase
+        )
+
+    def _check_evaluation(self) -> None:
+        # Compare the incrementally updated scores with ones worked out from scratch.
+        board = self.board
+        expected = evaluation.compute(board.board)
+        actual = (board.middlegame_score, board.endgame_score, board.phase)
+        if actual != expected:
+            raise Exception(
+                f"Incremental evaluation {actual} doesn't match recomputed {expected}"
+            )
+
     # TODO: Instead of changing self.board all the time, we should be passing in a new
-    # Board for each call. This way we could easily multithread in the future. And it
-    # makes sense that self.board would always refer to the current state, instead of
-    # changing around a bunch.
+    # Board for each call, e.g. from Board.copy. This way we could easily multithread
+    # in the future. And it makes sense that self.board would always refer to the
+    # current state, instead of changing around a bunch.
     def alpha_beta(
-        self, depth: int, alpha: float, beta: float, is_maximizing: bool
-    ) -> tuple[float, Move | None]:
-        if depth == 0:
-            return self.evaluate(), None
-
-        legal_moves = self.board.generate_moves()
-        # TODO: Look at pulling the common functionality of the two bodies of this if
-        # statement into a common helper function to reduce repeated code.
-        if is_maximizing:
-            max_eval = -float("inf")
-            best_move = None
-            for move in legal_moves:
-                self.board.make_move(move)
-                eval, _ = self.alpha_beta(depth - 1, alpha, beta, False)  # noqa
-                self.board.undo_move(move)
-                if eval > max_eval:
-                    max_eval = eval
-                    best_move = move
-                alpha = max(alpha, eval)
-                if beta <= alpha:
-                    break
-            return max_eval, best_move
+        self,
+        depth: int,
+        alpha: int,
+        beta: int,
+        ply: int = 0,
+        null_move_allowed: bool = True,
+    ) -> tuple[int, int]:
+        # Negamax: scores are from the side to move's point of view, so both sides
+        # maximize, and a child's score is negated for its parent. Returns the score
+        # and the best move, encoded, or NO_MOVE if there isn't one. The moves
+        # expected from here on are left in pv_table[ply].
+        pv_table = self.pv_table
+        pv_table[ply] = []
+        if depth <= 0:
+            return self.quiescence(alpha, beta, ply), NO_MOVE
+
+        stats = self.stats
+        stats.nodes += 1
+        if stats.nodes & (STOP_CHECK_INTERVAL - 1) == 0:
+            self._poll()
+        if self.stopped:
+            return 0, NO_MOVE
+
+        if ply > 0:
+            # A repeated position is scored as a draw, as whatever was best the first
+            # time round would be again, and the game would repeat a third time.
+            if self.board.is_repetition():
+                return 0, NO_MOVE
+            # Mate distance pruning. Nothing here can score better than mating on the
+            # next move, or worse than being mated now, so if the window is outside
+            # that range a quicker mate has already been found elsewhere.
+            alpha = max(alpha, -(MATE_SCORE - ply))
+            beta = min(beta, MATE_SCORE - ply)
+            if alpha >= beta:
+                return alpha, NO_MOVE
+
+        key = self.board.zobrist_key
+        hash_move = NO_MOVE
+        entry = self.transposition_table.probe(key)
+        if entry:
+            stats.tt_hits += 1
+            entry_depth, entry_score, bound, hash_move = entry
+            entry_score = _score_from_table(entry_score, ply)
+            # Don't cut off at the root, as the caller needs a move back.
+            if ply > 0 and entry_depth >= depth:
+                if (
+                    bound == Bound.EXACT
+                    or (bound == Bound.LOWER and entry_score >= beta)
+                    or (bound == Bound.UPPER and entry_score <= alpha)
+                ):
+                    stats.tt_cutoffs += 1
+                    return entry_score, NO_MOVE
+
+        board = self.board
+        options = self.options
+        in_check = board.in_check()
+        # Only nodes searched with a null window are pruned. Nodes with a wider
+        # window are on the principal variation, where mistakes matter most. Nodes
+        # in check aren't either, as the static evaluation means little there and the
+        # side to move might be mated.
+        can_prune = beta - alpha == 1 and not in_check
+        static_eval = self._relative_evaluation() if can_prune else 0
+
+        if (
+            can_prune
+            and options.futility_pruning
+            and depth <= FUTILITY_DEPTH
+            and not is_mate_score(beta)
+            and static_eval - FUTILITY_MARGIN * depth >= beta
+        ):
+            # Reverse futility pruning: so far above the window that even losing a
+            # margin per remaining ply would still fail high.
+            return static_eval - FUTILITY_MARGIN * depth, NO_MOVE
+
+        if (
+            can_prune
+            and options.null_move_pruning
+            and null_move_allowed
+            and depth >= NULL_MOVE_MIN_DEPTH
+            and static_eval >= beta
+            and not is_mate_score(beta)
+            and board.has_non_pawn_material(board.turn == Player.WHITE)
+        ):
+            # Null move pruning: let the opponent move twice in a row. If a shallower
+            # search still fails high, a real move almost certainly would too. This
+            # is wrong in zugzwang, where any move makes things worse, so it's
+            # skipped when the side to move has only pawns.
+            reduction = NULL_MOVE_REDUCTION + depth // 4
+            board.make_null_move()
+            score, _ = self.alpha_beta(
+                depth - 1 - reduction, -beta, -beta + 1, ply + 1, False
+            )
+            board.undo_null_move()
+            if self.stopped:
+                return 0, NO_MOVE
+            score = -score
+            if score >= beta and depth >= NULL_MOVE_VERIFICATION_DEPTH:
+                # Deep cutoffs prune a lot, so they're verified by a reduced search
+                # of the real moves, which finds most zugzwangs that are left.
+                score, _ = self.alpha_beta(
+                    depth - reduction, beta - 1, beta, ply, False
+                )
+                if self.stopped:
+                    return 0, NO_MOVE
+            if score >= beta:
+                # A mate found after passing isn't proven, as passing isn't legal.
+                return beta if is_mate_score(score) else score, NO_MOVE
+
+        # Futility pruning: near the leaves, quiet moves can't raise a score this far
+        # below the window, so only captures, promotions and checks are searched.
+        futile = (
+            can_prune
+            and options.futility_pruning
+            and depth <= FUTILITY_DEPTH
+            and not is_mate_score(alpha)
+            and static_eval + FUTILITY_MARGIN * depth <= alpha
+        )
+        late_moves_reduced = (
+            options.late_move_reductions and not in_check and depth >= LMR_MIN_DEPTH
+        )
+
+        legal_moves: Iterable[int] = (
+            self.move_orderer.staged_moves(board, hash_move, ply)
+            if self.use_move_ordering
+            else board.generate_encoded_moves()
+        )
+        original_alpha = alpha
+        best_score = -INFINITE_SCORE
+        best_move = NO_MOVE
+        for move_number, move in enumerate(legal_moves):
+            if ply == 0 and self.on_info:
+                self._report_current_move(move, move_number)
+            board.make_encoded_move(move)
+            # Quiet moves that don't give check, after the first move, are the ones
+            # that can be pruned or reduced.
+            late = late_moves_reduced and move_number >= LMR_MIN_MOVES
+            quiet = (
+                (futile or late)
+                and move_number > 0
+                and not move & _TACTICAL_FLAGS
+                and not board.in_check()
+            )
+            if quiet and futile:
+                board.undo_encoded_move(move)
+                continue
+
+            if move_number == 0:
+                score = -self.alpha_beta(depth - 1, -beta, -alpha, ply + 1)[0]
+            else:
+                # Principal variation search: the first move is expected to be the
+                # best, so the others are searched with a null window, which only
+                # proves they're no better. Late moves are also reduced. A move that
+                # turns out better is searched again at full depth, then with the
+                # full window to find its score.
+                reduction = (
+                    min(_LATE_MOVE_REDUCTIONS[depth][move_number], depth - 2)
+                    if quiet and late
+                    else 0
+                )
+                score = -self.alpha_beta(
+                    depth - 1 - reduction, -alpha - 1, -alpha, ply + 1
+                )[0]
+                if score > alpha and reduction:
+                    score = -self.alpha_beta(depth - 1, -alpha - 1, -alpha, ply + 1)[0]
+                if alpha < score < beta:
+                    score = -self.alpha_beta(depth - 1, -beta, -alpha, ply + 1)[0]
+            board.undo_encoded_move(move)
+            if self.stopped:
+                return 0, NO_MOVE
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    pv_table[ply] = [move, *pv_table[ply + 1]]
+                    if alpha >= beta:
+                        stats.beta_cutoffs += 1
+                        if move_number == 0:
+                            stats.first_move_cutoffs += 1
+                        self.move_orderer.record_cutoff(move, depth, ply)
+                        break
+
+        if best_move == NO_MOVE:
+            # No legal moves, so the game is over, and whether the king is attacked
+            # tells checkmate from stalemate. Mates nearer the root score higher, so
+            # the search prefers the quickest mate and the slowest loss.
+            return -(MATE_SCORE - ply) if in_check else 0, NO_MOVE
+        if best_score <= original_alpha:
+            bound = Bound.UPPER
+        elif best_score >= beta:
+            bound = Bound.LOWER
         else:
-            min_eval = float("inf")
-            best_move = None
-            for move in legal_moves:
-                self.board.make_move(move)
-                eval, _ = self.alpha_beta(depth - 1, alpha, beta, True)  # noqa
-                self.board.undo_move(move)
-                if eval < min_eval:
-                    min_eval = eval
-                    best_move = move
-                beta = min(beta, eval)
-                if beta <= alpha:
-                    break
-            return min_eval, best_move
+            bound = Bound.EXACT
+        self.transposition_table.store(
+            key, depth, _score_to_table(best_score, ply), bound, best_move
+        )
+        return best_score, best_move
 
-    def best_move(self, depth: int) -> Move | None:
-        # TODO: ChatGPT: Add stalemate and winner detection.
-        _, best_move = self.alpha_beta(depth, -float("inf"), float("inf"), True)
+    def quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        # Search captures only until the position is quiet, so the evaluation isn't
+        # taken in the middle of an exchange. The side to move can always choose not
+        # to capture, so the static evaluation (the stand-pat score) is a lower bound
+        # on the score.
+        stats = self.stats
+        stats.nodes += 1
+        stats.quiescence_nodes += 1
+        if ply > stats.seldepth:
+            stats.seldepth = ply
+        if stats.nodes & (STOP_CHECK_INTERVAL - 1) == 0:
+            self._poll()
+        if self.stopped:
+            return 0
+
+        stand_pat = self._relative_evaluation()
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        best_score = stand_pat
+        board = self.board
+        captures = sorted(
+            board.generate_encoded_moves(quiets=False),
+            key=lambda move: self.move_orderer.capture_score(board, move),
+            reverse=True,
+        )
+        for move in captures:
+            # Delta pruning: skip captures that can't get the score back up to alpha
+            # even if the captured piece is won for free.
+            end = move >> END_SHIFT & SQUARE_MASK
+            victim = board.board[end >> 3][end & 7]
+            if victim != ".":
+                gain = abs(PIECE_VALUES[victim])
+            else:
+                # An en-passant capture, or a promotion that doesn't capture.
+                gain = PIECE_VALUES["P"] if move & CAPTURE_FLAG else 0
+            promotion = move >> PROMOTION_SHIFT & PROMOTION_MASK
+            if promotion:
+                promotion_piece = PROMOTION_CODES[promotion - 1].upper()
+                gain += PIECE_VALUES[promotion_piece] - PIECE_VALUES["P"]
+            if stand_pat + gain + DELTA_MARGIN <= alpha:
+                continue
+
+            board.make_encoded_move(move)
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            board.undo_encoded_move(move)
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _relative_evaluation(self) -> int:
+        # The evaluation from the side to move's point of view, as negamax needs.
+        score = self.evaluate()
+        return score if self.board.turn == Player.WHITE else -score
+
+    def stop(self) -> None:
+        # Ask a running search to return the best move found so far. The search
+        # notices within STOP_CHECK_INTERVAL nodes.
+        self.stop_requested = True
+
+    def ponderhit(self) -> None:
+        # The opponent played the move a ponder search expected, so it carries on as
+        # a normal search, without starting again.
+        self.time_manager.ponderhit()
+
+    def _poll(self) -> None:
+        # Called every STOP_CHECK_INTERVAL nodes, as often as the search can afford
+        # to check the clock.
+        if self._can_stop:
+            self._check_limits()
+        if (
+            self.on_info
+            and self.stats.elapsed_ms() - self._last_info_ms >= INFO_INTERVAL_MS
+        ):
+            self._send_info(self.progress_line())
+
+    def _send_info(self, line: str) -> None:
+        if self.on_info:
+            self.on_info(line)
+            self._last_info_ms = self.stats.elapsed_ms()
+
+    def _report_current_move(self, move: int, move_number: int) -> None:
+        if self.stats.elapsed_ms() >= CURRMOVE_DELAY_MS:
+            self._send_info(
+                f"info depth {self._depth} "
+                f"currmove {uci_algebraic_notation(self.board.decode_move(move))} "
+                f"currmovenumber {move_number + 1}"
+            )
+
+    def _check_limits(self) -> None:
+        node_limit = self.time_manager.limits.nodes
+        if (
+            self.stop_requested
+            or (node_limit is not None and self.stats.nodes >= node_limit)
+            or self.time_manager.out_of_time()
+        ):
+            self.stopped = True
+
+    def search(
+        self, limits: SearchLimits, time_manager: TimeManager | None = None
+    ) -> Move | None:
+        # Iterative deepening, searching one ply deeper each iteration until the
+        # limits are reached. Only moves from completed iterations are returned.
+        move = self._search(limits, time_manager)
+        return self.board.decode_move(move) if move else None
+
+    def _search(
+        self, limits: SearchLimits, time_manager: TimeManager | None = None
+    ) -> int:
+        # Returns the best move encoded, or NO_MOVE if there isn't one. The time
+        # manager can be made by the caller, so that a ponderhit sent before the
+        # search thread gets this far still reaches it.
+        if self.helper_id == 0:
+            # Helpers use the main search's age, so they don't start another one.
+            self.transposition_table.new_search()
+        self.move_orderer.new_search()
+        self.time_manager = time_manager or TimeManager(
+            limits, self.board.turn == Player.WHITE
+        )
+        self.stats = SearchStats()
+        self._last_info_ms = 0
+        self.stopped = False
+        self._can_stop = False
+        self.completed_depth = 0
+        self.score = 0
+        self.pv = []
+        if self.helpers:
+            self.helpers.start(
+                self.board, limits, self.transposition_table, self.options
+            )
+
+        best_move = NO_MOVE
+        # Every other helper starts a ply deeper, so the searches spread out over
+        # different depths rather than all searching the same tree in step.
+        depth = 1 + self.helper_id % 2
+        # A stop requested before the first iteration finishes still waits for a move.
+        while not (
+            self.stop_requested and self._can_stop
+        ) and self.time_manager.should_start_iteration(depth):
+            self._depth = depth
+            score, move = self._aspiration_search(depth)
+            if self.stopped or move == NO_MOVE:
+                break
+            self.time_manager.iteration_finished(move != best_move, score)
+            best_move = move
+            self.completed_depth = depth
+            self.score = score
+            self.pv = self.pv_table[0]
+            self._can_stop = True
+            self._send_info(self.info_line())
+            depth += 1
+
+        if self.helpers:
+            # Use the deepest completed iteration out of all the searches.
+            for depth, score, pv, stats in self.helpers.stop():
+                self.stats.merge(stats)
+                if pv and depth > self.completed_depth:
+                    best_move = pv[0]
+                    self.completed_depth = depth
+                    self.score = score
+                    self.pv = pv
         return best_move
 
+    def _aspiration_search(self, depth: int) -> tuple[int, int]:
+        # The score rarely changes much from one iteration to the next, so the root
+        # is searched with a narrow window around the last score, which cuts off
+        # more. If the score falls outside the window, that side is widened and the
+        # root searched again.
+        if (
+            depth < ASPIRATION_MIN_DEPTH
+            or not self.completed_depth
+            or is_mate_score(self.score)
+        ):
+            return self.alpha_beta(depth, -INFINITE_SCORE, INFINITE_SCORE)
+        delta = ASPIRATION_WINDOW
+        alpha = self.score - delta
+        beta = self.score + delta
+        while True:
+            score, move = self.alpha_beta(depth, alpha, beta)
+            if self.stopped:
+                return score, move
+            if score <= alpha:
+                alpha = max(score - delta, -INFINITE_SCORE)
+            elif score >= beta:
+                beta = min(score + delta, INFINITE_SCORE)
+            else:
+                return score, move
+            delta *= 2
+
+    def ponder_move(self) -> int:
+        # The reply expected to the best move, encoded, for the GUI to ponder on, or
+        # NO_MOVE. The principal variation is cut short by transposition table
+        # cutoffs, so failing that it's the table's move for the position after.
+        if len(self.pv) != 1:
+            return self.pv[1] if self.pv else NO_MOVE
+        board = self.board
+        board.make_encoded_move(self.pv[0])
+        entry = self.transposition_table.probe(board.zobrist_key)
+        move = NO_MOVE
+        if entry and entry[3] in board.generate_encoded_moves():
+            move = entry[3]
+        board.undo_encoded_move(self.pv[0])
+        return move
+
+    def principal_variation(self) -> list[Move]:
+        # The moves the last completed iteration expects to be played.
+        board = self.board
+        moves = []
+        for move in self.pv:
+            moves.append(board.decode_move(move))
+            board.make_encoded_move(move)
+        for move in reversed(self.pv):
+            board.undo_encoded_move(move)
+        return moves
+
+    def info_line(self) -> str:
+        # The UCI info line for the last completed iteration.
+        pv = " ".join(
+            uci_algebraic_notation(move) for move in self.principal_variation()
+        )
+        return (
+            f"info depth {self.completed_depth} seldepth {self.stats.seldepth} "
+            f"score {uci_score(self.score)} {self._throughput()} pv {pv}"
+        )
+
+    def progress_line(self) -> str:
+        # The UCI info line sent every so often during an iteration.
+        return (
+            f"info depth {self._depth} seldepth {self.stats.seldepth} "
+            f"{self._throughput()}"
+        )
+
+    def _throughput(self) -> str:
+        stats = self.stats
+        return (
+            f"nodes {stats.nodes} nps {stats.nps()} "
+            f"hashfull {self.transposition_table.hashfull()} "
+            f"time {stats.elapsed_ms()}"
+        )
+
+    def search_info(self) -> dict[str, object]:
+        # The search's results and statistics, for monitoring.
+        return self.stats.to_dict() | {
+            "depth": self.completed_depth,
+            "score": self.score,
+            "hashfull": self.transposition_table.hashfull(),
+            "pv": [uci_algebraic_notation(move) for move in self.principal_variation()],
+        }
+
+    def best_move(self, depth: int) -> Move | None:
+        # None if the game is over, i.e. the side to move is checkmated or stalemated.
+        return self.search(SearchLimits(depth=depth))
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    # Mate scores count plies from the root, but a position can be reached at
+    # different plies. The table stores them counted from the position instead.
+    if is_mate_score(score):
+        return score + ply if score > 0 else score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    if is_mate_score(score):
+        return score - ply if score > 0 else score + ply
+    return score
+
+
+# What a helper is sent to search: the position, depth limit, the shared
+# transposition table's name, size and age, and the search options.
+HelperJob = tuple[Board, int | None, str, int, int, SearchOptions]
+# What a helper sends back: the depth, score and principal variation of its last
+# completed iteration, and its search statistics.
+HelperResult = tuple[int, int, list[int], SearchStats]
+
+
+class HelperPool:
+    """
+    Processes searching the same position alongside the main search (Lazy SMP).
+
+    Helpers don't divide up the work. Each searches the whole tree, and they share
+    results through a transposition table in shared memory, so they fill in entries
+    the others use. Processes are used as the GIL stops threads from searching in
+    parallel.
+    """
+
+    def __init__(self, count: int):
+        context = multiprocessing.get_context("spawn")
+        self._stop_event = context.Event()
+        self._results: Queue[HelperResult] = context.Queue()
+        self._jobs: list[Queue[HelperJob | None]] = []
+        self._processes = []
+        for helper_id in range(1, count + 1):
+            jobs: Queue[HelperJob | None] = context.Queue()
+            process = context.Process(
+                target=_run_helper,
+                args=(helper_id, jobs, self._results, self._stop_event),
+                daemon=True,
+            )
+            process.start()
+            self._jobs.append(jobs)
+            self._processes.append(process)
+
+    def start(
+        self,
+        board: Board,
+        limits: SearchLimits,
+        transposition_table: TranspositionTable,
+        options: SearchOptions,
+    ) -> None:
+        # Helpers search until stopped, as the main search decides when to finish.
+        if not transposition_table.name:
+            raise Exception("Helpers need a shared transposition table")
+        self._stop_event.clear()
+        # Queues pickle in the background, by which time the search has started
+        # making moves on the board, so they're sent a copy.
+        position = board.copy()
+        for jobs in self._jobs:
+            jobs.put(
+                (
+                    position,
+                    limits.depth,
+                    transposition_table.name,
+                    transposition_table.size_mb,
+                    transposition_table.age,
+                    options,
+                )
+            )
+
+    def stop(self) -> list[HelperResult]:
+        # Stop the helpers, returning each one's last completed iteration.
+        self._stop_event.set()
+        results: list[HelperResult] = []
+        while len(results) < len(self._jobs):
+            try:
+                results.append(self._results.get(timeout=1))
+            except queue.Empty:
+                # Don't wait forever for a helper that has crashed.
+                if not all(process.is_alive() for process in self._processes):
+                    raise Exception("A helper search process has stopped") from None
+        return results
+
+    def close(self) -> None:
+        for jobs in self._jobs:
+            jobs.put(None)
+        for process in self._processes:
+            process.join()
+
+
+def _run_helper(
+    helper_id: int,
+    jobs: "Queue[HelperJob | None]",
+    results: "Queue[HelperResult]",
+    stop_event: Event,
+) -> None:
+    # The loop run by each helper process, searching each position it's sent.
+    transposition_table = None
+    while job := jobs.get():
+        board, depth, table_name, size_mb, age, options = job
+        if not transposition_table or transposition_table.name != table_name:
+            # Attach on the first search, and again whenever the table is resized.
+            if transposition_table:
+                transposition_table.close()
+            transposition_table = TranspositionTable.attach(table_name, size_mb)
+        transposition_table.age = age
+        engine = ChessEngine(board, transposition_table)
+        engine.helper_id = helper_id
+        engine.options = options
+        threading.Thread(
+            target=_stop_when_set, args=(engine, stop_event), daemon=True
+        ).start()
+        engine._search(SearchLimits(depth=depth, infinite=True))
+        results.put((engine.completed_depth, engine.score, engine.pv, engine.stats))
+    if transposition_table:
+        transposition_table.close()
+
+
+def _stop_when_set(engine: ChessEngine, stop_event: Event) -> None:
+    stop_event.wait()
+    engine.stop()
+
+
+def uci_score(score: int) -> str:
+    # A score from the side to move's point of view, as a UCI info line gives it:
+    # either centipawns, or the number of moves to mate, negative if being mated.
+    if not is_mate_score(score):
+        return f"cp {score}"
+    plies = MATE_SCORE - abs(score)
+    return f"mate {(plies + 1) // 2}" if score > 0 else f"mate {-(plies // 2)}"
+
 
 def uci_algebraic_notation(move: Move) -> str:
     val = f"{move.start}{move.end}"
@@ -86,29 +787,303 @@ def uci_algebraic_notation(move: Move) -> str:
     return val
 
 
+def bench(
+    depth: int = DEFAULT_BENCH_DEPTH, options: SearchOptions | None = None
+) -> BenchResult:
+    # Search each bench position to a fixed depth, starting from an empty
+    # transposition table so the node counts don't depend on what came before.
+    transposition_table = TranspositionTable()
+    positions = []
+    for name, fen_str in BENCH_POSITIONS:
+        transposition_table.clear()
+        engine = ChessEngine(
+            Board(fen_str, BoardRepresentation.BITBOARDS), transposition_table
+        )
+        if options:
+            engine.options = options
+        engine.stop_requested = False
+        start_time = time.perf_counter()
+        move = engine.search(SearchLimits(depth=depth))
+        ms = round((time.perf_counter() - start_time) * 1000)
+        best_move = uci_algebraic_notation(move) if move else "0000"
+        positions.append(BenchPosition(name, fen_str, engine.nodes, ms, best_move))
+    return BenchResult(depth, positions)
+
+
 class UCIInterface:
     def __init__(self) -> None:
-        self.board = None
-        self.engine = ChessEngine(self.board)  # type: ignore
+        self.board: Board | None = None
+        # Kept across positions and games so results carry over between searches.
+        self.transposition_table = TranspositionTable()
+        # Like the table, options set by setoption carry over to new positions.
+        self.options = SearchOptions()
+        self.engine = ChessEngine(self.board, self.transposition_table)  # type: ignore
+        self.engine.options = self.options
+        self.engine.on_info = send
+        # Searches run on their own thread so commands like stop and isready are
+        # answered while searching.
+        self._search_thread: threading.Thread | None = None
+        self.debug = False
+        self.helpers: HelperPool | None = None
+        # Cleared while a search mustn't report its move yet, even if it has
+        # finished. go infinite waits for stop, and go ponder for ponderhit or stop.
+        self._can_report = threading.Event()
+        self._can_report.set()
+        # Moves are played from the book, while it has them, if OwnBook is set.
+        self.own_book = False
+        self.book: OpeningBook | None = None
+        # Whether to play the book's most common move, rather than any at random.
+        self.best_book_move = False
+        # The FEN and moves the board was last set up from, so a position that only
+        # adds moves to it can be reached by making them.
+        self._position_fen: str | None = None
+        self._position_moves: list[str] = []
 
     def uci(self) -> None:
-        print("id name SimpleChessEngine")
-        print("id author SCRB")
-        print("uciok")
+        send("id name SimpleChessEngine")
+        send("id author SCRB")
+        send(
+            f"option name Hash type spin default {DEFAULT_SIZE_MB} "
+            f"min 1 max {MAX_HASH_SIZE_MB}"
+        )
+        send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+        send("option name NullMovePruning type check default true")
+        send("option name LateMoveReductions type check default true")
+        send("option name FutilityPruning type check default true")
+        # Tells the GUI it can send go ponder. The engine doesn't need the setting.
+        send("option name Ponder type check default false")
+        send("option name OwnBook type check default false")
+        send("option name BookFile type string default <empty>")
+        send("option name BestBookMove type check default false")
+        send("uciok")
+
+    def setoption(self, command: str) -> None:
+        self.wait_for_search()
+        # The command looks like: setoption name <id> [value <x>]
+        parts = command.split()
+        if "name" not in parts:
+            return
+        name_index = parts.index("name") + 1
+        value_index = parts.index("value") if "value" in parts else len(parts)
+        name = " ".join(parts[name_index:value_index])
+        value = " ".join(parts[value_index + 1 :])
+
+        if name.lower() in ("hash", "threads"):
+            try:
+                number = int(value)
+            except ValueError:
+                # A bad number from the GUI keeps the current setting, rather than
+                # ending the engine.
+                send(f"info string Option {name} needs a number, not {value}")
+                return
+            if name.lower() == "hash":
+                size_mb = min(max(number, 1), MAX_HASH_SIZE_MB)
+                self.transposition_table.resize(size_mb)
+            else:
+                self.set_threads(min(max(number, 1), MAX_THREADS))
+        elif name.lower() == "nullmovepruning":
+            self.options.null_move_pruning = value.lower() == "true"
+        elif name.lower() == "latemovereductions":
+            self.options.late_move_reductions = value.lower() == "true"
+        elif name.lower() == "futilitypruning":
+            self.options.futility_pruning = value.lower() == "true"
+        elif name.lower() == "ownbook":
+            self.own_book = value.lower() == "true"
+        elif name.lower() == "bookfile":
+            self.set_book_file(value)
+        elif name.lower() == "bestbookmove":
+            self.best_book_move = value.lower() == "true"
+
+    def set_book_file(self, path: str) -> None:
+        if self.book:
+            self.book.close()
+            self.book = None
+        if not path or path == "<empty>":
+            return
+        try:
+            self.book = OpeningBook(path)
+        except (OSError, ValueError) as error:
+            # E.g. a missing or empty file. Carry on without a book.
+            send(f"info string Couldn't open book {path}, {error}")
+
+    def set_threads(self, threads: int) -> None:
+        # The main search runs in this process, with a helper process for each
+        # other thread.
+        self.close_helpers()
+        self.transposition_table.share(threads > 1)
+        if threads > 1:
+            self.helpers = HelperPool(threads - 1)
+        self.engine.helpers = self.helpers
+
+    def close_helpers(self) -> None:
+        if self.helpers:
+            self.helpers.close()
+            self.helpers = None
+
+    def debug_mode(self, command: str) -> None:
+        # The command looks like: debug [on | off]
+        self.debug = command.split()[-1] == "on"
+        self.engine.debug = self.debug
+
+    def ucinewgame(self) -> None:
+        self.wait_for_search()
+        self.transposition_table.clear()
+        # Start the next game's position from scratch, with fresh move ordering.
+        self._position_fen = None
 
     def isready(self) -> None:
-        print("readyok")
+        send("readyok")
 
-    def position(self, fen: str) -> None:
-        self.board = Board(fen)  # type: ignore
-        self.engine = ChessEngine(self.board)  # type: ignore
+    def position_command(self, command: str) -> None:
+        # The command looks like: position [fen <fen> | startpos] [moves <move> ...]
+        parts = command.split()
+        moves_index = parts.index("moves") if "moves" in parts else len(parts)
+        try:
+            if parts[1] == "fen":
+                fen_str = " ".join(parts[2:moves_index])
+            else:
+                fen_str = fen.STARTING_GAME_FEN
+            self.position(fen_str, parts[moves_index + 1 :])
+        except Exception as error:
+            # A bad FEN or move from the GUI leaves the previous position in place,
+            # rather than ending the engine.
+            send(f"info string {error}")
 
-    def go(self, depth: int) -> None:
-        best_move = self.engine.best_move(depth)
-        move_in_uci_alge = uci_algebraic_notation(best_move)  # type: ignore
-        print(f"bestmove {move_in_uci_alge}")
+    def position(self, fen: str, moves: list[str] | None = None) -> None:
+        # Raises an exception for an illegal move, leaving the previous position.
+        self.wait_for_search()
+        moves = moves or []
+        played = self._position_moves
+        # During a game each position is the last one with a move or two added, so
+        # only those are made. The board keeps the game's earlier positions, for
+        # spotting repetitions, and the engine keeps its move ordering tables.
+        extends = (
+            self.board is not None
+            and fen == self._position_fen
+            and moves[: len(played)] == played
+        )
+        board = (
+            self.board
+            if extends and self.board
+            else Board(fen, BoardRepresentation.BITBOARDS)
+        )
+        made: list[int] = []
+        for text in moves[len(played) if extends else 0 :]:
+            move = board.parse_uci_move(text)
+            if move is None:
+                for made_move in reversed(made):
+                    board.undo_encoded_move(made_move)
+                raise Exception(f"Illegal move in position command, {text}")
+            board.make_encoded_move(move)
+            made.append(move)
+        self._position_moves = list(moves)
+        if extends:
+            return
+        self.board = board
+        self.engine = ChessEngine(self.board, self.transposition_table)
+        self.engine.debug = self.debug
+        self.engine.helpers = self.helpers
+        self.engine.options = self.options
+        self.engine.on_info = send
+        self._position_fen = fen
+
+    def go(self, command: str) -> None:
+        self.wait_for_search()
+        limits = SearchLimits.from_go_command(command)
+        if self.board is None:
+            # GUIs send a position first, but search the starting one if not.
+            self.position(fen.STARTING_GAME_FEN)
+        if (
+            self.own_book
+            and self.book
+            and self.board
+            and not (limits.ponder or limits.infinite)
+        ):
+            book_move = self.book.choose(self.board, self.best_book_move)
+            if book_move:
+                send(f"bestmove {uci_notation(book_move)}")
+                return
+        self.engine.stop_requested = False
+        if limits.ponder or limits.infinite:
+            self._can_report.clear()
+        # Made here rather than on the search thread, so a ponderhit straight after
+        # go ponder can't go to the last search's time manager.
+        time_manager = TimeManager(limits, self.engine.board.turn == Player.WHITE)
+        self.engine.time_manager = time_manager
+        self._search_thread = threading.Thread(
+            target=self._search, args=(limits, time_manager), daemon=True
+        )
+        self._search_thread.start()
+
+    def _search(self, limits: SearchLimits, time_manager: TimeManager) -> None:
+        best_move = self.engine.search(limits, time_manager)
+        self._can_report.wait()
+        if self.debug:
+            # The full statistics, as JSON for monitoring to pick up.
+            send(f"info string stats {json.dumps(self.engine.search_info())}")
+        # UCI uses a null move when there is no move to make.
+        move_in_uci_alge = uci_algebraic_notation(best_move) if best_move else "0000"
+        ponder_move = self.engine.ponder_move() if best_move else NO_MOVE
+        if ponder_move:
+            send(f"bestmove {move_in_uci_alge} ponder {uci_notation(ponder_move)}")
+        else:
+            send(f"bestmove {move_in_uci_alge}")
+
+    def perft(self, command: str) -> None:
+        self.wait_for_search()
+        # The command looks like: go perft <depth>
+        parts = command.split()
+        depth = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 0
+        if depth < 1:
+            send("info string perft needs a depth of at least 1")
+            return
+        if self.board is None:
+            # As with go, count from the starting position if none has been set.
+            self.position(fen.STARTING_GAME_FEN)
+        start_time = time.perf_counter()
+        results = divide(self.engine.board, depth)
+        elapsed = time.perf_counter() - start_time
+        for move, nodes in results:
+            send(f"{uci_algebraic_notation(move)}: {nodes}")
+        total_nodes = sum(nodes for _, nodes in results)
+        send("")
+        send(f"Nodes searched: {total_nodes}")
+        send(f"Time: {round(elapsed * 1000)} ms")
+        send(f"Nodes per second: {round(total_nodes / elapsed) if elapsed else 0}")
+
+    def bench(self, command: str) -> None:
+        self.wait_for_search()
+        # The command looks like: bench [depth]
+        parts = command.split()
+        depth = int(parts[1]) if len(parts) > 1 else DEFAULT_BENCH_DEPTH
+        for line in bench(depth, self.options).lines():
+            send(line)
+
+    def ponderhit(self) -> None:
+        # The opponent played the move being pondered on, and the search is now on
+        # our time. A miss is sent as stop instead, and the position searched again,
+        # with what the ponder search found still in the transposition table.
+        if not self.engine.time_manager.pondering:
+            return
+        self.engine.ponderhit()
+        self._can_report.set()
+
+    def stop(self) -> None:
+        self.engine.stop()
+        self._can_report.set()
+        self.wait_for_search()
+
+    def wait_for_search(self) -> None:
+        if not self._can_report.is_set():
+            # Infinite and ponder searches only end with stop (or ponderhit), so a
+            # command that needs the search finished stops it.
+            self.stop()
+        if self._search_thread:
+            self._search_thread.join()
+            self._search_thread = None
 
     def print_board(self) -> None:
+        self.wait_for_search()
         self.board.display()  # type: ignore
         self.board.print_legal_moves()  # type: ignore
 
@@ -123,24 +1098,64 @@ class UCIInterface:
                     self.uci()
                 elif command == "isready":
                     self.isready()
-                elif command.startswith("position startpos"):
-                    # TODO: ChatGPT: handles moves passed in with this command.
-                    self.position(fen.STARTING_GAME_FEN)
-                elif command.startswith("position fen"):
-                    # TODO: ChatGPT: handles moves passed in with this command.
-                    fen_str = command.split("position fen ")[1]
-                    self.position(fen_str)
-                elif command.startswith("go depth"):
-                    depth = int(command.split("go depth ")[1])
-                    self.go(depth)
+                elif command.startswith("setoption"):
+                    self.setoption(command)
+                elif command.startswith("debug"):
+                    self.debug_mode(command)
+                elif command == "ucinewgame":
+                    self.ucinewgame()
+                elif command.startswith("position"):
+                    self.position_command(command)
+                elif command.startswith("go perft"):
+                    self.perft(command)
+                elif command.startswith("go"):
+                    self.go(command)
+                elif command.startswith("bench"):
+                    self.bench(command)
+                elif command == "stop":
+                    self.stop()
+                elif command == "ponderhit":
+                    self.ponderhit()
                 elif command == "d":
                     self.print_board()
                 elif command == "quit":
+                    self.stop()
                     break
             except EOFError:
+                # The GUI has gone, so nothing will send stop. Report the best move
+                # found so far rather than waiting, forever with go infinite.
+                self.stop()
                 break
+        self.close_helpers()
+        self.set_book_file("")
+        self.transposition_table.close()
+
+
+def main(argv: list[str]) -> None:
+    # Runs the UCI interface, or the bench with: python chess_engine.py bench
+    if argv[:1] != ["bench"]:
+        UCIInterface().run()
+        return
+    parser = argparse.ArgumentParser(
+        prog="chess_engine.py bench",
+        description="Search a fixed set of positions and report the speed.",
+    )
+    parser.add_argument(
+        "depth",
+        type=int,
+        nargs="?",
+        default=DEFAULT_BENCH_DEPTH,
+        help="depth to search each position to",
+    )
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv[1:])
+    result = bench(args.depth)
+    if args.json:
+        print(json.dumps(result.to_json(), indent=2))
+    else:
+        for line in result.lines():
+            print(line)
 
 
 if __name__ == "__main__":
-    uci_interface = UCIInterface()
-    uci_interface.run()
+    main(sys.argv[1:])
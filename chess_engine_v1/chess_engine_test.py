@@ -1,22 +1,58 @@
+import re
+import time
 import unittest
+from unittest.mock import patch
 
 import fen
-from board import Board
-from chess_engine import ChessEngine, uci_algebraic_notation
+from board import Board, BoardRepresentation
+from chess_engine import (
+    STOP_CHECK_INTERVAL,
+    ChessEngine,
+    SearchOptions,
+    uci_algebraic_notation,
+    uci_score,
+)
+from evaluation import INFINITE_SCORE, MATE_SCORE
 from move import Move
 from square import Squares
+from time_manager import SearchLimits
+from transposition_table import TranspositionTable
 
 
 class TestChessEngine(unittest.TestCase):
     def test_evaluate(self) -> None:
         board = Board(fen.STARTING_GAME_FEN)
         engine = ChessEngine(board)
-        # Test the evaluation function
-        self.assertEqual(engine.evaluate(), 0)  # Initial position is balanced
+        # Initial position is balanced
+        self.assertEqual(engine.evaluate(), 0)
 
-        # Test a board with a material imbalance
-        board.board[4][4] = "Q"  # Add a white queen in the center
-        self.assertEqual(engine.evaluate(), 9)
+        # An extra white queen in the center
+        board = Board("rnbqkbnr/pppppppp/8/8/4Q3/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        engine = ChessEngine(board)
+        self.assertGreater(engine.evaluate(), 900)
+
+    def test_evaluate_follows_moves(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board)
+        engine.debug = True
+        move = Move(Squares.E2, Squares.E4, "P")
+        board.make_move(move)
+        # The pawn is better placed in the center.
+        self.assertGreater(engine.evaluate(), 0)
+        board.undo_move(move)
+        self.assertEqual(engine.evaluate(), 0)
+        # The debug check runs at every leaf of a search.
+        engine.best_move(2)
+
+    def test_debug_detects_stale_evaluation(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN)
+        engine = ChessEngine(board)
+        # Changing the board directly bypasses the incremental update.
+        board.board[4][4] = "Q"
+        self.assertEqual(engine.evaluate(), 0)
+        engine.debug = True
+        with self.assertRaisesRegex(Exception, "doesn't match"):
+            engine.evaluate()
 
     def test_best_move(self) -> None:
         # White has a pawn that can't move and a king in the corner that can only move
@@ -30,6 +66,228 @@ class TestChessEngine(unittest.TestCase):
         expected_move = Move(Squares.H1, Squares.G1, "K")
         self.assertEqual(move, expected_move)
 
+    def test_best_move_with_warm_transposition_table(self) -> None:
+        # White can win the black queen with the rook.
+        fen_str = "3qk3/8/8/8/8/8/8/3RK3 w - - 0 1"
+        board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        expected_move = Move(Squares.D1, Squares.D8, "R", "q")
+        self.assertEqual(engine.best_move(2), expected_move)
+        # The second search reuses the first's results.
+        self.assertEqual(engine.best_move(2), expected_move)
+        self.assertIsNotNone(engine.transposition_table.probe(board.zobrist_key))
+
+    def test_mate_in_one(self) -> None:
+        board = Board(
+            "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1", BoardRepresentation.BITBOARDS
+        )
+        engine = ChessEngine(board, TranspositionTable(1))
+        self.assertEqual(engine.best_move(3), Move(Squares.D1, Squares.D8, "R"))
+        # Mate one ply from the root, however deep the search.
+        self.assertEqual(engine.score, MATE_SCORE - 1)
+
+    def test_mated_in_two_plies(self) -> None:
+        # White's king can only step to g1, where the other rook mates it.
+        fen_str = "k7/8/8/8/8/1r6/r7/7K w - - 0 1"
+        board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        engine.best_move(4)
+        self.assertEqual(engine.score, -(MATE_SCORE - 2))
+
+    def test_principal_variation(self) -> None:
+        fen_str = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+        board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        lines: list[str] = []
+        engine.on_info = lines.append
+        move = engine.best_move(5)
+        pv = engine.principal_variation()
+        self.assertEqual(board.board, Board(fen_str).board)
+        # The line can be cut short by transposition table cutoffs, but not made
+        # longer than the depth.
+        self.assertGreater(len(pv), 1)
+        self.assertLessEqual(len(pv), 5)
+        self.assertEqual(pv[0], move)
+        # Each move in the line can be played in turn.
+        for pv_move in pv:
+            self.assertIn(pv_move, board.generate_moves())
+            board.make_move(pv_move)
+        # The last line reported is the one for the final iteration, whatever
+        # progress lines came before it.
+        self.assertRegex(lines[-1], "^info depth 5 seldepth [0-9]+ score cp ")
+        self.assertTrue(
+            lines[-1].endswith(" pv " + " ".join(map(uci_algebraic_notation, pv)))
+        )
+
+    def test_search_stats(self) -> None:
+        fen_str = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+        board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        engine.best_move(4)
+        stats = engine.stats
+        self.assertEqual(stats.nodes, engine.nodes)
+        self.assertGreater(stats.quiescence_nodes, 0)
+        self.assertLess(stats.quiescence_nodes, stats.nodes)
+        self.assertGreater(stats.seldepth, 4)
+        self.assertGreater(stats.tt_hits, stats.tt_cutoffs)
+        self.assertGreater(stats.first_move_cutoffs, 0)
+        self.assertLessEqual(stats.first_move_cutoffs, stats.beta_cutoffs)
+        info = engine.search_info()
+        self.assertEqual(info["depth"], 4)
+        self.assertEqual(info["nodes"], stats.nodes)
+        self.assertEqual(
+            info["pv"], list(map(uci_algebraic_notation, engine.principal_variation()))
+        )
+
+    def test_progress_info(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        lines: list[str] = []
+        engine.on_info = lines.append
+        with (
+            patch("chess_engine.INFO_INTERVAL_MS", 0),
+            patch("chess_engine.CURRMOVE_DELAY_MS", 0),
+        ):
+            engine.best_move(3)
+        self.assertTrue(
+            any(
+                re.match("info depth 3 seldepth [0-9]+ nodes [0-9]+ ", line)
+                for line in lines
+            )
+        )
+        self.assertIn("info depth 3 currmove b1c3 currmovenumber 1", lines)
+
+    def test_progress_info_rate_limited(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        lines: list[str] = []
+        engine.on_info = lines.append
+        engine.best_move(3)
+        # A short search only reports each iteration.
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(" pv " in line for line in lines))
+
+    def test_uci_score(self) -> None:
+        self.assertEqual(uci_score(35), "cp 35")
+        self.assertEqual(uci_score(-120), "cp -120")
+        self.assertEqual(uci_score(MATE_SCORE - 1), "mate 1")
+        self.assertEqual(uci_score(MATE_SCORE - 3), "mate 2")
+        self.assertEqual(uci_score(-(MATE_SCORE - 2)), "mate -1")
+
+    def test_checkmate_and_stalemate(self) -> None:
+        checkmate = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+        engine = ChessEngine(Board(checkmate, BoardRepresentation.BITBOARDS))
+        self.assertIsNone(engine.best_move(2))
+        self.assertEqual(
+            engine.alpha_beta(2, -INFINITE_SCORE, INFINITE_SCORE), (-MATE_SCORE, 0)
+        )
+        stalemate = "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"
+        engine = ChessEngine(Board(stalemate, BoardRepresentation.BITBOARDS))
+        self.assertIsNone(engine.best_move(2))
+        self.assertEqual(engine.alpha_beta(2, -INFINITE_SCORE, INFINITE_SCORE), (0, 0))
+
+    def test_repetition_is_draw(self) -> None:
+        # A queen up, but the position has come up before.
+        board = Board("4k3/8/8/8/8/8/8/Q3K3 w - - 0 1", BoardRepresentation.BITBOARDS)
+        for text in ["e1d1", "e8d8", "d1e1", "d8e8"]:
+            board.make_encoded_move(board.parse_uci_move(text) or 0)
+        engine = ChessEngine(board)
+        self.assertEqual(
+            engine.alpha_beta(2, -INFINITE_SCORE, INFINITE_SCORE, ply=1), (0, 0)
+        )
+        # The root is searched as normal.
+        self.assertGreater(engine.alpha_beta(2, -INFINITE_SCORE, INFINITE_SCORE)[0], 0)
+
+    def test_selective_search_reduces_nodes(self) -> None:
+        # Each technique on its own searches fewer nodes than a full width search.
+        fen_str = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+        nodes = []
+        for options in [
+            SearchOptions(False, False, False),
+            SearchOptions(
+                null_move_pruning=True,
+                late_move_reductions=False,
+                futility_pruning=False,
+            ),
+            SearchOptions(
+                null_move_pruning=False,
+                late_move_reductions=True,
+                futility_pruning=False,
+            ),
+            SearchOptions(
+                null_move_pruning=False,
+                late_move_reductions=False,
+                futility_pruning=True,
+            ),
+        ]:
+            board = Board(fen_str, BoardRepresentation.BITBOARDS)
+            engine = ChessEngine(board, TranspositionTable(1))
+            engine.options = options
+            engine.best_move(5)
+            nodes.append(engine.nodes)
+        full_width, *selective = nodes
+        for selective_nodes in selective:
+            self.assertLess(selective_nodes, full_width)
+
+    def test_move_ordering_reduces_nodes(self) -> None:
+        fen_str = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+        nodes = {}
+        for use_move_ordering in [False, True]:
+            board = Board(fen_str, BoardRepresentation.BITBOARDS)
+            engine = ChessEngine(board, TranspositionTable(1))
+            engine.use_move_ordering = use_move_ordering
+            engine.best_move(3)
+            nodes[use_move_ordering] = engine.nodes
+        self.assertLess(nodes[True] * 2, nodes[False])
+
+    def test_quiescence_sees_recapture(self) -> None:
+        # The pawn on d5 is defended, so taking it with the queen loses the queen.
+        # Without quiescence search a depth 1 search would take it.
+        fen_str = "4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1"
+        board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        move = engine.best_move(1)
+        self.assertIsNotNone(move)
+        self.assertNotEqual(move, Move(Squares.D1, Squares.D5, "Q", "p"))
+
+    def test_quiescence_resolves_exchanges(self) -> None:
+        # White wins a pawn by exchanging knights on d5 and taking back with the rook.
+        # Taking with the rook first loses it for the knight.
+        fen_str = "4k3/8/2p5/3n4/8/4N3/8/3RK3 w - - 0 1"
+        for representation in BoardRepresentation:
+            board = Board(fen_str, representation)
+            engine = ChessEngine(board, TranspositionTable(1))
+            score = engine.quiescence(-INFINITE_SCORE, INFINITE_SCORE, 0)
+            # About a pawn, give or take the pieces' changes in position.
+            self.assertAlmostEqual(score, engine.evaluate() + 100, delta=50)
+            self.assertEqual(board.board, Board(fen_str).board)
+
+    def test_quiescence_stand_pat(self) -> None:
+        # With nothing to capture the static evaluation is returned.
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        score = engine.quiescence(-INFINITE_SCORE, INFINITE_SCORE, 0)
+        self.assertEqual(score, 0)
+        self.assertEqual(engine.nodes, 1)
+
+    def test_search_node_limit(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        move = engine.search(SearchLimits(nodes=3000))
+        self.assertIsNotNone(move)
+        # The limit is checked periodically, so the search can go a little over.
+        self.assertLess(engine.nodes, 3000 + STOP_CHECK_INTERVAL)
+        # The board is left as it was found.
+        self.assertEqual(board.board, Board(fen.STARTING_GAME_FEN).board)
+
+    def test_search_movetime(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        engine = ChessEngine(board, TranspositionTable(1))
+        start = time.perf_counter()
+        move = engine.search(SearchLimits(movetime=200))
+        self.assertIsNotNone(move)
+        self.assertLess(time.perf_counter() - start, 1)
+
 
 class TestUCIAlgebraicNotation(unittest.TestCase):
     def test_uci_algebraic_notation_white(self) -> None:
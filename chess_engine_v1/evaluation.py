@@ -0,0 +1,197 @@
+from bitboard import BOARD_SIZE, PIECE_CHARACTERS, square_index
+
+# Scores are in centipawns from white's point of view. Board keeps a middlegame and
+# an endgame score, each the sum of material and piece-square values, up to date as
+# pieces are added and removed. The evaluation blends the two by how much material
+# is left on the board.
+
+# Kings are never captured, as only legal moves are generated. Losing the king is
+# checkmate, which the search scores with MATE_SCORE, so kings have no material value.
+PIECE_VALUES = {
+    "P": 100,
+    "N": 320,
+    "B": 330,
+    "R": 500,
+    "Q": 900,
+    "K": 0,
+    "p": -100,
+    "n": -320,
+    "b": -330,
+    "r": -500,
+    "q": -900,
+    "k": 0,
+}
+
+# Score for giving checkmate. The search subtracts the number of plies from the root
+# to the mate, so quicker mates score higher. Anything within MAX_MATE_PLY of it is a
+# mate score rather than an evaluation.
+MATE_SCORE = 1_000_000
+MAX_MATE_PLY = 1000
+# Wider than any score, for searching with a full window.
+INFINITE_SCORE = MATE_SCORE + 1
+
+
+def is_mate_score(score: float) -> bool:
+    return abs(score) >= MATE_SCORE - MAX_MATE_PLY
+
+
+# How much each piece counts towards the game phase. The starting position has
+# MAX_PHASE, and a board with only kings and pawns has 0.
+PHASE_WEIGHTS = {piece: 0 for piece in PIECE_CHARACTERS} | {
+    "N": 1,
+    "B": 1,
+    "R": 2,
+    "Q": 4,
+    "n": 1,
+    "b": 1,
+    "r": 2,
+    "q": 4,
+}
+MAX_PHASE = 24
+
+# Piece-square bonuses for white pieces, laid out as seen from white's side with
+# rank 8 first. Black pieces use the same tables mirrored.
+# fmt: off
+_PAWN_MIDDLEGAME = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+    50,  50,  50,  50,  50,  50,  50,  50,
+    10,  10,  20,  30,  30,  20,  10,  10,
+     5,   5,  10,  25,  25,  10,   5,   5,
+     0,   0,   0,  20,  20,   0,   0,   0,
+     5,  -5, -10,   0,   0, -10,  -5,   5,
+     5,  10,  10, -20, -20,  10,  10,   5,
+     0,   0,   0,   0,   0,   0,   0,   0,
+]
+_PAWN_ENDGAME = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+    80,  80,  80,  80,  80,  80,  80,  80,
+    50,  50,  50,  50,  50,  50,  50,  50,
+    30,  30,  30,  30,  30,  30,  30,  30,
+    20,  20,  20,  20,  20,  20,  20,  20,
+    10,  10,  10,  10,  10,  10,  10,  10,
+    10,  10,  10,  10,  10,  10,  10,  10,
+     0,   0,   0,   0,   0,   0,   0,   0,
+]
+_KNIGHT = [
+   -50, -40, -30, -30, -30, -30, -40, -50,
+   -40, -20,   0,   0,   0,   0, -20, -40,
+   -30,   0,  10,  15,  15,  10,   0, -30,
+   -30,   5,  15,  20,  20,  15,   5, -30,
+   -30,   0,  15,  20,  20,  15,   0, -30,
+   -30,   5,  10,  15,  15,  10,   5, -30,
+   -40, -20,   0,   5,   5,   0, -20, -40,
+   -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP = [
+   -20, -10, -10, -10, -10, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,  10,  10,   5,   0, -10,
+   -10,   5,   5,  10,  10,   5,   5, -10,
+   -10,   0,  10,  10,  10,  10,   0, -10,
+   -10,  10,  10,  10,  10,  10,  10, -10,
+   -10,   5,   0,   0,   0,   0,   5, -10,
+   -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+     5,  10,  10,  10,  10,  10,  10,   5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+     0,   0,   0,   5,   5,   0,   0,   0,
+]
+_QUEEN = [
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,   5,   5,   5,   0, -10,
+    -5,   0,   5,   5,   5,   5,   0,  -5,
+     0,   0,   5,   5,   5,   5,   0,  -5,
+   -10,   5,   5,   5,   5,   5,   0, -10,
+   -10,   0,   5,   0,   0,   0,   0, -10,
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+_KING_MIDDLEGAME = [
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -20, -30, -30, -40, -40, -30, -30, -20,
+   -10, -20, -20, -20, -20, -20, -20, -10,
+    20,  20,   0,   0,   0,   0,  20,  20,
+    20,  30,  10,   0,   0,  10,  30,  20,
+]
+_KING_ENDGAME = [
+   -50, -40, -30, -20, -20, -30, -40, -50,
+   -30, -20, -10,   0,   0, -10, -20, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -30,   0,   0,   0,   0, -30, -30,
+   -50, -30, -30, -30, -30, -30, -30, -50,
+]
+# fmt: on
+
+_MIDDLEGAME_BONUSES = {
+    "P": _PAWN_MIDDLEGAME,
+    "N": _KNIGHT,
+    "B": _BISHOP,
+    "R": _ROOK,
+    "Q": _QUEEN,
+    "K": _KING_MIDDLEGAME,
+}
+_ENDGAME_BONUSES = {
+    "P": _PAWN_ENDGAME,
+    "N": _KNIGHT,
+    "B": _BISHOP,
+    "R": _ROOK,
+    "Q": _QUEEN,
+    "K": _KING_ENDGAME,
+}
+
+
+def _piece_square_table(bonuses: dict[str, list[int]]) -> dict[str, list[int]]:
+    # Combine material and bonuses into one signed value per piece and square index.
+    tables = {}
+    for piece in PIECE_CHARACTERS:
+        white_bonuses = bonuses[piece.upper()]
+        table = []
+        for square in range(BOARD_SIZE * BOARD_SIZE):
+            row, col = divmod(square, BOARD_SIZE)
+            if piece.isupper():
+                table.append(
+                    PIECE_VALUES[piece] + white_bonuses[(7 - row) * BOARD_SIZE + col]
+                )
+            else:
+                table.append(
+                    PIECE_VALUES[piece] - white_bonuses[row * BOARD_SIZE + col]
+                )
+        tables[piece] = table
+    return tables
+
+
+MIDDLEGAME_TABLES = _piece_square_table(_MIDDLEGAME_BONUSES)
+ENDGAME_TABLES = _piece_square_table(_ENDGAME_BONUSES)
+
+
+def compute(board: list[list[str]]) -> tuple[int, int, int]:
+    # Work out the (middlegame, endgame, phase) scores from scratch. Board keeps them
+    # up to date incrementally, this is for setting them up and checking them.
+    middlegame = endgame = phase = 0
+    for row, pieces in enumerate(board):
+        for col, piece in enumerate(pieces):
+            if piece != ".":
+                index = square_index(row, col)
+                middlegame += MIDDLEGAME_TABLES[piece][index]
+                endgame += ENDGAME_TABLES[piece][index]
+                phase += PHASE_WEIGHTS[piece]
+    return middlegame, endgame, phase
+
+
+def tapered(middlegame: int, endgame: int, phase: int) -> int:
+    # Blend the scores by the game phase. Promotions can take the phase past
+    # MAX_PHASE.
+    phase = min(phase, MAX_PHASE)
+    return (middlegame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
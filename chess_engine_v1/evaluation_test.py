@@ -0,0 +1,56 @@
+import unittest
+
+import evaluation
+import fen
+from board import Board
+
+
+def mirror(fen_str: str) -> str:
+    # The same position with the colours swapped and the board flipped.
+    placement, active_color, *_ = fen_str.split()
+    ranks = placement.split("/")
+    flipped = "/".join(reversed(ranks)).swapcase()
+    return f"{flipped} {'b' if active_color == 'w' else 'w'} - - 0 1"
+
+
+class TestEvaluation(unittest.TestCase):
+    def scores(self, fen_str: str) -> tuple[int, int, int]:
+        return evaluation.compute(Board(fen_str).board)
+
+    def test_starting_position(self) -> None:
+        middlegame, endgame, phase = self.scores(fen.STARTING_GAME_FEN)
+        self.assertEqual(middlegame, 0)
+        self.assertEqual(endgame, 0)
+        self.assertEqual(phase, evaluation.MAX_PHASE)
+
+    def test_mirrored_positions_have_opposite_scores(self) -> None:
+        fen_str = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w - - 0 1"
+        middlegame, endgame, phase = self.scores(fen_str)
+        self.assertNotEqual(middlegame, 0)
+        self.assertEqual(self.scores(mirror(fen_str)), (-middlegame, -endgame, phase))
+
+    def test_material(self) -> None:
+        # A rook up, with the kings on matching squares.
+        middlegame, endgame, phase = self.scores("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+        self.assertEqual(middlegame, evaluation.PIECE_VALUES["R"])
+        self.assertEqual(endgame, evaluation.PIECE_VALUES["R"])
+        self.assertEqual(phase, 2)
+
+    def test_king_centralisation_depends_on_phase(self) -> None:
+        # White's king has left the back rank, which is bad with all the pieces on
+        # the board and good without them.
+        with_pieces = self.scores("rnbqkbnr/8/8/8/4K3/8/8/RNBQ1BNR w - - 0 1")
+        without_pieces = self.scores("4k3/8/8/8/4K3/8/8/8 w - - 0 1")
+        self.assertLess(evaluation.tapered(*with_pieces), 0)
+        self.assertGreater(evaluation.tapered(*without_pieces), 0)
+
+    def test_tapered(self) -> None:
+        self.assertEqual(evaluation.tapered(100, 200, evaluation.MAX_PHASE), 100)
+        self.assertEqual(evaluation.tapered(100, 200, 0), 200)
+        self.assertEqual(evaluation.tapered(100, 200, evaluation.MAX_PHASE // 2), 150)
+        # Promotions can leave more material than the starting position.
+        self.assertEqual(evaluation.tapered(100, 200, evaluation.MAX_PHASE + 4), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,15 +4,23 @@ STARTING_GAME_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 
 
 class FENRecord:
-    # TODO: Add tests for FENRecord.
-
     """You can learn more about the FEN Record format at https://en.wikipedia.org/wiki/Forsyth%E2%80%93Edwards_Notation"""
 
     def __init__(self, fen_str: str):
-        fen_parts = fen_str.split(" ")
+        fen_parts = fen_str.split()
         self.board_str = fen_parts[0]
 
-        # TODO: ChatGPT: Handle rest of FEN string.
+        # The remaining fields are optional, and default to those of a new game.
+        self.active_color = fen_parts[1] if len(fen_parts) > 1 else "w"
+        self.castling = fen_parts[2] if len(fen_parts) > 2 else "-"
+        self.en_passant = fen_parts[3] if len(fen_parts) > 3 else "-"
+        self.halfmove_clock = int(fen_parts[4]) if len(fen_parts) > 4 else 0
+        self.fullmove_number = int(fen_parts[5]) if len(fen_parts) > 5 else 1
+
+        if self.active_color not in ["w", "b"]:
+            raise Exception(f"Invalid active color in FEN, {self.active_color}")
+        if self.castling != "-" and not set(self.castling) <= set("KQkq"):
+            raise Exception(f"Invalid castling availability in FEN, {self.castling}")
 
     def board(self) -> list[list[str]]:
         def valid_board_character(character: str) -> bool:
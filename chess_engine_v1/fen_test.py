@@ -0,0 +1,39 @@
+import unittest
+
+import fen
+
+
+class TestFENRecord(unittest.TestCase):
+    def test_starting_position_fields(self) -> None:
+        record = fen.FENRecord(fen.STARTING_GAME_FEN)
+        self.assertEqual(record.active_color, "w")
+        self.assertEqual(record.castling, "KQkq")
+        self.assertEqual(record.en_passant, "-")
+        self.assertEqual(record.halfmove_clock, 0)
+        self.assertEqual(record.fullmove_number, 1)
+
+    def test_fields_after_double_pawn_move(self) -> None:
+        record = fen.FENRecord(
+            "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b Kq e3 3 12"
+        )
+        self.assertEqual(record.active_color, "b")
+        self.assertEqual(record.castling, "Kq")
+        self.assertEqual(record.en_passant, "e3")
+        self.assertEqual(record.halfmove_clock, 3)
+        self.assertEqual(record.fullmove_number, 12)
+
+    def test_missing_fields_use_defaults(self) -> None:
+        record = fen.FENRecord("8/8/8/8/8/8/8/8")
+        self.assertEqual(record.active_color, "w")
+        self.assertEqual(record.castling, "-")
+        self.assertEqual(record.en_passant, "-")
+
+    def test_invalid_fields(self) -> None:
+        with self.assertRaises(Exception):  # noqa: B017
+            fen.FENRecord("8/8/8/8/8/8/8/8 x - - 0 1")
+        with self.assertRaises(Exception):  # noqa: B017
+            fen.FENRecord("8/8/8/8/8/8/8/8 w KX - 0 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,29 @@
-from square import Square
+from square import Square, Squares
 
 BOARD_SIZE = 8
 
+# Moves are passed around the search as 16-bit ints rather than Move objects. From
+# the lowest bit up:
+#   start      6 bits, the start square's index
+#   end        6 bits, the end square's index
+#   promotion  3 bits, offset by one into PROMOTION_CODES so zero means none
+#   capture    1 bit
+# A move never starts and ends on the same square, so an encoded move is never zero.
+SQUARE_MASK = 0x3F
+END_SHIFT = 6
+PROMOTION_SHIFT = 12
+PROMOTION_MASK = 0x7
+CAPTURE_FLAG = 1 << 15
+
+# Promotion pieces in the order used by encoded moves.
+PROMOTION_CODES = "nbrq"
+
 
 class Move:
+    # Only created at the edges, e.g. for UCI output and tests. Board can turn an
+    # encoded move back into one with decode_move.
+    __slots__ = ("end", "piece_captured", "piece_moved", "promotion_piece", "start")
+
     def __init__(
         self,
         start: Square,
@@ -18,6 +38,19 @@ class Move:
         self.piece_captured = piece_captured
         self.promotion_piece = promotion_piece
 
+    def encode(self) -> int:
+        promotion = (
+            PROMOTION_CODES.index(self.promotion_piece.lower()) + 1
+            if self.promotion_piece
+            else 0
+        )
+        return (
+            self.start.index
+            | self.end.index << END_SHIFT
+            | promotion << PROMOTION_SHIFT
+            | (CAPTURE_FLAG if self.piece_captured else 0)
+        )
+
     def __str__(self) -> str:
         val = f"{self.piece_moved} from {self.start} to {self.end}"
 
@@ -44,12 +77,13 @@ class Move:
         )
 
     def __hash__(self) -> int:
-        return hash(
-            (
-                self.start,
-                self.end,
-                self.piece_moved,
-                self.piece_captured,
-                self.promotion_piece,
-            )
-        )
+        return hash((self.encode(), self.piece_moved))
+
+
+def uci_notation(move: int) -> str:
+    # An encoded move in UCI's long algebraic notation, e.g. e2e4, or e7e8q for a
+    # promotion.
+    start = Squares.square_from_index(move & SQUARE_MASK)
+    end = Squares.square_from_index(move >> END_SHIFT & SQUARE_MASK)
+    promotion = move >> PROMOTION_SHIFT & PROMOTION_MASK
+    return f"{start}{end}{PROMOTION_CODES[promotion - 1] if promotion else ''}"
@@ -0,0 +1,142 @@
+from collections.abc import Iterator
+
+from board import Board
+from move import (
+    CAPTURE_FLAG,
+    END_SHIFT,
+    PROMOTION_CODES,
+    PROMOTION_MASK,
+    PROMOTION_SHIFT,
+    SQUARE_MASK,
+)
+from transposition_table import NO_MOVE
+
+# Deepest ply that killer moves are kept for.
+MAX_PLY = 128
+
+# Piece values used only to order captures, indexed by the uppercase piece.
+ORDERING_VALUES = {"P": 1, "N": 3, "B": 3, "R": 5, "Q": 9, "K": 100}
+
+# History scores are halved once one reaches this.
+HISTORY_LIMIT = 80_000
+# The start and end squares of an encoded move.
+_FROM_TO_MASK = 0xFFF
+
+
+class MoveOrderer:
+    """
+    Orders moves so the ones most likely to cause a cutoff are searched first.
+
+    Moves are produced in stages, and each stage is only generated once the
+    previous one is used up, so a node that cuts off early doesn't pay for
+    generating the rest. The stages are the transposition table move, good captures
+    by most valuable victim/least valuable attacker, the killer moves that caused
+    cutoffs at the same ply, quiet moves by how often they caused cutoffs anywhere
+    in the tree, and finally bad captures.
+    """
+
+    def __init__(self) -> None:
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY)]
+        # history[start and end squares], i.e. the low 12 bits of the encoded move,
+        # bumped whenever a quiet move causes a cutoff.
+        self.history = [0] * 4096
+
+    def new_search(self) -> None:
+        # Killers are specific to the previous position, but history is still useful
+        # so it's only scaled down.
+        for killers in self.killers:
+            killers[0] = killers[1] = NO_MOVE
+        self._age_history()
+
+    def _age_history(self) -> None:
+        history = self.history
+        for index, score in enumerate(history):
+            history[index] = score // 2
+
+    def capture_score(self, board: Board, move: int) -> int:
+        # Most valuable victim, then least valuable attacker.
+        victim, attacker = self._victim_and_attacker(board, move)
+        promotion = move >> PROMOTION_SHIFT & PROMOTION_MASK
+        if promotion:
+            victim += ORDERING_VALUES[PROMOTION_CODES[promotion - 1].upper()]
+        return victim * 100 - attacker
+
+    def is_good_capture(self, board: Board, move: int) -> bool:
+        # A capture is assumed to be good unless it risks a more valuable piece for a
+        # less valuable one. Promotions are always worth trying early.
+        if move >> PROMOTION_SHIFT & PROMOTION_MASK:
+            return True
+        victim, attacker = self._victim_and_attacker(board, move)
+        return victim >= attacker
+
+    def _victim_and_attacker(self, board: Board, move: int) -> tuple[int, int]:
+        start = move & SQUARE_MASK
+        end = move >> END_SHIFT & SQUARE_MASK
+        rows = board.board
+        victim = rows[end >> 3][end & 7]
+        attacker = rows[start >> 3][start & 7]
+        if victim != ".":
+            victim_value = ORDERING_VALUES[victim.upper()]
+        elif move & CAPTURE_FLAG:
+            # An en-passant capture's end square is empty.
+            victim_value = ORDERING_VALUES["P"]
+        else:
+            # A promotion that doesn't capture.
+            victim_value = 0
+        return victim_value, ORDERING_VALUES[attacker.upper()]
+
+    def history_score(self, move: int) -> int:
+        return self.history[move & _FROM_TO_MASK]
+
+    def staged_moves(self, board: Board, hash_move: int, ply: int) -> Iterator[int]:
+        # The board must be back in the same position each time the next move is
+        # asked for, i.e. every move made has been undone.
+        if hash_move != NO_MOVE and board.is_valid_move(hash_move):
+            yield hash_move
+
+        captures = sorted(
+            board.generate_encoded_moves(quiets=False),
+            key=lambda move: self.capture_score(board, move),
+            reverse=True,
+        )
+        bad_captures = []
+        for move in captures:
+            if move == hash_move:
+                continue
+            if self.is_good_capture(board, move):
+                yield move
+            else:
+                bad_captures.append(move)
+
+        killers = [
+            killer for killer in self.killers[ply] if killer not in (NO_MOVE, hash_move)
+        ]
+        for killer in killers:
+            # Killers come from other positions, so might not be possible here.
+            if board.is_valid_move(killer):
+                yield killer
+
+        quiets = sorted(
+            board.generate_encoded_moves(captures=False),
+            key=self.history_score,
+            reverse=True,
+        )
+        for move in quiets:
+            if move != hash_move and move not in killers:
+                yield move
+
+        yield from bad_captures
+
+    def record_cutoff(self, move: int, depth: int, ply: int) -> None:
+        # Captures are already searched early, so only quiet moves are recorded.
+        if move & CAPTURE_FLAG or move >> PROMOTION_SHIFT & PROMOTION_MASK:
+            return
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        from_to = move & _FROM_TO_MASK
+        self.history[from_to] += depth * depth
+        if self.history[from_to] >= HISTORY_LIMIT:
+            self._age_history()
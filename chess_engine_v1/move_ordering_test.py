@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+
+from board import Board, BoardRepresentation
+from move import Move
+from move_ordering import MoveOrderer
+from square import Squares
+from transposition_table import NO_MOVE
+
+
+class TestMoveOrderer(unittest.TestCase):
+    # White can capture a queen with a pawn or queen, and can capture a pawn with the
+    # queen that a pawn defends.
+    FEN = "3qk3/1p1p4/8/3q4/p3P3/8/P3P3/1N1QK1N1 w - - 0 1"
+
+    def test_stage_order(self) -> None:
+        board = Board(self.FEN, BoardRepresentation.BITBOARDS)
+        hash_move = Move(Squares.E2, Squares.E3, "P").encode()
+        pawn_takes_queen = Move(Squares.E4, Squares.D5, "P", "q").encode()
+        queen_takes_queen = Move(Squares.D1, Squares.D5, "Q", "q").encode()
+        queen_takes_pawn = Move(Squares.D1, Squares.A4, "Q", "p").encode()
+        killer = Move(Squares.G1, Squares.F3, "N").encode()
+        history_quiet = Move(Squares.B1, Squares.C3, "N").encode()
+
+        orderer = MoveOrderer()
+        orderer.record_cutoff(killer, 1, 3)
+        orderer.record_cutoff(history_quiet, 4, 5)
+
+        ordered = list(orderer.staged_moves(board, hash_move, 3))
+        self.assertEqual(
+            ordered[:5],
+            [hash_move, pawn_takes_queen, queen_takes_queen, killer, history_quiet],
+        )
+        self.assertEqual(ordered[-1], queen_takes_pawn)
+        # Every move is produced exactly once.
+        self.assertEqual(len(ordered), len(set(ordered)))
+        self.assertSetEqual(set(ordered), set(board.generate_encoded_moves()))
+
+    def test_stages_generated_lazily(self) -> None:
+        board = Board(self.FEN, BoardRepresentation.BITBOARDS)
+        orderer = MoveOrderer()
+        with patch.object(
+            board, "generate_encoded_moves", wraps=board.generate_encoded_moves
+        ) as generate_encoded_moves:
+            moves = orderer.staged_moves(board, NO_MOVE, 0)
+            self.assertEqual(
+                next(moves), Move(Squares.E4, Squares.D5, "P", "q").encode()
+            )
+            # Only the captures have been generated so far.
+            generate_encoded_moves.assert_called_once_with(quiets=False)
+            list(moves)
+            generate_encoded_moves.assert_called_with(captures=False)
+
+    def test_invalid_hash_and_killer_moves_skipped(self) -> None:
+        board = Board(self.FEN, BoardRepresentation.BITBOARDS)
+        orderer = MoveOrderer()
+        # A move for a piece that isn't there, and one onto a white piece.
+        orderer.record_cutoff(Move(Squares.H1, Squares.H2, "R").encode(), 1, 0)
+        blocked = Move(Squares.D1, Squares.E2, "Q")
+        ordered = list(orderer.staged_moves(board, blocked.encode(), 0))
+        self.assertEqual(len(ordered), len(board.generate_moves()))
+
+    def test_killers_are_per_ply(self) -> None:
+        orderer = MoveOrderer()
+        first = Move(Squares.G1, Squares.F3, "N").encode()
+        second = Move(Squares.B1, Squares.C3, "N").encode()
+        orderer.record_cutoff(first, 1, 2)
+        orderer.record_cutoff(second, 1, 2)
+        self.assertEqual(orderer.killers[2], [second, first])
+        self.assertEqual(orderer.killers[3], [NO_MOVE, NO_MOVE])
+
+    def test_captures_not_recorded(self) -> None:
+        orderer = MoveOrderer()
+        capture = Move(Squares.D1, Squares.D5, "Q", "q").encode()
+        orderer.record_cutoff(capture, 3, 1)
+        self.assertEqual(orderer.killers[1], [NO_MOVE, NO_MOVE])
+        self.assertEqual(sum(orderer.history), 0)
+
+    def test_new_search_ages_history(self) -> None:
+        orderer = MoveOrderer()
+        move = Move(Squares.G1, Squares.F3, "N").encode()
+        orderer.record_cutoff(move, 4, 1)
+        orderer.new_search()
+        self.assertEqual(orderer.history_score(move), 8)
+        self.assertEqual(orderer.killers[1], [NO_MOVE, NO_MOVE])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from move import Move
+from move import Move, uci_notation
 from square import Squares
 
 
@@ -21,6 +21,24 @@ class TestMove(unittest.TestCase):
         self.assertEqual(move.piece_captured, None)
         self.assertEqual(move.promotion_piece, "Q")
 
+    def test_move_encode(self) -> None:
+        move = Move(Squares.E2, Squares.E4, "P")
+        self.assertEqual(move.encode(), 12 | 28 << 6)
+        self.assertNotEqual(move.encode(), Move(Squares.E4, Squares.E2, "P").encode())
+
+    def test_move_encode_with_promotion(self) -> None:
+        queen = Move(Squares.E7, Squares.E8, "P", promotion_piece="Q")
+        knight = Move(Squares.E7, Squares.E8, "P", promotion_piece="N")
+        self.assertEqual(queen.encode(), 52 | 60 << 6 | 4 << 12)
+        self.assertEqual(knight.encode(), 52 | 60 << 6 | 1 << 12)
+
+    def test_uci_notation(self) -> None:
+        self.assertEqual(
+            uci_notation(Move(Squares.E2, Squares.E4, "P").encode()), "e2e4"
+        )
+        promotion = Move(Squares.E7, Squares.D8, "P", "r", promotion_piece="N")
+        self.assertEqual(uci_notation(promotion.encode()), "e7d8n")
+
     def test_move_str(self) -> None:
         move = Move(Squares.E2, Squares.E4, "P", "p")
         self.assertEqual(str(move), "P from e2 to e4, capturing p")
@@ -0,0 +1,165 @@
+import mmap
+import random
+import struct
+
+from board import Board, Player
+from polyglot_keys import RANDOM_64
+
+# Each book entry is a 64-bit key, a 16-bit move, a 16-bit weight and a 32-bit
+# learning value, big-endian, with the entries sorted by key.
+ENTRY_SIZE = 16
+_KEY = struct.Struct(">Q")
+_MOVE_AND_WEIGHT = struct.Struct(">HH")
+
+# Where each piece's keys start, by its character's byte. A piece's place in the
+# string is its kind in Polyglot keys.
+_PIECE_KEYS = {ord(piece): 64 * kind for kind, piece in enumerate("pPnNbBrRqQkK")}
+_EMPTY = ord(".")
+_CASTLING_KEYS = 768
+_EN_PASSANT_KEYS = 772
+_WHITE_TO_MOVE_KEY = 780
+_PROMOTIONS = ["", "n", "b", "r", "q"]
+# Polyglot writes castling as the king taking its own rook.
+_CASTLING_MOVES = {
+    "e1h1": "e1g1",
+    "e1a1": "e1c1",
+    "e8h8": "e8g8",
+    "e8a8": "e8c8",
+}
+_ROOK_CAPTURES = {move: polyglot for polyglot, move in _CASTLING_MOVES.items()}
+
+
+def polyglot_key(board: Board) -> int:
+    # The position's key in Polyglot books. Unlike Board's Zobrist key it uses fixed
+    # random numbers, so books made by other programs can be read.
+    key = 0
+    squares = board.squares
+    for index, piece in enumerate(squares):
+        if piece != _EMPTY:
+            key ^= RANDOM_64[_PIECE_KEYS[piece] + index]
+    for bit in range(4):
+        if board.castling_rights & 1 << bit:
+            key ^= RANDOM_64[_CASTLING_KEYS + bit]
+    # The en-passant column only counts if a pawn is there to take en passant.
+    en_passant = board.en_passant
+    if en_passant is not None:
+        white = board.turn == Player.WHITE
+        # The pawn that could capture stands beside the one that moved two squares.
+        pawn_row = en_passant.row - 1 if white else en_passant.row + 1
+        pawn = ord("P" if white else "p")
+        col = en_passant.col
+        if any(
+            0 <= side < 8 and squares[pawn_row * 8 + side] == pawn
+            for side in (col - 1, col + 1)
+        ):
+            key ^= RANDOM_64[_EN_PASSANT_KEYS + col]
+    if board.turn == Player.WHITE:
+        key ^= RANDOM_64[_WHITE_TO_MOVE_KEY]
+    return key
+
+
+def _move_text(polyglot_move: int) -> str:
+    # A Polyglot move in UCI notation. From low bits to high, it's the end column and
+    # row, the start column and row, then the promotion piece, 3 bits each.
+    end_col = polyglot_move & 7
+    end_row = polyglot_move >> 3 & 7
+    start_col = polyglot_move >> 6 & 7
+    start_row = polyglot_move >> 9 & 7
+    promotion = polyglot_move >> 12 & 7
+    return (
+        f"{'abcdefgh'[start_col]}{start_row + 1}"
+        f"{'abcdefgh'[end_col]}{end_row + 1}{_PROMOTIONS[promotion]}"
+    )
+
+
+class OpeningBook:
+    """
+    A Polyglot opening book, looked up without reading it into memory.
+
+    The file is memory-mapped and binary searched by key, so a probe reads a few
+    pages and no more, and engine processes sharing a book share the operating
+    system's cached copy of it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.entries = len(self._data) // ENTRY_SIZE
+        # Seeded from the system, so games from the same position vary.
+        self._random = random.Random()  # noqa: S311
+
+    def _first_entry(self, key: int) -> int:
+        # The index of the first entry with a key of at least key.
+        low = 0
+        high = self.entries
+        data = self._data
+        while low < high:
+            middle = (low + high) // 2
+            if _KEY.unpack_from(data, middle * ENTRY_SIZE)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def moves(self, board: Board) -> list[tuple[int, int]]:
+        # The book's moves for a position, encoded, with their weights. Entries for
+        # moves that can't be played there, e.g. from a key collision, are skipped.
+        key = polyglot_key(board)
+        data = self._data
+        moves = []
+        index = self._first_entry(key)
+        while (
+            index < self.entries
+            and _KEY.unpack_from(data, index * ENTRY_SIZE)[0] == key
+        ):
+            polyglot_move, weight = _MOVE_AND_WEIGHT.unpack_from(
+                data, index * ENTRY_SIZE + 8
+            )
+            index += 1
+            text = _move_text(polyglot_move)
+            start = text[:2]
+            if board.board[int(start[1]) - 1]["abcdefgh".index(start[0])] in "Kk":
+                text = _CASTLING_MOVES.get(text, text)
+            move = board.parse_uci_move(text)
+            if move is not None:
+                moves.append((move, weight))
+        return moves
+
+    def choose(self, board: Board, best: bool = False) -> int | None:
+        # A book move for the position, encoded, or None if it's out of the book.
+        # Picks the move with the highest weight, or at random in proportion to the
+        # weights so the engine doesn't always play the same opening.
+        moves = [(move, weight) for move, weight in self.moves(board) if weight]
+        if not moves:
+            return None
+        if best:
+            return max(moves, key=lambda entry: entry[1])[0]
+        return self._random.choices(
+            [move for move, _ in moves], weights=[weight for _, weight in moves]
+        )[0]
+
+    def close(self) -> None:
+        self._data.close()
+
+
+def write_book(path: str, entries: list[tuple[Board, str, int]]) -> None:
+    # Write a Polyglot book of the given positions, moves in UCI notation, and
+    # weights. For making small books, e.g. for tests.
+    records = []
+    for board, text, weight in entries:
+        start_row, start_col = int(text[1]) - 1, "abcdefgh".index(text[0])
+        if board.board[start_row][start_col] in "Kk":
+            text = _ROOK_CAPTURES.get(text, text)
+        end_row, end_col = int(text[3]) - 1, "abcdefgh".index(text[2])
+        polyglot_move = (
+            end_col
+            | end_row << 3
+            | start_col << 6
+            | start_row << 9
+            | _PROMOTIONS.index(text[4:]) << 12
+        )
+        records.append((polyglot_key(board), polyglot_move, weight))
+    with open(path, "wb") as file:
+        for key, polyglot_move, weight in sorted(records):
+            file.write(struct.pack(">QHHI", key, polyglot_move, weight, 0))
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+import fen
+from board import Board, BoardRepresentation
+from move import uci_notation
+from opening_book import OpeningBook, polyglot_key, write_book
+
+# Keys given in the Polyglot book format's description.
+KNOWN_KEYS = [
+    ("", 0x463B96181691FC9C),
+    ("e2e4", 0x823C9B50FD114196),
+    ("e2e4 d7d5", 0x0756B94461C50FB0),
+    ("e2e4 d7d5 e4e5", 0x662FAFB965DB29D4),
+    ("e2e4 d7d5 e4e5 f7f5", 0x22A48B5A8E47FF78),
+    ("e2e4 d7d5 e4e5 f7f5 e1e2", 0x652A607CA3F242C1),
+    ("e2e4 d7d5 e4e5 f7f5 e1e2 e8f7", 0x00FDD303C946BDD9),
+    ("a2a4 b7b5 h2h4 b5b4 c2c4", 0x3C8123EA7B067637),
+    ("a2a4 b7b5 h2h4 b5b4 c2c4 b4c3 a1a3", 0x5C3F9B829B279560),
+]
+
+
+def board_after(moves: str) -> Board:
+    board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+    for text in moves.split():
+        board.make_encoded_move(board.parse_uci_move(text) or 0)
+    return board
+
+
+class TestPolyglotKey(unittest.TestCase):
+    def test_known_keys(self) -> None:
+        for moves, key in KNOWN_KEYS:
+            self.assertEqual(polyglot_key(board_after(moves)), key, moves)
+
+
+class TestOpeningBook(unittest.TestCase):
+    def setUp(self) -> None:
+        file, self.path = tempfile.mkstemp(suffix=".bin")
+        os.close(file)
+        castling = Board(
+            "r3k2r/pppppppp/8/8/8/8/PPPPPPPP/R3K2R w KQkq - 0 1",
+            BoardRepresentation.BITBOARDS,
+        )
+        entries = [
+            (board_after(""), "e2e4", 10),
+            (board_after(""), "d2d4", 30),
+            (board_after(""), "g1f3", 0),
+            (board_after("e2e4"), "c7c5", 5),
+            (castling, "e1g1", 1),
+        ]
+        # Other positions around them, so the binary search has work to do.
+        for moves, _ in KNOWN_KEYS[2:]:
+            entries.append((board_after(moves), "a2a3", 1))
+        write_book(self.path, entries)
+        self.book = OpeningBook(self.path)
+        self.castling = castling
+
+    def tearDown(self) -> None:
+        self.book.close()
+        os.remove(self.path)
+
+    def test_moves(self) -> None:
+        moves = {
+            uci_notation(move): weight
+            for move, weight in self.book.moves(board_after(""))
+        }
+        self.assertEqual(moves, {"e2e4": 10, "d2d4": 30, "g1f3": 0})
+        self.assertEqual(
+            [uci_notation(move) for move, _ in self.book.moves(board_after("e2e4"))],
+            ["c7c5"],
+        )
+        # Castling is stored as the king taking its rook.
+        self.assertEqual(
+            [uci_notation(move) for move, _ in self.book.moves(self.castling)],
+            ["e1g1"],
+        )
+        # Illegal moves, as key collisions would give, are left out.
+        self.assertEqual(self.book.moves(board_after(KNOWN_KEYS[5][0])), [])
+        self.assertEqual(self.book.moves(board_after("h2h3")), [])
+
+    def test_choose(self) -> None:
+        board = board_after("")
+        self.assertEqual(uci_notation(self.book.choose(board, best=True) or 0), "d2d4")
+        chosen = Counter(uci_notation(self.book.choose(board) or 0) for _ in range(400))
+        # In proportion to the weights, and never a move with no weight.
+        self.assertEqual(set(chosen), {"e2e4", "d2d4"})
+        self.assertGreater(chosen["d2d4"], chosen["e2e4"])
+        self.assertIsNone(self.book.choose(board_after("h2h3")))
+
+    def test_probe_between_entries(self) -> None:
+        # Positions whose keys fall before, between and after the book's entries
+        # are found, or not, by the binary search.
+        keys = sorted(
+            (polyglot_key(board_after(moves)), moves) for moves, _ in KNOWN_KEYS
+        )
+        for _, moves in keys:
+            board = board_after(moves)
+            found = [uci_notation(move) for move, _ in self.book.moves(board)]
+            if moves in ("", "e2e4"):
+                self.assertTrue(found, moves)
+            elif board.parse_uci_move("a2a3") is not None:
+                self.assertEqual(found, ["a2a3"], moves)
+            else:
+                self.assertEqual(found, [], moves)
+
+
+if __name__ == "__main__":
+    unittest.main()
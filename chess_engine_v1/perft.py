@@ -0,0 +1,145 @@
+import argparse
+import json
+import sys
+import time
+
+import fen
+from board import Board, BoardRepresentation
+from move import Move
+
+# Positions with known perft results, i.e. the number of legal move sequences of
+# each length, starting from depth 1. From the Chess Programming Wiki's perft
+# results page. Between them they cover castling, en passant (including captures
+# that would expose the king), promotions and checks.
+PERFT_POSITIONS = [
+    ("startpos", fen.STARTING_GAME_FEN, [20, 400, 8_902, 197_281, 4_865_609]),
+    (
+        "kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2_039, 97_862, 4_085_603],
+    ),
+    (
+        "en passant pins",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2_812, 43_238, 674_624],
+    ),
+    (
+        "promotions",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9_467, 422_333],
+    ),
+    (
+        "promotion with check",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1_486, 62_379, 2_103_487],
+    ),
+    (
+        "middlegame",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2_079, 89_890, 3_894_594],
+    ),
+]
+
+# Deepest depth searched for each position by the benchmark, unless told otherwise.
+DEFAULT_BENCHMARK_DEPTH = 3
+
+
+def perft(board: Board, depth: int) -> int:
+    # Count the legal move sequences of the given length. Checks move generation,
+    # make_move and undo_move against known results, and measures their speed.
+    # Depths below 1 count just the position itself.
+    if depth <= 0:
+        return 1
+    moves = board.generate_encoded_moves()
+    if depth == 1:
+        # Every legal move leads to exactly one sequence, so there's no need to make
+        # them.
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.make_encoded_move(move)
+        nodes += perft(board, depth - 1)
+        board.undo_encoded_move(move)
+    return nodes
+
+
+def divide(board: Board, depth: int) -> list[tuple[Move, int]]:
+    # Perft split by the first move, to narrow down where a count goes wrong.
+    results = []
+    for move in board.generate_encoded_moves():
+        decoded = board.decode_move(move)
+        board.make_encoded_move(move)
+        results.append((decoded, perft(board, depth - 1)))
+        board.undo_encoded_move(move)
+    return results
+
+
+class PerftResult:
+    def __init__(self, name: str, depth: int, nodes: int, expected: int, ms: int):
+        self.name = name
+        self.depth = depth
+        self.nodes = nodes
+        self.expected = expected
+        self.ms = ms
+        self.nps = nodes * 1000 // max(ms, 1)
+
+    @property
+    def passed(self) -> bool:
+        return self.nodes == self.expected
+
+
+def run_suite(max_depth: int) -> list[PerftResult]:
+    # Run every position to max_depth, or as deep as its results go, timing each.
+    results = []
+    for name, fen_str, expected in PERFT_POSITIONS:
+        depth = min(max_depth, len(expected))
+        board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        start_time = time.perf_counter()
+        nodes = perft(board, depth)
+        ms = round((time.perf_counter() - start_time) * 1000)
+        results.append(PerftResult(name, depth, nodes, expected[depth - 1], ms))
+    return results
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check move generation against known perft results and time it."
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=DEFAULT_BENCHMARK_DEPTH,
+        help="deepest depth to search each position to",
+    )
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.depth)
+    total_nodes = sum(result.nodes for result in results)
+    total_ms = sum(result.ms for result in results)
+    total_nps = total_nodes * 1000 // max(total_ms, 1)
+    passed = all(result.passed for result in results)
+    if args.json:
+        positions = [vars(result) | {"passed": result.passed} for result in results]
+        summary = {
+            "positions": positions,
+            "nodes": total_nodes,
+            "ms": total_ms,
+            "nps": total_nps,
+            "passed": passed,
+        }
+        print(json.dumps(summary, indent=2))
+    else:
+        for result in results:
+            print(
+                f"{result.name:<22} depth {result.depth} "
+                f"nodes {result.nodes:>9} expected {result.expected:>9} "
+                f"{result.ms:>7} ms {result.nps:>8} nps "
+                f"{'ok' if result.passed else 'FAILED'}"
+            )
+        print(f"Total: {total_nodes} nodes in {total_ms} ms, {total_nps} nps")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
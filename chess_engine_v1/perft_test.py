@@ -0,0 +1,49 @@
+import unittest
+
+import fen
+from board import Board, BoardRepresentation
+from move import Move
+from perft import PERFT_POSITIONS, divide, perft
+from square import Squares
+
+# Each position is only checked to depths with at most this many nodes, to keep the
+# test quick. The benchmark in perft.py goes deeper.
+MAX_TEST_NODES = 10_000
+
+
+class TestPerft(unittest.TestCase):
+    def test_known_positions(self) -> None:
+        for name, fen_str, expected in PERFT_POSITIONS:
+            for depth, nodes in enumerate(expected, start=1):
+                if nodes > MAX_TEST_NODES:
+                    break
+                with self.subTest(name=name, depth=depth):
+                    board = Board(fen_str, BoardRepresentation.BITBOARDS)
+                    self.assertEqual(perft(board, depth), nodes)
+
+    def test_list_representation(self) -> None:
+        # The nested list generators check legality by making each move, so they're
+        # an independent check on the bitboard generators' pins and check masks.
+        for name, fen_str, expected in PERFT_POSITIONS:
+            with self.subTest(name=name):
+                self.assertEqual(perft(Board(fen_str), 2), expected[1])
+
+    def test_board_unchanged(self) -> None:
+        fen_str = PERFT_POSITIONS[1][1]
+        board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        perft(board, 2)
+        original = Board(fen_str, BoardRepresentation.BITBOARDS)
+        self.assertEqual(board.board, original.board)
+        self.assertEqual(board.zobrist_key, original.zobrist_key)
+        self.assertEqual(board.castling_rights, original.castling_rights)
+
+    def test_divide(self) -> None:
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        results = dict(divide(board, 2))
+        self.assertEqual(len(results), 20)
+        self.assertEqual(sum(results.values()), 400)
+        self.assertEqual(results[Move(Squares.E2, Squares.E4, "P")], 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
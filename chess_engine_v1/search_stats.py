@@ -0,0 +1,61 @@
+import time
+
+
+class SearchStats:
+    """
+    Counters kept by the search, for UCI info output and monitoring.
+
+    They're plain attributes so the search can bump them with a single addition.
+    Anything worked out from them, like the node rate, is only calculated when
+    reported.
+    """
+
+    def __init__(self) -> None:
+        self.start_time = time.perf_counter()
+        # Nodes searched, including quiescence nodes.
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        # Transposition table probes that found the position, and those whose score
+        # was used without searching.
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        # Nodes that failed high, and those that did so on the first move searched.
+        # Their ratio shows how good the move ordering is.
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        # The deepest ply reached, including quiescence search.
+        self.seldepth = 0
+
+    def elapsed_ms(self) -> int:
+        return round((time.perf_counter() - self.start_time) * 1000)
+
+    def nps(self) -> int:
+        return self.nodes * 1000 // max(self.elapsed_ms(), 1)
+
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0
+
+    def merge(self, other: "SearchStats") -> None:
+        # Add in the counters from another search of the same position, e.g. a
+        # helper process's.
+        self.nodes += other.nodes
+        self.quiescence_nodes += other.quiescence_nodes
+        self.tt_hits += other.tt_hits
+        self.tt_cutoffs += other.tt_cutoffs
+        self.beta_cutoffs += other.beta_cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.seldepth = max(self.seldepth, other.seldepth)
+
+    def to_dict(self) -> dict[str, int | float]:
+        return {
+            "nodes": self.nodes,
+            "quiescence_nodes": self.quiescence_nodes,
+            "tt_hits": self.tt_hits,
+            "tt_cutoffs": self.tt_cutoffs,
+            "beta_cutoffs": self.beta_cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoff_rate(),
+            "seldepth": self.seldepth,
+            "time_ms": self.elapsed_ms(),
+            "nps": self.nps(),
+        }
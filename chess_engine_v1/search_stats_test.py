@@ -0,0 +1,36 @@
+import unittest
+
+from search_stats import SearchStats
+
+
+class TestSearchStats(unittest.TestCase):
+    def test_merge(self) -> None:
+        stats = SearchStats()
+        stats.nodes = 100
+        stats.beta_cutoffs = 10
+        stats.first_move_cutoffs = 8
+        stats.seldepth = 7
+        other = SearchStats()
+        other.nodes = 50
+        other.quiescence_nodes = 30
+        other.beta_cutoffs = 10
+        other.first_move_cutoffs = 9
+        other.seldepth = 5
+        stats.merge(other)
+        self.assertEqual(stats.nodes, 150)
+        self.assertEqual(stats.quiescence_nodes, 30)
+        self.assertEqual(stats.seldepth, 7)
+        self.assertAlmostEqual(stats.first_move_cutoff_rate(), 0.85)
+
+    def test_to_dict(self) -> None:
+        stats = SearchStats()
+        self.assertEqual(stats.first_move_cutoff_rate(), 0)
+        stats.nodes = 1000
+        summary = stats.to_dict()
+        self.assertEqual(summary["nodes"], 1000)
+        self.assertGreater(summary["nps"], 0)
+        self.assertIn("time_ms", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
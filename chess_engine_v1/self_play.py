@@ -1,140 +1,156 @@
-import subprocess
+import asyncio
 
-ENGINE_TYPE = subprocess.Popen[str]
+from uci_engine import RESPONSE_TIMEOUT_S, EngineHandle, EnginePool
 
 
 class SelfPlay:
-    def __init__(self, engine_command: list[str]):
-        self.engine_command = engine_command
+    """
+    Plays games between two copies of an engine, printing the moves and the board.
 
-    def start_engine(self) -> ENGINE_TYPE:
-        """
-        Start a chess engine subprocess.
-        """
-        return subprocess.Popen(  # noqa
-            self.engine_command,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1,
-        )
+    Engine processes come from a pool and go back to it after each game, so they're
+    started once however many games are played. Call close() when done with them.
+    """
 
-    def send_command(self, engine: ENGINE_TYPE, command: str) -> None:
+    def __init__(self, engine_command: list[str], starting_position: str = "startpos"):
+        self.engine_command = engine_command
+        # Where games start, as in the position command: startpos or fen <fen>.
+        self.starting_position = starting_position
+        self.pool = EnginePool()
+        # The engines' pipes belong to the event loop they were started on, so every
+        # game runs on the same one.
+        self._loop = asyncio.new_event_loop()
+
+    def send_command(self, engine: EngineHandle, command: str) -> None:
         """
         Send a command to a chess engine.
         """
         print(f"Sending command: {command}")
-        engine.stdin.write(command + "\n")  # type: ignore # see https://github.com/python/typeshed/issues/3831
-        engine.stdin.flush()  # type: ignore # see https://github.com/python/typeshed/issues/3831
-
-    def read_response(self, engine: ENGINE_TYPE) -> str:
+        engine.send(command)
+
+    async def read_response(
+        self,
+        engine: EngineHandle,
+        terminator: str,
+        timeout_s: float = RESPONSE_TIMEOUT_S,
+    ) -> str:
         """
-        Read the response from a chess engine.
-        """
-        # TODO: ChatGPT: Add error handling
+        Read the response from a chess engine, up to the line starting with terminator.
 
-        response = ""
-        while True:
-            line = engine.stdout.readline().strip()  # type: ignore # see https://github.com/python/typeshed/issues/3831
+        Raises TimeoutError if the engine takes longer than timeout_s, and EOFError if
+        it has exited.
+        """
+        lines = await engine.read_until(terminator, timeout_s)
+        for line in lines:
             if line:
                 print(f"Received response: {line}")
-                response += line + "\n"
-                # TODO: Update read_response to take in the expected 'end line id'.
-                if line.startswith("bestmove") or line == "uciok" or line == "readyok":
-                    break
-        return response
-
-    # TODO: Try and merge this with read_response.
-    def read_board(self, engine: ENGINE_TYPE) -> None:
+        return "\n".join(line for line in lines if line) + "\n"
+
+    async def read_board(self, engine: EngineHandle) -> None:
         """
         Read the board state from the engine and print it.
         """
         self.send_command(engine, "d")
-
-        while True:
-            line = engine.stdout.readline().strip()  # type: ignore # see https://github.com/python/typeshed/issues/3831
-            if line == "Legal moves:":
-                # Read the next line of the legal moves and ignore them
-                engine.stdout.readline()  # type: ignore # see https://github.com/python/typeshed/issues/3831
-                break
+        lines = await engine.read_until("Legal moves:")
+        # Read the next line of the legal moves and ignore them
+        await engine.read_line()
+        for line in lines[:-1]:
             # Chris: Flush to help debug.
             print(line, flush=True)
 
-    def _setup_engines(self) -> tuple[ENGINE_TYPE, ENGINE_TYPE]:
-        # Start both engines
-        engine1 = self.start_engine()
-        engine2 = self.start_engine()
-
-        # Initialize engines with UCI protocol
-        for engine in [engine1, engine2]:
-            self.send_command(engine, "uci")
-            self.read_response(engine)
-            self.send_command(engine, "isready")
-            self.read_response(engine)
+    async def _setup_engines(self) -> tuple[EngineHandle, EngineHandle]:
+        # Take both engines from the pool, which starts them the first time and
+        # sends ucinewgame after that.
+        engine1, engine2 = await asyncio.gather(
+            self.pool.acquire(self.engine_command),
+            self.pool.acquire(self.engine_command),
+        )
 
         # Set the starting position
-        starting_fen = "position startpos"
+        starting_fen = f"position {self.starting_position}"
         self.send_command(engine1, starting_fen)
         self.send_command(engine2, starting_fen)
 
         return engine1, engine2
 
-    def _move_from_best_move_response(self, best_move_response: str) -> str:
-        # TODO: Add error handling.
+    def _move_from_best_move_response(self, best_move_response: str) -> str | None:
         # The bestmove response should look like:
         # bestmove {move} [(optional) ponder {move}]
-        parts = best_move_response.split(" ")
+        # With no legal move, i.e. checkmate or stalemate, the move is 0000, or
+        # (none) from some engines.
+        parts = best_move_response.strip().split("\n")[-1].split(" ")
+        if len(parts) < 2 or parts[0] != "bestmove" or parts[1] in ("(none)", "0000"):
+            return None
         return parts[1]
 
-    def _play_game(
-        self, engine1: ENGINE_TYPE, engine2: ENGINE_TYPE, max_moves: int
+    async def _play_game(
+        self, engine1: EngineHandle, engine2: EngineHandle, max_moves: int
     ) -> None:
         current_engine = engine1
         next_engine = engine2
         move_history = []
 
         for move_count in range(max_moves):
-            self.send_command(current_engine, "go depth 2")
-            response = self.read_response(current_engine)
-            if "bestmove" in response:
-                best_move = self._move_from_best_move_response(response)
-                move_history.append(best_move)
-                print(f"Move {move_count + 1}: {best_move}")
-
-                # TODO: Do we need to send everything from the beginning, or can we
-                # just send the moves it's missing?
-                # Send the move to the next engine
-                position_command = f"position startpos moves {' '.join(move_history)}"
+            try:
+                self.send_command(current_engine, "go depth 2")
+                response = await self.read_response(current_engine, "bestmove")
+            except (TimeoutError, EOFError) as error:
+                # Replace the engine so the next game starts with a working one.
+                print(f"Engine stopped answering ({error!r}). Game over.")
+                await current_engine.restart()
+                break
+            best_move = self._move_from_best_move_response(response)
+            if not best_move:
+                print("No valid move found. Game over.")
+                break
+            move_history.append(best_move)
+            print(f"Move {move_count + 1}: {best_move}")
+
+            # Send the move to the next engine. UCI has no way to send just the new
+            # moves, but the engine spots that the position extends its last one and
+            # only makes those.
+            position_command = (
+                f"position {self.starting_position} moves {' '.join(move_history)}"
+            )
+            try:
                 self.send_command(next_engine, position_command)
 
                 # Print the current board state
-                self.read_board(next_engine)
-
-                # Switch engines
-                current_engine, next_engine = next_engine, current_engine
-            else:
-                print("No valid move found. Game over.")
+                await self.read_board(next_engine)
+            except (TimeoutError, EOFError) as error:
+                print(f"Engine stopped answering ({error!r}). Game over.")
+                await next_engine.restart()
                 break
 
+            # Switch engines
+            current_engine, next_engine = next_engine, current_engine
+
+    async def _play(self, max_moves: int) -> None:
+        engine1, engine2 = await self._setup_engines()
+        try:
+            await self._play_game(engine1, engine2, max_moves)
+        finally:
+            # Hand the engines back for the next game.
+            self.pool.release(engine1)
+            self.pool.release(engine2)
+
     def play_game(self, max_moves: int = 100) -> None:
         """
         Play a game between two engines.
 
         Moves are alternated until a move limit is reached or no valid moves are found.
         """
-        # Start both engines
-        engine1, engine2 = self._setup_engines()
-
-        # Play the game
-        self._play_game(engine1, engine2, max_moves)
+        self._loop.run_until_complete(self._play(max_moves))
 
-        # Terminate both engines
-        engine1.terminate()
-        engine2.terminate()
+    def close(self) -> None:
+        """
+        Quit the engines and close the event loop.
+        """
+        self._loop.run_until_complete(self.pool.close())
+        self._loop.close()
 
 
 if __name__ == "__main__":
     engine_command = ["..\\run_python.bat", "chess_engine.py"]
     game = SelfPlay(engine_command)
     game.play_game()
+    game.close()
@@ -0,0 +1,53 @@
+import contextlib
+import io
+import unittest
+
+from self_play import SelfPlay
+from tournament import ENGINE_COMMAND
+
+
+class TestSelfPlay(unittest.TestCase):
+    def test_engines_kept_between_games(self) -> None:
+        game = SelfPlay(ENGINE_COMMAND)
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                game.play_game(max_moves=2)
+                engines = list(game.pool._idle)
+                game.play_game(max_moves=2)
+            self.assertEqual(len(engines), 2)
+            self.assertCountEqual(game.pool._idle, engines)
+        finally:
+            game.close()
+        self.assertIn("Move 2:", output.getvalue())
+        self.assertNotIn("Game over", output.getvalue())
+
+    def test_game_ends_at_checkmate(self) -> None:
+        # White mates on the first move, and black has no move to answer with.
+        game = SelfPlay(ENGINE_COMMAND, "fen k7/8/1K6/8/8/8/8/7Q w - - 0 1")
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                game.play_game(max_moves=4)
+        finally:
+            game.close()
+        self.assertIn("Move 1:", output.getvalue())
+        self.assertNotIn("Move 2:", output.getvalue())
+        self.assertIn("No valid move found. Game over.", output.getvalue())
+        self.assertNotIn("stopped answering", output.getvalue())
+
+    def test_move_from_best_move_response(self) -> None:
+        game = SelfPlay(ENGINE_COMMAND)
+        try:
+            self.assertEqual(
+                game._move_from_best_move_response("bestmove e2e4 ponder e7e5\n"),
+                "e2e4",
+            )
+            self.assertIsNone(game._move_from_best_move_response("bestmove 0000\n"))
+            self.assertIsNone(game._move_from_best_move_response("bestmove (none)\n"))
+        finally:
+            game.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
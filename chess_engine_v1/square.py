@@ -1,8 +1,14 @@
 class Square:
+    # Squares are created once, in Squares, and shared by every move, so they're kept
+    # small and compare by their index rather than their name.
+    __slots__ = ("algebraic", "col", "index", "row")
+
     def __init__(self, algebraic: str):
         self.algebraic = algebraic
         self.row = int(algebraic[1]) - 1
         self.col = ord(algebraic[0]) - ord("a")
+        # The square's bitboard index, as used by encoded moves.
+        self.index = self.row * 8 + self.col
 
     def __str__(self) -> str:
         return self.algebraic
@@ -13,10 +19,10 @@ class Square:
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Square):
             return NotImplemented
-        return self.algebraic == other.algebraic
+        return self.index == other.index
 
     def __hash__(self) -> int:
-        return hash(self.algebraic)
+        return self.index
 
 
 class Squares:
@@ -152,7 +158,19 @@ class Squares:
         H8,
     )
 
+    @classmethod
+    def square_from_index(cls, index: int) -> Square:
+        return _SQUARES_BY_INDEX[index]
+
     @classmethod
     def square_from_row_col(cls, row: int, col: int) -> Square:
         index = col * 8 + row
         return cls.square_in_order[index]
+
+    @classmethod
+    def square_from_algebraic(cls, algebraic: str) -> Square:
+        square = Square(algebraic)
+        return cls.square_from_row_col(square.row, square.col)
+
+
+_SQUARES_BY_INDEX = sorted(Squares.square_in_order, key=lambda square: square.index)
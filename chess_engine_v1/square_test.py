@@ -61,6 +61,11 @@ class TestSquare(unittest.TestCase):
         self.assertEqual(Squares.square_from_row_col(6, 2), Squares.C7)
         self.assertEqual(Squares.square_from_row_col(2, 6), Squares.G3)
 
+    def test_square_from_algebraic(self) -> None:
+        self.assertIs(Squares.square_from_algebraic("a1"), Squares.A1)
+        self.assertIs(Squares.square_from_algebraic("e3"), Squares.E3)
+        self.assertIs(Squares.square_from_algebraic("h8"), Squares.H8)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,163 @@
+import time
+
+MAX_DEPTH = 64
+# Time kept back from every move to allow for communication with the GUI.
+MOVE_OVERHEAD_MS = 30
+# How many moves the remaining time is shared between when the GUI doesn't say.
+DEFAULT_MOVES_TO_GO = 30
+# How far past its optimum time a search may run before it's aborted.
+MAXIMUM_TIME_FACTOR = 4
+# A score change of this many centipawns between iterations doubles the time
+# allowed.
+SCORE_SWING_SCALE = 100
+
+
+class SearchLimits:
+    def __init__(
+        self,
+        depth: int | None = None,
+        nodes: int | None = None,
+        movetime: int | None = None,
+        wtime: int | None = None,
+        btime: int | None = None,
+        winc: int = 0,
+        binc: int = 0,
+        movestogo: int | None = None,
+        infinite: bool = False,
+        ponder: bool = False,
+    ):
+        # Times are in milliseconds, as sent by UCI.
+        self.depth = depth
+        self.nodes = nodes
+        self.movetime = movetime
+        self.wtime = wtime
+        self.btime = btime
+        self.winc = winc
+        self.binc = binc
+        self.movestogo = movestogo
+        self.infinite = infinite
+        # Searching the position after the opponent's expected move, on their time.
+        self.ponder = ponder
+
+    @classmethod
+    def from_go_command(cls, command: str) -> "SearchLimits":
+        # The command looks like: go [ponder] [depth <x>] [wtime <x>] ... [infinite]
+        limits = cls()
+        parts = command.split()
+        i = 1
+        while i < len(parts):
+            name = parts[i]
+            if name == "infinite":
+                limits.infinite = True
+            elif name == "ponder":
+                limits.ponder = True
+            elif i + 1 < len(parts) and parts[i + 1].lstrip("-").isdigit():
+                value = int(parts[i + 1])
+                i += 1
+                if name == "depth":
+                    limits.depth = value
+                elif name == "nodes":
+                    limits.nodes = value
+                elif name == "movetime":
+                    limits.movetime = value
+                elif name == "wtime":
+                    limits.wtime = value
+                elif name == "btime":
+                    limits.btime = value
+                elif name == "winc":
+                    limits.winc = value
+                elif name == "binc":
+                    limits.binc = value
+                elif name == "movestogo":
+                    limits.movestogo = value
+            i += 1
+        return limits
+
+
+class TimeManager:
+    """
+    Decides how long a search may run.
+
+    The search stops starting new iterations once it has used a good part of the
+    optimum time, and is aborted outright at the maximum time. The optimum grows when
+    the best move keeps changing or the score swings, and shrinks while the best move
+    stays the same. While pondering there's no time limit, until ponderhit() starts
+    the clock.
+    """
+
+    def __init__(self, limits: SearchLimits, white_to_move: bool):
+        self.start_time = time.perf_counter()
+        self.limits = limits
+        self.optimum_ms: float | None = None
+        self.maximum_ms: float | None = None
+
+        time_left = limits.wtime if white_to_move else limits.btime
+        if limits.movetime is not None:
+            self.optimum_ms = self.maximum_ms = max(
+                limits.movetime - MOVE_OVERHEAD_MS, 1
+            )
+        elif time_left is not None and not limits.infinite:
+            increment = limits.winc if white_to_move else limits.binc
+            usable_ms = max(time_left - MOVE_OVERHEAD_MS, 1)
+            moves_to_go = min(
+                limits.movestogo if limits.movestogo else DEFAULT_MOVES_TO_GO,
+                DEFAULT_MOVES_TO_GO,
+            )
+            self.optimum_ms = min(
+                usable_ms / moves_to_go + increment * 3 / 4, usable_ms
+            )
+            self.maximum_ms = min(self.optimum_ms * MAXIMUM_TIME_FACTOR, usable_ms)
+
+        self.pondering = limits.ponder
+        self._base_optimum_ms = self.optimum_ms
+        self._stable_iterations = 0
+        self._previous_score: float | None = None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start_time) * 1000
+
+    def ponderhit(self) -> None:
+        # The opponent played the expected move, so the search carries on with the
+        # time it would have had if it had started now. Called from another thread,
+        # so the clock is reset before the time limits start applying.
+        self.start_time = time.perf_counter()
+        self.pondering = False
+
+    def out_of_time(self) -> bool:
+        # Checked during an iteration, which is abandoned if this is true.
+        return (
+            not self.pondering
+            and self.maximum_ms is not None
+            and self.elapsed_ms() >= self.maximum_ms
+        )
+
+    def should_start_iteration(self, depth: int) -> bool:
+        if depth > MAX_DEPTH or (
+            self.limits.depth is not None and depth > self.limits.depth
+        ):
+            return False
+        if self.optimum_ms is None or self.pondering:
+            return True
+        # Each iteration usually takes longer than all of the previous ones together,
+        # so one started after half the optimum time is unlikely to finish in time.
+        return self.elapsed_ms() < self.optimum_ms / 2
+
+    def iteration_finished(self, best_move_changed: bool, score: float) -> None:
+        if best_move_changed:
+            self._stable_iterations = 0
+        else:
+            self._stable_iterations += 1
+        swing = (
+            abs(score - self._previous_score) if self._previous_score is not None else 0
+        )
+        self._previous_score = score
+
+        if self._base_optimum_ms is None or self.maximum_ms is None:
+            return
+        # Spend up to 50% more time while the best move is changing, down to half
+        # the time once it has been stable for a while.
+        stability_factor = max(1.5 - 0.1 * self._stable_iterations, 0.5)
+        swing_factor = 1 + min(swing / SCORE_SWING_SCALE, 1)
+        self.optimum_ms = min(
+            self._base_optimum_ms * stability_factor * swing_factor, self.maximum_ms
+        )
@@ -0,0 +1,115 @@
+import unittest
+
+from time_manager import (
+    DEFAULT_MOVES_TO_GO,
+    MAX_DEPTH,
+    MAXIMUM_TIME_FACTOR,
+    MOVE_OVERHEAD_MS,
+    SearchLimits,
+    TimeManager,
+)
+
+
+class TestSearchLimits(unittest.TestCase):
+    def test_depth(self) -> None:
+        limits = SearchLimits.from_go_command("go depth 4")
+        self.assertEqual(limits.depth, 4)
+        self.assertIsNone(limits.movetime)
+        self.assertFalse(limits.infinite)
+
+    def test_clock(self) -> None:
+        limits = SearchLimits.from_go_command(
+            "go wtime 60000 btime 50000 winc 1000 binc 500 movestogo 20"
+        )
+        self.assertEqual(limits.wtime, 60000)
+        self.assertEqual(limits.btime, 50000)
+        self.assertEqual(limits.winc, 1000)
+        self.assertEqual(limits.binc, 500)
+        self.assertEqual(limits.movestogo, 20)
+
+    def test_movetime_nodes_and_infinite(self) -> None:
+        self.assertEqual(SearchLimits.from_go_command("go movetime 500").movetime, 500)
+        self.assertEqual(SearchLimits.from_go_command("go nodes 1000").nodes, 1000)
+        self.assertTrue(SearchLimits.from_go_command("go infinite").infinite)
+
+    def test_ponder(self) -> None:
+        limits = SearchLimits.from_go_command("go ponder wtime 60000 btime 60000")
+        self.assertTrue(limits.ponder)
+        self.assertEqual(limits.wtime, 60000)
+        self.assertFalse(SearchLimits.from_go_command("go wtime 60000").ponder)
+
+
+class TestTimeManager(unittest.TestCase):
+    def optimum_ms(self, manager: TimeManager) -> float:
+        if manager.optimum_ms is None:
+            self.fail("Expected a timed search")
+        return manager.optimum_ms
+
+    def test_no_time_limit(self) -> None:
+        manager = TimeManager(SearchLimits(depth=3), True)
+        self.assertIsNone(manager.optimum_ms)
+        self.assertFalse(manager.out_of_time())
+        self.assertTrue(manager.should_start_iteration(3))
+        self.assertFalse(manager.should_start_iteration(4))
+
+    def test_infinite_stops_at_max_depth(self) -> None:
+        manager = TimeManager(SearchLimits(infinite=True, wtime=1000), True)
+        self.assertIsNone(manager.maximum_ms)
+        self.assertTrue(manager.should_start_iteration(MAX_DEPTH))
+        self.assertFalse(manager.should_start_iteration(MAX_DEPTH + 1))
+
+    def test_ponder_has_no_limit_until_ponderhit(self) -> None:
+        manager = TimeManager(SearchLimits(movetime=1000, ponder=True), True)
+        manager.start_time -= 10
+        self.assertFalse(manager.out_of_time())
+        self.assertTrue(manager.should_start_iteration(MAX_DEPTH))
+        # The clock starts from ponderhit.
+        manager.ponderhit()
+        self.assertFalse(manager.out_of_time())
+        self.assertTrue(manager.should_start_iteration(2))
+        manager.start_time -= 10
+        self.assertTrue(manager.out_of_time())
+        self.assertFalse(manager.should_start_iteration(2))
+
+    def test_movetime(self) -> None:
+        manager = TimeManager(SearchLimits(movetime=1000), True)
+        self.assertEqual(manager.optimum_ms, 1000 - MOVE_OVERHEAD_MS)
+        self.assertEqual(manager.maximum_ms, 1000 - MOVE_OVERHEAD_MS)
+
+    def test_clock_uses_side_to_move(self) -> None:
+        limits = SearchLimits(wtime=60000, btime=30000)
+        white = TimeManager(limits, True)
+        black = TimeManager(limits, False)
+        self.assertEqual(
+            white.optimum_ms, (60000 - MOVE_OVERHEAD_MS) / DEFAULT_MOVES_TO_GO
+        )
+        self.assertEqual(
+            black.optimum_ms, (30000 - MOVE_OVERHEAD_MS) / DEFAULT_MOVES_TO_GO
+        )
+        self.assertEqual(white.maximum_ms, self.optimum_ms(white) * MAXIMUM_TIME_FACTOR)
+
+    def test_last_move_before_time_control(self) -> None:
+        manager = TimeManager(SearchLimits(wtime=1000, movestogo=1), True)
+        self.assertEqual(manager.maximum_ms, 1000 - MOVE_OVERHEAD_MS)
+
+    def test_stable_best_move_uses_less_time(self) -> None:
+        manager = TimeManager(SearchLimits(wtime=60000), True)
+        base = self.optimum_ms(manager)
+        manager.iteration_finished(True, 0)
+        self.assertGreater(self.optimum_ms(manager), base)
+        for _ in range(10):
+            manager.iteration_finished(False, 0)
+        self.assertLess(self.optimum_ms(manager), base)
+
+    def test_score_swing_uses_more_time(self) -> None:
+        manager = TimeManager(SearchLimits(wtime=60000), True)
+        manager.iteration_finished(True, 0)
+        for _ in range(3):
+            manager.iteration_finished(False, 0)
+        steady = self.optimum_ms(manager)
+        manager.iteration_finished(False, -300)
+        self.assertGreater(self.optimum_ms(manager), steady)
+
+
+if __name__ == "__main__":
+    unittest.main()
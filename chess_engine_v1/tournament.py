@@ -0,0 +1,528 @@
+import argparse
+import asyncio
+import contextlib
+import enum
+import math
+import os
+import shlex
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable
+
+import fen
+from board import Board, BoardRepresentation, Player
+from move import CAPTURE_FLAG, SQUARE_MASK
+from uci_engine import RESPONSE_TIMEOUT_S, EngineHandle
+
+# Openings the games start from, as UCI moves from the starting position. Each one is
+# played twice with the engines swapping colours, so neither gets the better side of
+# an opening more often.
+OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6",
+    "e2e4 c7c5 g1f3 d7d6",
+    "e2e4 e7e6 d2d4 d7d5",
+    "e2e4 c7c6 d2d4 d7d5",
+    "e2e4 d7d5 e4d5 d8d5",
+    "e2e4 g8f6 e4e5 f6d5",
+    "d2d4 d7d5 c2c4 e7e6",
+    "d2d4 d7d5 c2c4 c7c6",
+    "d2d4 g8f6 c2c4 e7e6",
+    "d2d4 g8f6 c2c4 g7g6",
+    "d2d4 f7f5 g2g3 g8f6",
+    "c2c4 e7e5 b1c3 g8f6",
+    "c2c4 c7c5 g1f3 b8c6",
+    "g1f3 d7d5 g2g3 g8f6",
+]
+
+ENGINE_COMMAND = [
+    sys.executable,
+    os.path.join(os.path.dirname(__file__), "chess_engine.py"),
+]
+# Games still going after this many plies are adjudicated as draws.
+MAX_PLIES = 400
+# Engines playing with a clock can go this far over their time before losing, to
+# allow for the time taken to pass moves between processes.
+TIME_MARGIN_MS = 100
+
+# Results are from white's point of view.
+WHITE_WINS = "1-0"
+BLACK_WINS = "0-1"
+DRAW = "1/2-1/2"
+
+
+class Verdict(enum.Enum):
+    # Which hypothesis an SPRT accepted.
+    H0 = "H0"
+    H1 = "H1"
+
+
+class SPRT:
+    """
+    Sequential probability ratio test of whether engine A is elo1 stronger than
+    engine B (H1), rather than only elo0 stronger (H0).
+
+    After each game the log-likelihood ratio of the two hypotheses is compared with
+    bounds set by the acceptable false positive (alpha) and false negative (beta)
+    rates, so a clear result stops the match early, and a close one runs for longer.
+    Uses the normal approximation to the trinomial win/draw/loss model.
+    """
+
+    def __init__(self, elo0: float, elo1: float, alpha: float, beta: float):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+
+    def llr(self, wins: int, draws: int, losses: int) -> float:
+        games = wins + draws + losses
+        if not games:
+            return 0
+        score = (wins + draws / 2) / games
+        variance = (
+            wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score**2
+        ) / games
+        if not variance:
+            return 0
+        score0 = _expected_score(self.elo0)
+        score1 = _expected_score(self.elo1)
+        return (
+            (score1 - score0) * (2 * score - score0 - score1) / (2 * variance / games)
+        )
+
+    def verdict(self, wins: int, draws: int, losses: int) -> Verdict | None:
+        llr = self.llr(wins, draws, losses)
+        if llr >= self.upper_bound:
+            return Verdict.H1
+        if llr <= self.lower_bound:
+            return Verdict.H0
+        return None
+
+
+def _expected_score(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    # The Elo difference the results suggest, and the margin of its 95% confidence
+    # interval. Infinite when one engine won every game.
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    if score in (0, 1):
+        return math.copysign(math.inf, score - 0.5), math.inf
+    variance = (
+        wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score**2
+    ) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    low = _elo(max(score - margin, 1e-9))
+    high = _elo(min(score + margin, 1 - 1e-9))
+    return _elo(score), (high - low) / 2
+
+
+def _elo(score: float) -> float:
+    return 400 * math.log10(score / (1 - score))
+
+
+def adjudicate(
+    board: Board, repetitions: Counter[int], halfmove_clock: int, plies: int
+) -> tuple[str, str] | None:
+    # The result of a game and why it ended, or None if it isn't over.
+    if not board.generate_encoded_moves():
+        if not board.in_check():
+            return DRAW, "stalemate"
+        return (BLACK_WINS if board.turn == Player.WHITE else WHITE_WINS), "checkmate"
+    if repetitions[board.zobrist_key] >= 3:
+        return DRAW, "threefold repetition"
+    if halfmove_clock >= 100:
+        return DRAW, "fifty move rule"
+    if _insufficient_material(board):
+        return DRAW, "insufficient material"
+    if plies >= MAX_PLIES:
+        return DRAW, "move limit"
+    return None
+
+
+def _insufficient_material(board: Board) -> bool:
+    # Only kings, and at most one knight or bishop between them.
+    pieces = [chr(piece) for piece in board.squares if chr(piece) not in ".Kk"]
+    return len(pieces) <= 1 and all(piece in "NBnb" for piece in pieces)
+
+
+class TimeControl:
+    # A clock for each side, starting with base_ms and gaining increment_ms a move.
+    def __init__(self, base_ms: int, increment_ms: int):
+        self.base_ms = base_ms
+        self.increment_ms = increment_ms
+
+    @classmethod
+    def parse(cls, text: str) -> "TimeControl":
+        # Written as seconds plus increment in seconds, e.g. 10+0.1.
+        base, _, increment = text.partition("+")
+        return cls(round(float(base) * 1000), round(float(increment or 0) * 1000))
+
+
+class GameRecord:
+    def __init__(
+        self, opening: str, a_is_white: bool, result: str, reason: str, plies: int
+    ):
+        self.opening = opening
+        self.a_is_white = a_is_white
+        self.result = result
+        self.reason = reason
+        self.plies = plies
+
+    @property
+    def a_score(self) -> float:
+        # 1 if engine A won, 0.5 for a draw, and 0 if it lost.
+        if self.result == DRAW:
+            return 0.5
+        return 1.0 if (self.result == WHITE_WINS) == self.a_is_white else 0.0
+
+
+class TournamentResult:
+    def __init__(
+        self,
+        games: list[GameRecord],
+        seconds: float,
+        sprt: SPRT | None,
+    ):
+        self.games = games
+        self.seconds = seconds
+        self.wins = sum(game.a_score == 1 for game in games)
+        self.draws = sum(game.a_score == 0.5 for game in games)
+        self.losses = sum(game.a_score == 0 for game in games)
+        self.games_per_minute = len(games) * 60 / max(seconds, 1e-9)
+        self.sprt = sprt
+        self.llr = sprt.llr(self.wins, self.draws, self.losses) if sprt else None
+        self.verdict = (
+            sprt.verdict(self.wins, self.draws, self.losses) if sprt else None
+        )
+
+    def lines(self) -> list[str]:
+        # W/D/L and Elo are from engine A's point of view.
+        lines = [
+            f"Games: {len(self.games)}  W: {self.wins}  D: {self.draws}  "
+            f"L: {self.losses}  ({self.games_per_minute:.1f} games/minute)"
+        ]
+        if self.games:
+            elo, margin = elo_difference(self.wins, self.draws, self.losses)
+            lines.append(f"Elo: {elo:.1f} +/- {margin:.1f}")
+        if self.sprt and self.llr is not None:
+            lines.append(
+                f"SPRT: elo0 {self.sprt.elo0} elo1 {self.sprt.elo1}  "
+                f"LLR {self.llr:.2f} [{self.sprt.lower_bound:.2f}, "
+                f"{self.sprt.upper_bound:.2f}]  "
+                + (f"{self.verdict.value} accepted" if self.verdict else "no verdict")
+            )
+        return lines
+
+
+class Tournament:
+    """
+    Plays games between two UCI engines, A and B, several at a time.
+
+    Each concurrent game has its own pair of engine processes, kept for all the games
+    it plays. Games take openings from a list in turn, each opening played once with
+    each engine as white. With an SPRT the match stops as soon as it gives a verdict.
+    With ponder, engines search the reply they expect while their opponent thinks.
+    """
+
+    def __init__(
+        self,
+        engine_a: list[str],
+        engine_b: list[str],
+        games: int,
+        go_command: str = "go depth 4",
+        time_control: TimeControl | None = None,
+        options_a: dict[str, str] | None = None,
+        options_b: dict[str, str] | None = None,
+        concurrency: int = 1,
+        openings: list[str] | None = None,
+        sprt: SPRT | None = None,
+        on_game: Callable[[TournamentResult], None] | None = None,
+        ponder: bool = False,
+    ):
+        self.engine_a = engine_a
+        self.engine_b = engine_b
+        self.games = games
+        self.go_command = go_command
+        self.time_control = time_control
+        self.options_a = dict(options_a or {})
+        self.options_b = dict(options_b or {})
+        # Whether engines search on their opponent's time, on the reply they expect.
+        self.ponder = ponder
+        if ponder:
+            self.options_a["Ponder"] = self.options_b["Ponder"] = "true"
+        self.concurrency = max(1, min(concurrency, games))
+        self.openings = openings or OPENINGS
+        self.sprt = sprt
+        self.on_game = on_game
+        self._records: list[GameRecord] = []
+        self._start_time = 0.0
+
+    def run(self) -> TournamentResult:
+        return asyncio.run(self._run())
+
+    async def _run(self) -> TournamentResult:
+        self._start_time = time.perf_counter()
+        game_numbers: asyncio.Queue[int] = asyncio.Queue()
+        for number in range(self.games):
+            game_numbers.put_nowait(number)
+        await asyncio.gather(
+            *(self._worker(game_numbers) for _ in range(self.concurrency))
+        )
+        return self.result()
+
+    def result(self) -> TournamentResult:
+        return TournamentResult(
+            self._records, time.perf_counter() - self._start_time, self.sprt
+        )
+
+    def _decided(self) -> bool:
+        return bool(self.sprt and self.result().verdict)
+
+    async def _worker(self, game_numbers: "asyncio.Queue[int]") -> None:
+        # Plays games one after another on its own pair of engines.
+        engine_a = EngineHandle(self.engine_a, self.options_a)
+        engine_b = EngineHandle(self.engine_b, self.options_b)
+        await asyncio.gather(engine_a.start(), engine_b.start())
+        try:
+            while not game_numbers.empty() and not self._decided():
+                number = game_numbers.get_nowait()
+                opening = self.openings[number // 2 % len(self.openings)]
+                a_is_white = number % 2 == 0
+                record = await self._play_game(engine_a, engine_b, opening, a_is_white)
+                self._records.append(record)
+                if self.on_game:
+                    self.on_game(self.result())
+        finally:
+            await asyncio.gather(engine_a.quit(), engine_b.quit())
+
+    async def _play_game(
+        self,
+        engine_a: EngineHandle,
+        engine_b: EngineHandle,
+        opening: str,
+        a_is_white: bool,
+    ) -> GameRecord:
+        white, black = (engine_a, engine_b) if a_is_white else (engine_b, engine_a)
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        moves = opening.split()
+        for text in moves:
+            move = board.parse_uci_move(text)
+            if move is None:
+                raise Exception(f"Illegal move in opening {opening}, {text}")
+            board.make_encoded_move(move)
+        await asyncio.gather(white.new_game(), black.new_game())
+
+        # The move each engine that's pondering expects its opponent to play.
+        pondering: dict[EngineHandle, str] = {}
+        try:
+            return await self._play_moves(
+                white, black, board, moves, opening, a_is_white, pondering
+            )
+        finally:
+            await self._stop_pondering(pondering)
+
+    async def _play_moves(
+        self,
+        white: EngineHandle,
+        black: EngineHandle,
+        board: Board,
+        moves: list[str],
+        opening: str,
+        a_is_white: bool,
+        pondering: dict[EngineHandle, str],
+    ) -> GameRecord:
+        repetitions: Counter[int] = Counter([board.zobrist_key])
+        halfmove_clock = 0
+        clocks = {
+            Player.WHITE: self.time_control.base_ms if self.time_control else 0,
+            Player.BLACK: self.time_control.base_ms if self.time_control else 0,
+        }
+        while not (
+            outcome := adjudicate(board, repetitions, halfmove_clock, len(moves))
+        ):
+            mover = board.turn
+            engine = white if mover == Player.WHITE else black
+            # The side to move loses if it runs out of time, answers with an
+            # illegal move, or stops answering.
+            loss = BLACK_WINS if mover == Player.WHITE else WHITE_WINS
+            timeout_s = (
+                (clocks[mover] + TIME_MARGIN_MS) / 1000
+                if self.time_control
+                else RESPONSE_TIMEOUT_S
+            )
+            start_time = time.perf_counter()
+            try:
+                expected = pondering.pop(engine, None)
+                if expected and expected == moves[-1]:
+                    # The engine is already searching this position.
+                    engine.send("ponderhit")
+                else:
+                    if expected:
+                        # Throw away the move from the ponder search.
+                        engine.send("stop")
+                        await engine.read_until("bestmove", timeout_s)
+                    engine.send(f"position startpos moves {' '.join(moves)}")
+                    engine.send(self._go_command(clocks))
+                response = (await engine.read_until("bestmove", timeout_s))[-1]
+            except TimeoutError:
+                await engine.restart()
+                return GameRecord(opening, a_is_white, loss, "timeout", len(moves))
+            except EOFError:
+                await engine.restart()
+                return GameRecord(opening, a_is_white, loss, "crash", len(moves))
+            if self.time_control:
+                clocks[mover] -= round((time.perf_counter() - start_time) * 1000)
+                if clocks[mover] < -TIME_MARGIN_MS:
+                    return GameRecord(
+                        opening, a_is_white, loss, "lost on time", len(moves)
+                    )
+                clocks[mover] = max(clocks[mover], 0) + self.time_control.increment_ms
+
+            text = response.split()[1] if len(response.split()) > 1 else ""
+            move = board.parse_uci_move(text)
+            if move is None:
+                return GameRecord(opening, a_is_white, loss, "illegal move", len(moves))
+            start = move & SQUARE_MASK
+            if move & CAPTURE_FLAG or board.board[start >> 3][start & 7] in "Pp":
+                halfmove_clock = 0
+            else:
+                halfmove_clock += 1
+            board.make_encoded_move(move)
+            moves.append(text)
+            repetitions[board.zobrist_key] += 1
+
+            ponder_move = _ponder_move(response)
+            if self.ponder and ponder_move:
+                # If the engine has crashed, that's found on its next move.
+                with contextlib.suppress(EOFError):
+                    engine.send(
+                        f"position startpos moves {' '.join(moves)} {ponder_move}"
+                    )
+                    engine.send(self._go_command(clocks, ponder=True))
+                    pondering[engine] = ponder_move
+
+        result, reason = outcome
+        return GameRecord(opening, a_is_white, result, reason, len(moves))
+
+    async def _stop_pondering(self, pondering: dict[EngineHandle, str]) -> None:
+        # Stop ponder searches still running when a game ends, so their moves aren't
+        # read as answers in the next game.
+        for engine in pondering:
+            try:
+                engine.send("stop")
+                await engine.read_until("bestmove")
+            except (TimeoutError, EOFError):
+                await engine.restart()
+
+    def _go_command(self, clocks: dict[Player, int], ponder: bool = False) -> str:
+        if not self.time_control:
+            command = self.go_command
+        else:
+            increment = self.time_control.increment_ms
+            command = (
+                f"go wtime {clocks[Player.WHITE]} btime {clocks[Player.BLACK]} "
+                f"winc {increment} binc {increment}"
+            )
+        return command.replace("go", "go ponder", 1) if ponder else command
+
+
+def _ponder_move(response: str) -> str | None:
+    # The reply expected in a response like: bestmove e2e4 ponder e7e5
+    parts = response.split()
+    if "ponder" in parts[:-1]:
+        return parts[parts.index("ponder") + 1]
+    return None
+
+
+def _parse_options(options: list[str]) -> dict[str, str]:
+    # UCI options given as name=value.
+    return dict(option.split("=", 1) for option in options)
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description="Play a match between two UCI engines, several games at a time."
+    )
+    parser.add_argument(
+        "--engine-a", default=shlex.join(ENGINE_COMMAND), help="command for engine A"
+    )
+    parser.add_argument(
+        "--engine-b", default=shlex.join(ENGINE_COMMAND), help="command for engine B"
+    )
+    parser.add_argument(
+        "--option-a",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="UCI option for engine A, can be repeated",
+    )
+    parser.add_argument(
+        "--option-b",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="UCI option for engine B, can be repeated",
+    )
+    parser.add_argument("--games", type=int, default=100, help="most games to play")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="games played at the same time",
+    )
+    limits = parser.add_mutually_exclusive_group()
+    limits.add_argument("--depth", type=int, help="search each move to this depth")
+    limits.add_argument(
+        "--nodes", type=int, help="search each move for this many nodes"
+    )
+    limits.add_argument("--tc", help="time control, seconds+increment, e.g. 10+0.1")
+    parser.add_argument(
+        "--openings", help="file of openings, one per line, as UCI moves from startpos"
+    )
+    parser.add_argument(
+        "--ponder", action="store_true", help="let engines think on opponent's time"
+    )
+    parser.add_argument(
+        "--sprt", action="store_true", help="stop early when an SPRT gives a verdict"
+    )
+    parser.add_argument("--elo0", type=float, default=0, help="Elo difference for H0")
+    parser.add_argument("--elo1", type=float, default=5, help="Elo difference for H1")
+    parser.add_argument("--alpha", type=float, default=0.05, help="false positive rate")
+    parser.add_argument("--beta", type=float, default=0.05, help="false negative rate")
+    args = parser.parse_args(argv)
+
+    openings = None
+    if args.openings:
+        with open(args.openings) as file:
+            openings = [line.strip() for line in file if line.strip()]
+    if args.nodes:
+        go_command = f"go nodes {args.nodes}"
+    else:
+        go_command = f"go depth {args.depth or 4}"
+
+    tournament = Tournament(
+        shlex.split(args.engine_a),
+        shlex.split(args.engine_b),
+        args.games,
+        go_command=go_command,
+        time_control=TimeControl.parse(args.tc) if args.tc else None,
+        options_a=_parse_options(args.option_a),
+        options_b=_parse_options(args.option_b),
+        concurrency=args.concurrency,
+        openings=openings,
+        sprt=SPRT(args.elo0, args.elo1, args.alpha, args.beta) if args.sprt else None,
+        on_game=lambda result: print("  ".join(result.lines()), flush=True),
+        ponder=args.ponder,
+    )
+    result = tournament.run()
+    print()
+    for line in result.lines():
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
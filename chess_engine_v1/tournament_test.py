@@ -0,0 +1,137 @@
+import math
+import unittest
+from collections import Counter
+
+import fen
+from board import Board, BoardRepresentation
+from tournament import (
+    BLACK_WINS,
+    DRAW,
+    ENGINE_COMMAND,
+    OPENINGS,
+    SPRT,
+    WHITE_WINS,
+    GameRecord,
+    TimeControl,
+    Tournament,
+    Verdict,
+    adjudicate,
+    elo_difference,
+)
+
+
+class TestSPRT(unittest.TestCase):
+    def test_bounds(self) -> None:
+        sprt = SPRT(0, 5, 0.05, 0.05)
+        self.assertAlmostEqual(sprt.lower_bound, -2.944, places=3)
+        self.assertAlmostEqual(sprt.upper_bound, 2.944, places=3)
+
+    def test_verdicts(self) -> None:
+        sprt = SPRT(0, 10, 0.05, 0.05)
+        self.assertIsNone(sprt.verdict(0, 0, 0))
+        self.assertIsNone(sprt.verdict(12, 20, 10))
+        # A clear win for engine A accepts H1, and a clear loss H0.
+        self.assertEqual(sprt.verdict(600, 800, 400), Verdict.H1)
+        self.assertEqual(sprt.verdict(400, 800, 600), Verdict.H0)
+        # Even results are evidence against A being stronger.
+        self.assertLess(sprt.llr(500, 1000, 500), 0)
+
+
+class TestElo(unittest.TestCase):
+    def test_elo_difference(self) -> None:
+        elo, margin = elo_difference(10, 20, 10)
+        self.assertEqual(elo, 0)
+        self.assertGreater(margin, 0)
+        # Scoring 75% is about 191 Elo.
+        self.assertAlmostEqual(elo_difference(3, 0, 1)[0], 190.8, places=1)
+        self.assertEqual(elo_difference(5, 0, 0)[0], math.inf)
+        # More games narrow the error bars.
+        self.assertLess(elo_difference(100, 200, 100)[1], margin)
+
+
+class TestAdjudicate(unittest.TestCase):
+    def assert_result(self, fen_str: str, result: str, reason: str) -> None:
+        board = Board(fen_str, BoardRepresentation.BITBOARDS)
+        self.assertEqual(
+            adjudicate(board, Counter([board.zobrist_key]), 0, 0), (result, reason)
+        )
+
+    def test_game_over(self) -> None:
+        self.assert_result(
+            "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+            BLACK_WINS,
+            "checkmate",
+        )
+        self.assert_result(
+            "R5k1/5ppp/8/8/8/8/5PPP/6K1 b - - 0 1", WHITE_WINS, "checkmate"
+        )
+
+    def test_draws(self) -> None:
+        self.assert_result("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1", DRAW, "stalemate")
+        self.assert_result(
+            "8/8/4k3/8/8/3BK3/8/8 w - - 0 1", DRAW, "insufficient material"
+        )
+        board = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        repetitions = Counter({board.zobrist_key: 3})
+        self.assertEqual(
+            adjudicate(board, repetitions, 0, 0), (DRAW, "threefold repetition")
+        )
+        self.assertEqual(
+            adjudicate(board, Counter(), 100, 0), (DRAW, "fifty move rule")
+        )
+        self.assertIsNone(adjudicate(board, Counter(), 99, 0))
+
+
+class TestTournament(unittest.TestCase):
+    def test_time_control(self) -> None:
+        time_control = TimeControl.parse("10+0.1")
+        self.assertEqual(
+            (time_control.base_ms, time_control.increment_ms), (10000, 100)
+        )
+        self.assertEqual(TimeControl.parse("5").increment_ms, 0)
+
+    def test_score(self) -> None:
+        self.assertEqual(GameRecord("", True, WHITE_WINS, "", 0).a_score, 1)
+        self.assertEqual(GameRecord("", False, WHITE_WINS, "", 0).a_score, 0)
+        self.assertEqual(GameRecord("", False, DRAW, "", 0).a_score, 0.5)
+
+    def test_play_games(self) -> None:
+        tournament = Tournament(
+            ENGINE_COMMAND, ENGINE_COMMAND, 4, go_command="go depth 1", concurrency=2
+        )
+        result = tournament.run()
+        self.assertEqual(len(result.games), 4)
+        self.assertEqual(result.wins + result.draws + result.losses, 4)
+        # Each opening is played with each engine as white.
+        self.assertEqual(
+            Counter((game.opening, game.a_is_white) for game in result.games),
+            Counter(
+                [
+                    (OPENINGS[0], True),
+                    (OPENINGS[0], False),
+                    (OPENINGS[1], True),
+                    (OPENINGS[1], False),
+                ]
+            ),
+        )
+        self.assertTrue(
+            all(game.plies > len(game.opening.split()) for game in result.games)
+        )
+        self.assertIn("Elo: ", result.lines()[1])
+
+    def test_ponder(self) -> None:
+        tournament = Tournament(
+            ENGINE_COMMAND, ENGINE_COMMAND, 2, go_command="go depth 1", ponder=True
+        )
+        self.assertEqual(tournament._go_command({}, ponder=True), "go ponder depth 1")
+        result = tournament.run()
+        self.assertEqual(len(result.games), 2)
+        # Ponder hits and misses are both answered with legal moves in time.
+        self.assertFalse(
+            {game.reason for game in result.games}
+            & {"timeout", "crash", "illegal move"}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
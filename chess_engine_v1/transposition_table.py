@@ -0,0 +1,230 @@
+import array
+import enum
+from multiprocessing import shared_memory
+
+DEFAULT_SIZE_MB = 16
+
+# Each entry is two unsigned 64-bit words, the position's Zobrist key XORed with the
+# packed search result, and the packed search result. Entries are grouped into
+# buckets of two, a depth-preferred slot followed by an always-replace slot.
+#
+# A table shared between processes is written without locks, so one process can
+# read an entry while another is half way through writing it. XORing the key with
+# the data means a torn entry doesn't match any key, so it's ignored rather than
+# giving a result for the wrong position.
+ENTRY_SIZE_BYTES = 16
+ENTRIES_PER_BUCKET = 2
+
+NO_MOVE = 0
+# hashfull looks at this many entries to estimate how full the table is.
+HASHFULL_SAMPLE_SIZE = 1000
+
+# Layout of the packed data word, from the lowest bit up:
+#   move  16 bits, see Move.encode
+#   score 32 bits, offset so negative scores pack as unsigned
+#   depth  8 bits
+#   bound  2 bits
+#   age    6 bits
+_MOVE_MASK = 0xFFFF
+_SCORE_SHIFT = 16
+_SCORE_MASK = 0xFFFF_FFFF
+_SCORE_OFFSET = 1 << 31
+_DEPTH_SHIFT = 48
+_DEPTH_MASK = 0xFF
+_BOUND_SHIFT = 56
+_BOUND_MASK = 0x3
+_AGE_SHIFT = 58
+_AGE_MASK = 0x3F
+
+
+class Bound(enum.IntEnum):
+    # How the stored score relates to the position's true score.
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class TranspositionTable:
+    """
+    Fixed-size cache of search results keyed by Zobrist key.
+
+    The entries live in two flat arrays of 64-bit ints, so a large table costs 16
+    bytes per entry rather than a Python object per entry. A shared table keeps them
+    in a shared memory segment instead, so processes searching in parallel can use
+    each other's results.
+    """
+
+    def __init__(self, size_mb: int = DEFAULT_SIZE_MB, shared: bool = False):
+        self.shared = shared
+        self._shared_memory: shared_memory.SharedMemory | None = None
+        self.resize(size_mb)
+
+    @classmethod
+    def attach(cls, name: str, size_mb: int) -> "TranspositionTable":
+        """
+        Use the shared table with the given name, made by another process.
+        """
+        table = cls.__new__(cls)
+        table.shared = True
+        table._shared_memory = None
+        table._use_shared_memory(shared_memory.SharedMemory(name), size_mb, False)
+        return table
+
+    @property
+    def name(self) -> str | None:
+        """
+        The shared memory segment's name, for attaching to it, if shared.
+        """
+        return self._shared_memory.name if self._shared_memory else None
+
+    def resize(self, size_mb: int) -> None:
+        """
+        Reallocate the table to use about size_mb megabytes, dropping all entries.
+        """
+        self.close()
+        entry_count = _bucket_count(size_mb) * ENTRIES_PER_BUCKET
+        if self.shared:
+            segment = shared_memory.SharedMemory(
+                create=True, size=ENTRY_SIZE_BYTES * entry_count
+            )
+            self._use_shared_memory(segment, size_mb, True)
+        else:
+            self.size_mb = size_mb
+            self.bucket_count = _bucket_count(size_mb)
+            # Or views of a shared memory segment, see _use_shared_memory.
+            self._keys: array.array[int] | memoryview = array.array(
+                "Q", bytes(8 * entry_count)
+            )
+            self._data: array.array[int] | memoryview = array.array(
+                "Q", bytes(8 * entry_count)
+            )
+        self.age = 0
+
+    def _use_shared_memory(
+        self, segment: shared_memory.SharedMemory, size_mb: int, owner: bool
+    ) -> None:
+        self.size_mb = size_mb
+        self.bucket_count = _bucket_count(size_mb)
+        self._shared_memory = segment
+        # Only the process that made the segment removes it.
+        self._owner = owner
+        entry_count = self.bucket_count * ENTRIES_PER_BUCKET
+        words = _buffer(segment).cast("Q")
+        self._keys = words[:entry_count]
+        self._data = words[entry_count : 2 * entry_count]
+        words.release()
+        self.age = 0
+
+    def share(self, shared: bool) -> None:
+        """
+        Move the table into or out of shared memory, dropping all entries.
+        """
+        if shared != self.shared:
+            self.shared = shared
+            self.resize(self.size_mb)
+
+    def close(self) -> None:
+        """
+        Let go of the shared memory segment, if any. The table can't be used again
+        until it's resized.
+        """
+        if self._shared_memory:
+            # The views have to be released before the segment can be closed.
+            for view in (self._keys, self._data):
+                if isinstance(view, memoryview):
+                    view.release()
+            self._shared_memory.close()
+            if self._owner:
+                self._shared_memory.unlink()
+            self._shared_memory = None
+
+    def clear(self) -> None:
+        if self._shared_memory:
+            # Clear in place, so other processes stay attached.
+            _buffer(self._shared_memory)[:] = bytes(self._shared_memory.size)
+            self.age = 0
+        else:
+            self.resize(self.size_mb)
+
+    def new_search(self) -> None:
+        """
+        Start a new search. Entries from earlier searches are replaced first.
+        """
+        self.age = (self.age + 1) & _AGE_MASK
+
+    def hashfull(self) -> int:
+        """
+        Estimate how much of the table the current search has filled, in permille.
+        """
+        data = self._data
+        sample_size = min(HASHFULL_SAMPLE_SIZE, len(data))
+        used = sum(
+            1
+            for slot in range(sample_size)
+            if data[slot] and data[slot] >> _AGE_SHIFT == self.age
+        )
+        return used * 1000 // sample_size
+
+    def probe(self, key: int) -> tuple[int, int, int, int] | None:
+        """
+        Look up a position, returning its (depth, score, bound, move) if stored.
+        """
+        keys = self._keys
+        index = (key % self.bucket_count) * ENTRIES_PER_BUCKET
+        for slot in (index, index + 1):
+            data = self._data[slot]
+            if keys[slot] ^ data == key:
+                return (
+                    data >> _DEPTH_SHIFT & _DEPTH_MASK,
+                    (data >> _SCORE_SHIFT & _SCORE_MASK) - _SCORE_OFFSET,
+                    data >> _BOUND_SHIFT & _BOUND_MASK,
+                    data & _MOVE_MASK,
+                )
+        return None
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: int) -> None:
+        keys = self._keys
+        data = self._data
+        deep_slot = (key % self.bucket_count) * ENTRIES_PER_BUCKET
+        recent_slot = deep_slot + 1
+
+        # The depth-preferred slot is only replaced by the same position, a search
+        # at least as deep, or when its entry is left over from an earlier search.
+        # Otherwise the new entry goes in the always-replace slot.
+        deep_data = data[deep_slot]
+        deep_key = keys[deep_slot] ^ deep_data
+        if (
+            deep_key == key
+            or deep_data >> _AGE_SHIFT != self.age
+            or deep_data >> _DEPTH_SHIFT & _DEPTH_MASK <= depth
+        ):
+            slot = deep_slot
+            if deep_key not in (key, 0):
+                # Keep the displaced entry around in the always-replace slot.
+                keys[recent_slot] = keys[deep_slot]
+                data[recent_slot] = deep_data
+        else:
+            slot = recent_slot
+
+        if move == NO_MOVE and keys[slot] ^ data[slot] == key:
+            # Keep the best move from an earlier search of this position.
+            move = data[slot] & _MOVE_MASK
+        packed = (
+            move
+            | (score + _SCORE_OFFSET) << _SCORE_SHIFT
+            | min(depth, _DEPTH_MASK) << _DEPTH_SHIFT
+            | bound << _BOUND_SHIFT
+            | self.age << _AGE_SHIFT
+        )
+        keys[slot] = key ^ packed
+        data[slot] = packed
+
+
+def _bucket_count(size_mb: int) -> int:
+    return max(1, size_mb * 1024 * 1024 // (ENTRY_SIZE_BYTES * ENTRIES_PER_BUCKET))
+
+
+def _buffer(segment: shared_memory.SharedMemory) -> memoryview:
+    if segment.buf is None:
+        raise Exception(f"Shared memory segment {segment.name} is closed")
+    return segment.buf
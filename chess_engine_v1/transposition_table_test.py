@@ -0,0 +1,114 @@
+import unittest
+
+from transposition_table import NO_MOVE, Bound, TranspositionTable
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_probe_missing_key(self) -> None:
+        table = TranspositionTable(1)
+        self.assertIsNone(table.probe(12345))
+
+    def test_store_and_probe(self) -> None:
+        table = TranspositionTable(1)
+        table.store(12345, 3, -250, Bound.LOWER, 0x1234)
+        self.assertEqual(table.probe(12345), (3, -250, Bound.LOWER, 0x1234))
+
+    def test_size(self) -> None:
+        table = TranspositionTable(1)
+        self.assertEqual(table.bucket_count, 1024 * 1024 // 32)
+        table.resize(2)
+        self.assertEqual(table.bucket_count, 2 * 1024 * 1024 // 32)
+
+    def test_keeps_previous_move(self) -> None:
+        table = TranspositionTable(1)
+        table.store(12345, 3, 10, Bound.EXACT, 0x1234)
+        table.store(12345, 4, 20, Bound.UPPER, NO_MOVE)
+        self.assertEqual(table.probe(12345), (4, 20, Bound.UPPER, 0x1234))
+
+    def test_depth_preferred_replacement(self) -> None:
+        table = TranspositionTable(1)
+        deep_key = 7
+        shallow_key = deep_key + table.bucket_count
+        newer_key = deep_key + 2 * table.bucket_count
+
+        table.store(deep_key, 8, 1, Bound.EXACT, 1)
+        table.store(shallow_key, 2, 2, Bound.EXACT, 2)
+        self.assertIsNotNone(table.probe(deep_key))
+        self.assertIsNotNone(table.probe(shallow_key))
+
+        # The always-replace slot takes the next shallow entry, while the deep entry
+        # stays.
+        table.store(newer_key, 1, 3, Bound.EXACT, 3)
+        self.assertIsNotNone(table.probe(deep_key))
+        self.assertIsNone(table.probe(shallow_key))
+        self.assertIsNotNone(table.probe(newer_key))
+
+    def test_old_entries_replaced(self) -> None:
+        table = TranspositionTable(1)
+        deep_key = 7
+        other_key = deep_key + table.bucket_count
+        table.store(deep_key, 8, 1, Bound.EXACT, 1)
+
+        table.new_search()
+        table.store(other_key, 1, 2, Bound.EXACT, 2)
+        # The old deep entry is moved to the always-replace slot.
+        self.assertEqual(table.probe(other_key), (1, 2, Bound.EXACT, 2))
+        self.assertEqual(table.probe(deep_key), (8, 1, Bound.EXACT, 1))
+
+        table.store(other_key + table.bucket_count, 1, 3, Bound.EXACT, 3)
+        self.assertIsNone(table.probe(deep_key))
+
+    def test_hashfull(self) -> None:
+        table = TranspositionTable(1)
+        self.assertEqual(table.hashfull(), 0)
+        # Fill 100 of the first buckets, i.e. 200 of the 1000 sampled entries.
+        for key in range(1, 101):
+            table.store(key, 1, 0, Bound.EXACT, 1)
+            table.store(key + table.bucket_count, 1, 0, Bound.EXACT, 1)
+        self.assertEqual(table.hashfull(), 200)
+        # Entries from earlier searches don't count.
+        table.new_search()
+        self.assertEqual(table.hashfull(), 0)
+
+    def test_clear(self) -> None:
+        table = TranspositionTable(1)
+        table.store(12345, 3, 10, Bound.EXACT, 0x1234)
+        table.clear()
+        self.assertIsNone(table.probe(12345))
+
+    def test_torn_entry_ignored(self) -> None:
+        table = TranspositionTable(1)
+        table.store(12345, 3, 10, Bound.EXACT, 0x1234)
+        # As if another process had written the data but not yet the key.
+        slot = (12345 % table.bucket_count) * 2
+        table._data[slot] ^= 1 << 20
+        self.assertIsNone(table.probe(12345))
+
+    def test_shared(self) -> None:
+        table = TranspositionTable(1, shared=True)
+        self.addCleanup(table.close)
+        self.assertIsNotNone(table.name)
+        table.store(12345, 3, -250, Bound.LOWER, 0x1234)
+
+        other = TranspositionTable.attach(table.name or "", 1)
+        self.addCleanup(other.close)
+        self.assertEqual(other.probe(12345), (3, -250, Bound.LOWER, 0x1234))
+        other.store(54321, 2, 5, Bound.EXACT, 7)
+        self.assertEqual(table.probe(54321), (2, 5, Bound.EXACT, 7))
+
+        table.clear()
+        self.assertIsNone(other.probe(54321))
+
+    def test_share(self) -> None:
+        table = TranspositionTable(1)
+        self.assertIsNone(table.name)
+        table.share(True)
+        self.assertIsNotNone(table.name)
+        table.share(False)
+        self.assertIsNone(table.name)
+        table.store(12345, 3, 10, Bound.EXACT, 0x1234)
+        self.assertIsNotNone(table.probe(12345))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+# How long an engine gets to answer anything other than a search.
+RESPONSE_TIMEOUT_S = 30
+
+
+class EngineHandle:
+    """
+    A UCI engine process, kept running from game to game.
+
+    Output is read a line at a time against a deadline for each command, so an engine
+    that hangs raises TimeoutError rather than blocking its caller, and one that has
+    crashed raises EOFError. Either can be replaced with restart(), and new_game()
+    does so itself.
+    """
+
+    def __init__(self, command: list[str], options: dict[str, str] | None = None):
+        self.command = command
+        self.options = options or {}
+        # How many times the process has been replaced.
+        self.restarts = 0
+        self._process: asyncio.subprocess.Process | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._process and self._process.returncode is None)
+
+    async def start(self) -> None:
+        self._process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        await self.request("uci", "uciok")
+        for name, value in self.options.items():
+            self.send(f"setoption name {name} value {value}")
+        await self.request("isready", "readyok")
+
+    async def restart(self) -> None:
+        # Replace a process that has crashed or stopped answering.
+        await self.kill()
+        self.restarts += 1
+        await self.start()
+
+    def send(self, command: str) -> None:
+        if not self._process or not self._process.stdin or not self.running:
+            raise EOFError(f"Engine isn't running to send {command}")
+        self._process.stdin.write(f"{command}\n".encode())
+
+    async def read_line(self, timeout_s: float = RESPONSE_TIMEOUT_S) -> str:
+        if not self._process or not self._process.stdout:
+            raise EOFError("Engine isn't running")
+        line = await asyncio.wait_for(
+            self._process.stdout.readline(), max(timeout_s, 0)
+        )
+        if not line:
+            # Let the process finish exiting, so it's not left to the event loop.
+            await self._process.wait()
+            raise EOFError("Engine exited")
+        return line.decode().strip()
+
+    async def read_until(
+        self, terminator: str, timeout_s: float = RESPONSE_TIMEOUT_S
+    ) -> list[str]:
+        # Read lines until one starts with terminator, and return them all, that one
+        # last. Raises TimeoutError if that takes longer than timeout_s altogether.
+        deadline = time.monotonic() + timeout_s
+        lines = []
+        while True:
+            try:
+                line = await self.read_line(deadline - time.monotonic())
+            except EOFError:
+                raise EOFError(
+                    f"Engine exited while waiting for {terminator}"
+                ) from None
+            lines.append(line)
+            if line.startswith(terminator):
+                return lines
+
+    async def request(
+        self, command: str, terminator: str, timeout_s: float = RESPONSE_TIMEOUT_S
+    ) -> list[str]:
+        self.send(command)
+        return await self.read_until(terminator, timeout_s)
+
+    async def new_game(self) -> None:
+        # Reset the engine for a new game, restarting it if it has crashed or doesn't
+        # answer.
+        try:
+            self.send("ucinewgame")
+            await self.request("isready", "readyok")
+        except (TimeoutError, EOFError):
+            await self.restart()
+            self.send("ucinewgame")
+            await self.request("isready", "readyok")
+
+    async def kill(self) -> None:
+        if self._process and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+
+    async def quit(self) -> None:
+        if not self._process or not self.running:
+            return
+        self.send("quit")
+        try:
+            await asyncio.wait_for(self._process.wait(), RESPONSE_TIMEOUT_S)
+        except TimeoutError:
+            await self.kill()
+
+
+class EnginePool:
+    """
+    Engine processes that aren't playing, handed out for a game and given back after
+    it, so a run of short games doesn't spend most of its time starting engines.
+    """
+
+    def __init__(self) -> None:
+        self._idle: list[EngineHandle] = []
+
+    async def acquire(
+        self, command: list[str], options: dict[str, str] | None = None
+    ) -> EngineHandle:
+        # An idle engine started the same way if there is one, otherwise a new one,
+        # ready for a new game.
+        for handle in self._idle:
+            if handle.command == command and handle.options == (options or {}):
+                self._idle.remove(handle)
+                await handle.new_game()
+                return handle
+        handle = EngineHandle(command, options)
+        await handle.start()
+        return handle
+
+    def release(self, handle: EngineHandle) -> None:
+        self._idle.append(handle)
+
+    async def close(self) -> None:
+        await asyncio.gather(*(handle.quit() for handle in self._idle))
+        self._idle.clear()
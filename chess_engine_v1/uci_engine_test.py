@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import unittest
+
+from tournament import ENGINE_COMMAND
+from uci_engine import EngineHandle, EnginePool
+
+# Processes that never answer, and that exit straight away.
+SILENT_COMMAND = [sys.executable, "-c", "import time; time.sleep(60)"]
+EXITING_COMMAND = [sys.executable, "-c", "pass"]
+
+
+class TestEngineHandle(unittest.TestCase):
+    def test_request(self) -> None:
+        async def request() -> list[str]:
+            engine = EngineHandle(ENGINE_COMMAND)
+            await engine.start()
+            try:
+                engine.send("position startpos")
+                return await engine.request("go depth 1", "bestmove")
+            finally:
+                await engine.quit()
+
+        lines = asyncio.run(request())
+        self.assertTrue(lines[-1].startswith("bestmove"))
+        self.assertTrue(all(line.startswith("info") for line in lines[:-1]))
+
+    def test_timeout(self) -> None:
+        async def read() -> None:
+            engine = EngineHandle(SILENT_COMMAND)
+            engine._process = await asyncio.create_subprocess_exec(
+                *SILENT_COMMAND,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+            try:
+                await engine.request("isready", "readyok", 0.2)
+            finally:
+                await engine.kill()
+
+        with self.assertRaises(TimeoutError):
+            asyncio.run(read())
+
+    def test_exited(self) -> None:
+        with self.assertRaises(EOFError):
+            asyncio.run(EngineHandle(EXITING_COMMAND).start())
+
+    def test_new_game_restarts_crashed_engine(self) -> None:
+        async def new_game() -> tuple[int, list[str]]:
+            engine = EngineHandle(ENGINE_COMMAND)
+            await engine.start()
+            await engine.kill()
+            await engine.new_game()
+            try:
+                return engine.restarts, await engine.request("isready", "readyok")
+            finally:
+                await engine.quit()
+
+        restarts, lines = asyncio.run(new_game())
+        self.assertEqual(restarts, 1)
+        self.assertEqual(lines, ["readyok"])
+
+
+class TestEnginePool(unittest.TestCase):
+    def test_reuses_engines(self) -> None:
+        async def acquire_twice() -> tuple[bool, bool, int]:
+            pool = EnginePool()
+            first = await pool.acquire(ENGINE_COMMAND)
+            pool.release(first)
+            second = await pool.acquire(ENGINE_COMMAND)
+            # Engines started with other options aren't shared.
+            other = await pool.acquire(ENGINE_COMMAND, {"Threads": "1"})
+            pool.release(second)
+            pool.release(other)
+            await pool.close()
+            return first is second, other is first, first.restarts
+
+        same, other_same, restarts = asyncio.run(acquire_twice())
+        self.assertTrue(same)
+        self.assertFalse(other_same)
+        self.assertEqual(restarts, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
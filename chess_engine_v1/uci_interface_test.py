@@ -1,9 +1,20 @@
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
 from io import StringIO
 from unittest.mock import patch
 
 import fen
+from board import Board, BoardRepresentation, Player
 from chess_engine import UCIInterface
+from opening_book import write_book
+from time_manager import MAX_DEPTH
+
+# How long tests wait for the UCI loop to end before failing, rather than hanging.
+RUN_TIMEOUT_S = 60
 
 
 class TestUCIInterface(unittest.TestCase):
@@ -13,6 +24,7 @@ class TestUCIInterface(unittest.TestCase):
             "\n".join(
                 [
                     "uci",
+                    "setoption name Hash value 1",
                     "isready",
                     f"position fen {fen.STARTING_GAME_FEN}",
                     "go depth 1",
@@ -31,17 +43,385 @@ class TestUCIInterface(unittest.TestCase):
         expected_output = [
             "id name SimpleChessEngine",
             "id author SCRB",
+            "option name Hash type spin default 16 min 1 max 4096",
+            "option name Threads type spin default 1 min 1 max 256",
+            "option name NullMovePruning type check default true",
+            "option name LateMoveReductions type check default true",
+            "option name FutilityPruning type check default true",
+            "option name Ponder type check default false",
+            "option name OwnBook type check default false",
+            "option name BookFile type string default <empty>",
+            "option name BestBookMove type check default false",
             "uciok",
             "readyok",
+            "info depth 1 seldepth [0-9]+ score cp -?[0-9]+ nodes [0-9]+ nps [0-9]+ "
+            "hashfull [0-9]+ time [0-9]+ pv [a-h][1-8][a-h][1-8]",
             # Note: The exact move may vary depending on implementation.
             "bestmove [a-h][1-8][a-h][1-8]",
         ]
 
-        # TODO: look at all output, not just the first 5 lines.
-        for i in range(5):
+        # TODO: look at all output, not just the first lines.
+        for i in range(len(expected_output)):
             self.assertRegex(output[i], expected_output[i])
+        self.assertEqual(uci_interface.transposition_table.size_mb, 1)
+
+    @patch(
+        "sys.stdin",
+        StringIO(
+            "\n".join(
+                [
+                    "position startpos",
+                    "go infinite",
+                    "isready",
+                    "stop",
+                    "quit",
+                ]
+            )
+        ),
+    )
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_commands_answered_during_search(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.run()
+
+        # Leave out the info lines sent as each iteration finishes.
+        output = [
+            line
+            for line in mock_stdout.getvalue().strip().split("\n")
+            if not line.startswith("info")
+        ]
+        # isready is answered while the search is still running, and stop ends the
+        # infinite search with a move.
+        self.assertEqual(output[0], "readyok")
+        self.assertRegex(output[1], "bestmove [a-h][1-8][a-h][1-8]")
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_position_with_moves(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.position_command("position startpos moves e2e4 e7e5 g1f3")
+        expected = Board(
+            "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2",
+            BoardRepresentation.BITBOARDS,
+        )
+        self.assertEqual(uci_interface.engine.board.zobrist_key, expected.zobrist_key)
+        uci_interface.position_command(f"position fen {fen.STARTING_GAME_FEN}")
+        self.assertEqual(
+            uci_interface.engine.board.board, Board(fen.STARTING_GAME_FEN).board
+        )
+        uci_interface.position_command(
+            "position fen 4k3/8/8/8/8/8/4P3/4K3 w - - 0 1 moves e2e4 e8d7"
+        )
+        self.assertEqual(uci_interface.engine.board.turn, Player.WHITE)
+        key = uci_interface.engine.board.zobrist_key
+        # Bad positions are reported, and the previous one kept.
+        uci_interface.position_command("position startpos moves e2e5")
+        self.assertIn(
+            "info string Illegal move in position command, e2e5",
+            mock_stdout.getvalue(),
+        )
+        uci_interface.position_command("position fen 4k3/8/8/8/8/8/4P3/4K3 x")
+        self.assertEqual(uci_interface.engine.board.zobrist_key, key)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_illegal_move_extending_previous(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.position_command("position startpos moves e2e4")
+        board = uci_interface.board
+        key = uci_interface.engine.board.zobrist_key
+        # The good moves before the bad one are taken back.
+        uci_interface.position_command("position startpos moves e2e4 e7e5 e1e5")
+        self.assertIn("info string Illegal move", mock_stdout.getvalue())
+        self.assertIs(uci_interface.board, board)
+        self.assertEqual(uci_interface.engine.board.zobrist_key, key)
+        self.assertEqual(len(uci_interface.engine.board.key_history), 1)
+        uci_interface.position_command("position startpos moves e2e4 e7e5")
+        self.assertIs(uci_interface.board, board)
+        self.assertEqual(len(uci_interface.engine.board.key_history), 2)
+
+    def test_position_extending_previous(self) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.position_command("position startpos moves e2e4 e7e5")
+        board, engine = uci_interface.board, uci_interface.engine
+        uci_interface.position_command("position startpos moves e2e4 e7e5 g1f3 b8c6")
+        # Only the new moves are made, on the same board.
+        self.assertIs(uci_interface.board, board)
+        self.assertIs(uci_interface.engine, engine)
+        self.assertEqual(len(engine.board.key_history), 4)
+        expected = Board(
+            "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+            BoardRepresentation.BITBOARDS,
+        )
+        self.assertEqual(engine.board.zobrist_key, expected.zobrist_key)
+        # Anything else starts again from the FEN.
+        uci_interface.position_command("position startpos moves d2d4")
+        self.assertIsNot(uci_interface.board, board)
+        self.assertEqual(len(uci_interface.engine.board.key_history), 1)
+        board = uci_interface.board
+        uci_interface.ucinewgame()
+        uci_interface.position_command("position startpos moves d2d4")
+        self.assertIsNot(uci_interface.board, board)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_perft(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.position(fen.STARTING_GAME_FEN)
+        uci_interface.perft("go perft 2")
+
+        output = mock_stdout.getvalue().strip().split("\n")
+        self.assertIn("e2e4: 20", output)
+        self.assertEqual(len([line for line in output if ": 20" in line]), 20)
+        self.assertIn("Nodes searched: 400", output)
+        self.assertRegex(output[-1], "Nodes per second: [0-9]+")
+
+    @patch(
+        "sys.stdin",
+        StringIO(
+            "\n".join(
+                ["position startpos", "go perft 0", "go perft x", "isready", "quit"]
+            )
+        ),
+    )
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_perft_bad_depth(self, mock_stdout: StringIO) -> None:
+        # The engine says what's wrong and carries on, rather than recursing forever.
+        UCIInterface().run()
+
+        output = mock_stdout.getvalue().strip().split("\n")
+        self.assertEqual(
+            output.count("info string perft needs a depth of at least 1"), 2
+        )
+        self.assertNotIn("Nodes searched: 0", output)
+        self.assertEqual(output[-1], "readyok")
+
+    @patch(
+        "sys.stdin",
+        StringIO(
+            "\n".join(
+                [
+                    "setoption name Hash value 2",
+                    "setoption name Hash value x",
+                    "setoption name Threads value many",
+                    "isready",
+                    "quit",
+                ]
+            )
+        ),
+    )
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_bad_option_value(self, mock_stdout: StringIO) -> None:
+        # A value that isn't a number is reported, and the option keeps its value.
+        uci_interface = UCIInterface()
+        uci_interface.run()
 
-    # TODO: ChatGPT: Add test for self_play file.
+        output = mock_stdout.getvalue().strip().split("\n")
+        self.assertEqual(
+            output,
+            [
+                "info string Option Hash needs a number, not x",
+                "info string Option Threads needs a number, not many",
+                "readyok",
+            ],
+        )
+        self.assertEqual(uci_interface.transposition_table.size_mb, 2)
+        self.assertIsNone(uci_interface.helpers)
+
+    @patch("sys.stdin", StringIO("\n".join(["go perft 1", "isready", "quit"])))
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_perft_without_position(self, mock_stdout: StringIO) -> None:
+        UCIInterface().run()
+
+        output = mock_stdout.getvalue().strip().split("\n")
+        self.assertIn("Nodes searched: 20", output)
+        self.assertEqual(output[-1], "readyok")
+
+    @patch(
+        "sys.stdin",
+        StringIO(
+            "\n".join(
+                [
+                    "setoption name Threads value 3",
+                    "position startpos",
+                    "go depth 3",
+                    "isready",
+                    "quit",
+                ]
+            )
+        ),
+    )
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_threads(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.run()
+
+        output = mock_stdout.getvalue()
+        self.assertRegex(output, "bestmove [a-h][1-8][a-h][1-8]")
+        self.assertIn("readyok", output)
+        self.assertTrue(uci_interface.transposition_table.shared)
+        # The helpers are shut down on quit.
+        self.assertIsNone(uci_interface.helpers)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_debug_stats(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.debug_mode("debug on")
+        uci_interface.position(fen.STARTING_GAME_FEN)
+        uci_interface.go("go depth 2")
+        uci_interface.wait_for_search()
+
+        output = mock_stdout.getvalue().strip().split("\n")
+        self.assertRegex(output[-1], "bestmove [a-h][1-8][a-h][1-8]")
+        prefix = "info string stats "
+        self.assertTrue(output[-2].startswith(prefix))
+        stats = json.loads(output[-2][len(prefix) :])
+        self.assertEqual(stats["depth"], 2)
+        self.assertGreater(stats["nodes"], 0)
+
+    def test_search_options(self) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.setoption("setoption name NullMovePruning value false")
+        uci_interface.setoption("setoption name FutilityPruning value false")
+        # The options carry over to new positions.
+        uci_interface.position(fen.STARTING_GAME_FEN)
+        options = uci_interface.engine.options
+        self.assertFalse(options.null_move_pruning)
+        self.assertTrue(options.late_move_reductions)
+        self.assertFalse(options.futility_pruning)
+        uci_interface.setoption("setoption name NullMovePruning value true")
+        self.assertTrue(options.null_move_pruning)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_bench(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.bench("bench 1")
+
+        output = mock_stdout.getvalue().strip().split("\n")
+        self.assertIn("Depth: 1", output)
+        self.assertRegex(output[-2], "Nodes searched: [0-9]+")
+        self.assertRegex(output[-1], "Nodes/second: [0-9]+")
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_infinite_waits_for_stop(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        # A mate in one, which the search gets through to its deepest depth quickly.
+        uci_interface.position("k7/8/1K6/8/8/8/8/7Q w - - 0 1")
+        uci_interface.go("go infinite")
+        while uci_interface.engine.completed_depth < MAX_DEPTH:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        self.assertNotIn("bestmove", mock_stdout.getvalue())
+        uci_interface.stop()
+        self.assertIn("bestmove", mock_stdout.getvalue())
+
+    @patch("sys.stdin", StringIO("position startpos\ngo infinite\n"))
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_end_of_input_stops_search(self, mock_stdout: StringIO) -> None:
+        # A GUI closing the pipe during an infinite search ends it with a move.
+        thread = threading.Thread(target=UCIInterface().run, daemon=True)
+        thread.start()
+        thread.join(RUN_TIMEOUT_S)
+        self.assertFalse(thread.is_alive())
+        self.assertRegex(mock_stdout.getvalue(), "bestmove [a-h][1-8][a-h][1-8]")
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_stop_reports_move(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.position(fen.STARTING_GAME_FEN)
+        uci_interface.go("go infinite")
+        time.sleep(0.2)
+        self.assertNotIn("bestmove", mock_stdout.getvalue())
+
+        # stop returns once the move has been reported.
+        uci_interface.stop()
+        self.assertRegex(mock_stdout.getvalue(), "bestmove [a-h][1-8][a-h][1-8]")
+        self.assertIsNone(uci_interface._search_thread)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_ponderhit(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.position_command("position startpos moves e2e4 e7e5")
+        uci_interface.go("go ponder depth 3")
+        time.sleep(0.5)
+        # Finishing the search isn't enough to report a move while pondering.
+        self.assertNotIn("bestmove", mock_stdout.getvalue())
+        uci_interface.ponderhit()
+        uci_interface.wait_for_search()
+        self.assertRegex(
+            mock_stdout.getvalue(),
+            "bestmove [a-h][1-8][a-h][1-8] ponder [a-h][1-8][a-h][1-8]",
+        )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_immediate_ponderhit(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.position_command("position startpos moves e2e4 e7e5")
+        uci_interface.go("go ponder wtime 1000 btime 1000")
+        # Sent before the search thread has necessarily started searching.
+        uci_interface.ponderhit()
+        self.assertFalse(uci_interface.engine.time_manager.pondering)
+        search_thread = uci_interface._search_thread
+        if not search_thread:
+            self.fail("Expected a search to be running")
+        # The search now has a time limit, so it reports a move by itself. Without
+        # one it would run on to its deepest depth.
+        search_thread.join(RUN_TIMEOUT_S)
+        self.assertFalse(search_thread.is_alive())
+        self.assertIn("bestmove", mock_stdout.getvalue())
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_go_without_position(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.go("go depth 1")
+        uci_interface.wait_for_search()
+        self.assertRegex(mock_stdout.getvalue(), "bestmove [a-h][1-8][a-h][1-8]")
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_ponder_miss(self, mock_stdout: StringIO) -> None:
+        uci_interface = UCIInterface()
+        uci_interface.position_command("position startpos moves e2e4 e7e5")
+        uci_interface.go("go ponder wtime 100 btime 100")
+        time.sleep(0.3)
+        # Far longer than the clock allows, as pondering isn't on our time.
+        self.assertNotIn("bestmove", mock_stdout.getvalue())
+        uci_interface.stop()
+        self.assertIn("bestmove", mock_stdout.getvalue())
+        # What the ponder search found is kept for searching the actual position.
+        self.assertGreater(uci_interface.transposition_table.hashfull(), 0)
+        uci_interface.position_command("position startpos moves e2e4 e7e6")
+        uci_interface.go("go depth 1")
+        uci_interface.wait_for_search()
+        self.assertEqual(mock_stdout.getvalue().count("bestmove"), 2)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_own_book(self, mock_stdout: StringIO) -> None:
+        file, path = tempfile.mkstemp(suffix=".bin")
+        os.close(file)
+        start = Board(fen.STARTING_GAME_FEN, BoardRepresentation.BITBOARDS)
+        write_book(path, [(start, "b1c3", 1), (start, "g2g3", 2)])
+        uci_interface = UCIInterface()
+        try:
+            uci_interface.setoption(f"setoption name BookFile value {path}")
+            uci_interface.setoption("setoption name BestBookMove value true")
+            uci_interface.position_command("position startpos")
+            # The book is only used with OwnBook set.
+            uci_interface.go("go depth 1")
+            uci_interface.wait_for_search()
+            self.assertNotIn("bestmove g2g3", mock_stdout.getvalue())
+            uci_interface.setoption("setoption name OwnBook value true")
+            uci_interface.go("go depth 20")
+            self.assertTrue(mock_stdout.getvalue().endswith("bestmove g2g3\n"))
+            # Out of the book, the engine searches.
+            uci_interface.position_command("position startpos moves g2g3")
+            uci_interface.go("go depth 1")
+            uci_interface.wait_for_search()
+            self.assertIn("info depth 1", mock_stdout.getvalue().split("g2g3")[-1])
+        finally:
+            uci_interface.set_book_file("")
+            os.remove(path)
+        uci_interface.setoption("setoption name BookFile value missing.bin")
+        self.assertIn(
+            "info string Couldn't open book missing.bin", mock_stdout.getvalue()
+        )
+        self.assertIsNone(uci_interface.book)
 
 
 if __name__ == "__main__":
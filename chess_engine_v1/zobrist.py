@@ -0,0 +1,38 @@
+import random
+
+from bitboard import BOARD_SIZE, PIECE_CHARACTERS, square_index
+
+# Random keys that are XORed together to give each position a 64-bit hash. The
+# generator is seeded so every process, and every run, uses the same keys.
+_random = random.Random(0x5EED)  # noqa: S311
+
+PIECE_KEYS = {
+    piece: [_random.getrandbits(64) for _ in range(BOARD_SIZE * BOARD_SIZE)]
+    for piece in PIECE_CHARACTERS
+}
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+# Indexed by the whole castling rights bit mask, so changing rights is one XOR with
+# the old key and one with the new key.
+CASTLING_KEYS = [_random.getrandbits(64) for _ in range(16)]
+# Indexed by the column of the en-passant target square.
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(BOARD_SIZE)]
+
+
+def compute_key(
+    board: list[list[str]],
+    black_to_move: bool,
+    castling_rights: int,
+    en_passant_col: int | None,
+) -> int:
+    # Hash a position from scratch. Board keeps its key up to date incrementally, this
+    # is for setting it up and checking it.
+    key = CASTLING_KEYS[castling_rights]
+    for row, pieces in enumerate(board):
+        for col, piece in enumerate(pieces):
+            if piece != ".":
+                key ^= PIECE_KEYS[piece][square_index(row, col)]
+    if black_to_move:
+        key ^= BLACK_TO_MOVE_KEY
+    if en_passant_col is not None:
+        key ^= EN_PASSANT_KEYS[en_passant_col]
+    return key